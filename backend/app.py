@@ -1,18 +1,41 @@
-from flask import Flask, jsonify, request, send_from_directory, send_file
+from flask import Flask, Response, jsonify, request, send_file, stream_with_context
 from flask_cors import CORS
 from flask_login import LoginManager, login_required, login_user, logout_user, UserMixin
 from pathlib import Path
-from datetime import timedelta
+from datetime import datetime, timedelta
+import atexit
 import json
 import os
 import mimetypes
-import threading
+import random
 import time
 import subprocess
-import signal
+from urllib.parse import quote
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
 from models import db, Dish, FeedbackMessage, User
+from catalog import CatalogStore, dumps_bytes, short_hash
+from static_manifest import StaticEntry, StaticManifest
+import image_derivatives
+import optimize_images
+import sprites
+import audio_index
+import precache
+import offline_pack
+import trainer_deck
+import html_normalizer
+import rich_text
+import i18n_projection
+import user_cache
+import public_session
+import rate_limit
+import feedback_inbox
+import feedback_queue
+import graceful_reload
+import deploy_events
+import catalog_events
+import availability
+import jobs
 
 # На некоторых системах (особенно Windows) mimetypes может не знать про .webp
 mimetypes.add_type("image/webp", ".webp")
@@ -76,78 +99,16 @@ def _load_menu_db_items() -> list[dict]:
             app.logger.warning(f"Не удалось загрузить {path}: {e}")
     return []
 
-def _get_wines_dicts() -> list[dict]:
-    """
-    Возвращает список вин как список dict.
-    Сначала пробуем БД; если пусто — берём из JSON.
-    """
-    try:
-        # 1) Пытаемся взять из БД
-        dishes = Dish.query.all()
-        wines = [
-            d for d in dishes
-            if (_text_contains(d.menu, ['вин', 'wine']) or _text_contains(d.section, ['вин', 'wine']))
-        ]
-        if wines:
-            # Важно: в БД нет части полей (например status/origin/producer/region/...).
-            # Поэтому подмешиваем "полную" запись из menu-database.json по id.
-            json_by_id = _load_menu_db_by_id()
-            out = []
-            for w in wines:
-                base = w.to_dict()
-                full = json_by_id.get(base.get("id")) if isinstance(json_by_id, dict) else None
-                merged = _deep_merge_dicts(full or {}, base)
-                out.append(_enrich_wine_dict(merged))
-            return out
-
-        # 2) Фолбэк: из JSON
-        items = _load_menu_db_items()
-        json_wines = [
-            item for item in items
-            if _text_contains(item.get("menu"), ['вин', 'wine']) or _text_contains(item.get("section"), ['вин', 'wine'])
-        ]
-        return [item for item in json_wines]
-    except Exception as e:
-        app.logger.exception(f"Ошибка получения вин: {e}")
-        return []
-
-def _get_bar_items_dicts() -> list[dict]:
-    """
-    Возвращает список барных позиций как список dict.
-    Сначала пробуем БД; если пусто — берём из JSON.
-    """
-    try:
-        dishes = Dish.query.all()
-        bar_items = [
-            d for d in dishes
-            if (
-                _text_contains(d.menu, ['бар', 'bar', 'напит', 'drink'])
-                or _text_contains(d.section, ['коктейл', 'cocktail', 'чай', 'tea', 'пиво', 'beer', 'кофе', 'coffee', 'напит', 'drink'])
-            )
-        ]
-        if bar_items:
-            # Важно: в БД нет некоторых полей (например status, cardIngredients, и т.п.)
-            # Поэтому подмешиваем "полную" запись из menu-database.json по id.
-            json_by_id = _load_menu_db_by_id()
-            out = []
-            for b in bar_items:
-                base = b.to_dict()
-                full = json_by_id.get(base.get("id")) if isinstance(json_by_id, dict) else None
-                out.append(_deep_merge_dicts(full or {}, base))
-            return out
+def _is_wine_item(item: dict) -> bool:
+    """Позиция винной карты: "вино"/"wine" в menu или section."""
+    return _text_contains(item.get("menu"), ['вин', 'wine']) or _text_contains(item.get("section"), ['вин', 'wine'])
 
-        items = _load_menu_db_items()
-        json_bar = [
-            item for item in items
-            if (
-                _text_contains(item.get("menu"), ['бар', 'bar', 'напит', 'drink'])
-                or _text_contains(item.get("section"), ['коктейл', 'cocktail', 'чай', 'tea', 'пиво', 'beer', 'кофе', 'coffee', 'напит', 'drink'])
-            )
-        ]
-        return [item for item in json_bar]
-    except Exception as e:
-        app.logger.exception(f"Ошибка получения бара: {e}")
-        return []
+def _is_bar_item(item: dict) -> bool:
+    """Позиция барного меню: бар/напитки в menu или коктейли, чай, пиво, кофе в section."""
+    return (
+        _text_contains(item.get("menu"), ['бар', 'bar', 'напит', 'drink'])
+        or _text_contains(item.get("section"), ['коктейл', 'cocktail', 'чай', 'tea', 'пиво', 'beer', 'кофе', 'coffee', 'напит', 'drink'])
+    )
 
 # Загружаем переменные окружения
 load_dotenv()
@@ -241,16 +202,19 @@ def _is_readonly_db_error(err: Exception) -> bool:
     )
 
 
-def _readonly_db_response():
-    """
-    Единый ответ для фронта, чтобы сразу было понятно, что чинить на сервере.
-    """
-    hint = (
+def _readonly_db_hint() -> str:
+    return (
         "База данных SQLite сейчас доступна только для чтения (нет прав на запись).\n"
         "Самый простой фикс: вынести файл базы в writable-папку и задать переменную окружения SABOR_DB_PATH.\n"
         f"Текущий путь к базе: {DB_PATH}"
     )
-    return jsonify({"error": "DB_READONLY", "message": hint}), 503
+
+
+def _readonly_db_response():
+    """
+    Единый ответ для фронта, чтобы сразу было понятно, что чинить на сервере.
+    """
+    return jsonify({"error": "DB_READONLY", "message": _readonly_db_hint()}), 503
 
 
 def _log_db_writable_status():
@@ -305,6 +269,46 @@ login_manager.init_app(app)
 # Для API не используем login_view (перенаправления не нужны)
 # login_manager.login_view = 'admin_login'  # Если нужно, используйте имя функции
 
+# Публичные GET без сессии и cookies (см. public_session.py).
+# Всё, что не /api/..., — статика и фронтенд; из /api — только чтение каталога.
+PUBLIC_API_PREFIXES = (
+    "/api/dishes", "/api/menus", "/api/sections", "/api/wines", "/api/bar-items",
+    "/api/menu-json", "/api/health", "/api/audio/manifest", "/api/precache/",
+    "/api/offline-pack", "/api/trainer/deck", "/api/sprites/icons", "/api/events",
+    "/api/availability",
+)
+# Сколько секунд общий кэш (nginx/CDN) может отдавать публичный ответ без перепроверки
+PUBLIC_SHARED_MAX_AGE = _env_int("PUBLIC_SHARED_MAX_AGE", 10)
+
+
+def _is_public_path(path: str) -> bool:
+    if not path.startswith("/api/"):
+        return True
+    return path.startswith(PUBLIC_API_PREFIXES)
+
+
+app.session_interface = public_session.PublicReadSessionInterface(_is_public_path)
+
+
+@app.after_request
+def _public_cache_headers(resp):
+    """Явный Cache-Control для публичных ответов (сессии у них нет, значит их можно кэшировать)."""
+    if request.environ.get(public_session.ENVIRON_KEY):
+        resp.headers["Cache-Control"] = public_session.public_cache_control(
+            resp.headers.get("Cache-Control"), resp.status_code, PUBLIC_SHARED_MAX_AGE,
+        )
+        # /api/wines, /api/menus и т.п. отдаются без ETag — добавляем, чтобы перепроверка стоила 304
+        if resp.status_code == 200 and not resp.direct_passthrough and resp.mimetype == "application/json" \
+                and "ETag" not in resp.headers:
+            resp.add_etag()
+            resp = resp.make_conditional(request)
+    return resp
+
+# Кэш пользователей (см. user_cache.py): load_user и проверки роли без запроса в БД на каждый вызов
+USERS = user_cache.UserCache(ttl=_env_int("USER_CACHE_TTL_SECONDS", user_cache.DEFAULT_TTL_SECONDS))
+# Ключ сессии с версией учётных данных (меняется при смене пароля); нужен сессиям, где id ещё без версии
+SESSION_CRED_KEY = "_cred"
+
 # Пути к директориям
 IMAGES_DIR = ROOT_DIR / "images"
 AUDIO_DIR = ROOT_DIR / "audio"
@@ -316,6 +320,141 @@ FRONTEND_BUILD_DIR = ROOT_DIR / "frontend" / "build"
 FRONTEND_STATIC_DIR = FRONTEND_BUILD_DIR / "static"
 FRONTEND_INDEX = FRONTEND_BUILD_DIR / "index.html"
 
+# Папка для генерируемых файлов (уменьшенные картинки и т.п.). Можно вынести через SABOR_CACHE_DIR.
+# Всё внутри можно безопасно удалить — пересоздастся по запросу.
+CACHE_DIR = Path((os.getenv("SABOR_CACHE_DIR") or "").strip() or (ROOT_DIR / "backend" / "cache"))
+if not CACHE_DIR.is_absolute():
+    CACHE_DIR = (ROOT_DIR / CACHE_DIR).resolve()
+IMAGE_DERIVATIVES_DIR = CACHE_DIR / "images"
+# Пережатые копии картинок (optimize_images.py): исходники в images/ лежат в git и не меняются
+IMAGES_OPTIMIZED_DIR = CACHE_DIR / optimize_images.OPTIMIZED_DIR_NAME
+# Готовые офлайн-пакеты (ZIP) по версиям каталога
+OFFLINE_PACKS_DIR = CACHE_DIR / "offline-packs"
+# Иконки разделов и собранный из них спрайт
+ICONS_DIR = ROOT_DIR / "icons"
+SPRITES_DIR = CACHE_DIR / "sprites"
+
+# Манифест статики: все файлы из этих папок индексируются при старте (размер, mtime, хеш, MIME),
+# а дальше поиск файла = словарь в памяти. Папки перепроверяются раз в N секунд в фоновом потоке;
+# хеши общие для воркеров (файл в кэше), новый воркер не перечитывает все файлы.
+STATIC_MAX_AGE = _env_int("STATIC_MAX_AGE", 3600)
+STATIC_MANIFEST = StaticManifest(
+    {
+        "images": IMAGES_DIR,
+        "audio": AUDIO_DIR,
+        "menus": MENUS_DIR,
+        "trainer": TRAINER_DIR,
+        "frontend": FRONTEND_BUILD_DIR,
+        "sprites": SPRITES_DIR,
+        "images-optimized": IMAGES_OPTIMIZED_DIR,
+    },
+    refresh_interval=_env_int("STATIC_MANIFEST_REFRESH_SECONDS", 10),
+    hash_cache_path=CACHE_DIR / "static-hashes.json",
+)
+DERIVATIVES = image_derivatives.DerivativeCache(
+    IMAGE_DERIVATIVES_DIR,
+    max_workers=_env_int("IMAGE_DERIVATIVE_WORKERS", 2),
+)
+# Размеры и размытые заглушки картинок (по хешу файла), подмешиваются в image каталога
+IMAGE_META = image_derivatives.ImageMetaCache(CACHE_DIR / "image-meta.json")
+# Манифест предзагрузки для service worker (+ история версий для дельт)
+PRECACHE = precache.PrecacheIndex(STATIC_MANIFEST, CACHE_DIR / "precache")
+# Озвучка позиций: размеры/длительности MP3 (длительность кэшируется по хешу файла)
+AUDIO_INDEX = audio_index.AudioIndex()
+try:
+    STATIC_MANIFEST.refresh(force=True)
+except Exception as e:
+    app.logger.warning(f"Не удалось построить манифест статики: {e}")
+
+# Отдача "тела" файлов фронтовым веб-сервером (offload).
+# Тех-термин: **X-Accel-Redirect** (nginx) / **X-Sendfile** (Apache) — Flask только проверяет,
+# что файл есть и его можно отдать, а сами байты отправляет nginx/Apache без участия Python.
+# Так gunicorn-воркер не занят всё время, пока медленный телефон скачивает картинку/PDF.
+#
+# STATIC_OFFLOAD:
+#   (пусто) — как раньше, файл отдаёт Flask (по умолчанию)
+#   nginx   — заголовок X-Accel-Redirect: <STATIC_OFFLOAD_PREFIX>/<корень>/<путь>
+#   apache  — заголовок X-Sendfile: <абсолютный путь> (нужен mod_xsendfile)
+STATIC_OFFLOAD_MODE = (os.getenv("STATIC_OFFLOAD") or "").strip().lower()
+STATIC_OFFLOAD_PREFIX = "/" + (os.getenv("STATIC_OFFLOAD_PREFIX") or "/_protected").strip().strip("/")
+if STATIC_OFFLOAD_MODE not in ("", "nginx", "apache"):
+    app.logger.warning(f"Неизвестный STATIC_OFFLOAD={STATIC_OFFLOAD_MODE!r}, файлы будет отдавать Flask")
+    STATIC_OFFLOAD_MODE = ""
+
+# Ограничение частоты входа и обратной связи (см. rate_limit.py). Правило: "запросов/секунд".
+# RATE_LIMIT_STORE=sqlite — общие вёдра для всех gunicorn-воркеров (файл в CACHE_DIR).
+RATE_LIMIT_RULES = [
+    rate_limit.parse_rule("login_ip", os.getenv("RATE_LIMIT_LOGIN_IP"), "10/60"),
+    rate_limit.parse_rule("login_user", os.getenv("RATE_LIMIT_LOGIN_USER"), "5/300"),
+    rate_limit.parse_rule("guest_login_ip", os.getenv("RATE_LIMIT_GUEST_LOGIN_IP"), "20/60"),
+    rate_limit.parse_rule("feedback_ip", os.getenv("RATE_LIMIT_FEEDBACK_IP"), "5/600"),
+]
+# Сколько прокси стоит перед gunicorn (nginx = 1): столько адресов с конца X-Forwarded-For доверяем.
+# 0 — берём адрес соединения как есть (запуск без прокси, заголовки клиента не читаем).
+TRUSTED_PROXY_HOPS = _env_int("TRUSTED_PROXY_HOPS", 1)
+
+
+def _make_rate_limiter() -> rate_limit.RateLimiter:
+    enabled = os.getenv("RATE_LIMIT_ENABLED", "true").lower() != "false"
+    store = None
+    if (os.getenv("RATE_LIMIT_STORE") or "").strip().lower() == "sqlite":
+        try:
+            store = rate_limit.SQLiteStore(CACHE_DIR / "rate-limit.sqlite3")
+        except Exception as e:
+            app.logger.warning(f"Не удалось открыть общее хранилище лимитов, считаем в памяти: {e}")
+    return rate_limit.RateLimiter(RATE_LIMIT_RULES, store=store, enabled=enabled, logger=app.logger)
+
+
+RATE_LIMITER = _make_rate_limiter()
+
+# Прочитанные сообщения обратной связи старше N дней переезжают в архив (при старте воркера).
+# 0 — не архивировать автоматически (вручную: POST /api/admin/feedback/archive)
+FEEDBACK_ARCHIVE_DAYS = _env_int("FEEDBACK_ARCHIVE_DAYS", 90)
+
+# Очередь записи обратной связи (см. feedback_queue.py): запрос пишет в журнал и сразу отвечает,
+# в базу сообщения уходят пачками из фонового потока. Журнал — рядом с базой (его НЕЛЬЗЯ удалять,
+# в отличие от CACHE_DIR). FEEDBACK_QUEUE_ENABLED=false — писать в базу прямо в запросе, как раньше.
+FEEDBACK_QUEUE_ENABLED = os.getenv("FEEDBACK_QUEUE_ENABLED", "true").lower() != "false"
+FEEDBACK_SPOOL_DIR = Path((os.getenv("FEEDBACK_SPOOL_DIR") or "").strip() or (DB_PATH.parent / "feedback-spool"))
+
+
+def _flush_feedback_batch(records: list[dict]):
+    """Пачка из очереди -> одна транзакция (вызывается из фонового потока)."""
+    with app.app_context():
+        try:
+            feedback_inbox.write_batch(records)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+FEEDBACK_QUEUE = feedback_queue.FeedbackQueue(
+    FEEDBACK_SPOOL_DIR,
+    _flush_feedback_batch,
+    batch_size=_env_int("FEEDBACK_BATCH_SIZE", 100),
+    interval=_env_int("FEEDBACK_FLUSH_INTERVAL_MS", 500) / 1000.0,
+    logger=app.logger,
+)
+if FEEDBACK_QUEUE_ENABLED:
+    # Ничего не делает, если очередь в этом процессе так и не запускалась
+    atexit.register(FEEDBACK_QUEUE.close)
+
+
+def _start_feedback_queue():
+    """
+    Запустить очередь в ЭТОМ процессе: свой журнал, журналы упавших воркеров, поток записи.
+    Зовётся при прогреве воркера gunicorn (post_worker_init) и при первом сообщении (submit сам
+    запускает очередь) — но НЕ при импорте app: скрипты (migrate_to_db.py при деплое, create_admin.py,
+    reset_password.py) не должны забирать чужие журналы и поднимать поток записи.
+    """
+    if not FEEDBACK_QUEUE_ENABLED:
+        return
+    try:
+        FEEDBACK_QUEUE.start()
+    except OSError as e:
+        app.logger.warning(f"Очередь обратной связи не запущена ({e}), сообщения пишутся сразу в базу")
+
 # Путь к исходным данным меню (нужно, чтобы подмешивать поля, которых нет в БД)
 MENU_DB_PATH = ROOT_DIR / "data" / "menu-database.json"
 MENU_DB_BACKUP_PATH = ROOT_DIR / "frontend" / "public" / "data" / "menu-database.json"
@@ -326,23 +465,68 @@ _MENU_DB_BY_ID_CACHE_MTIME = None
 # Настройки "деплоя из админки" (по умолчанию выключено — это опасная операция)
 ADMIN_DEPLOY_ENABLED = os.getenv("ADMIN_DEPLOY_ENABLED", "false").lower() == "true"
 DEPLOY_ADMIN_TOKEN = os.getenv("DEPLOY_ADMIN_TOKEN", "").strip()
-_DEPLOY_STATE = {
-    "status": "idle",  # idle | running | done | error
-    "started_at": None,
-    "finished_at": None,
-    "step": None,
-    "log": [],
-    "error": None,
-}
-
-def _deploy_log(line: str):
-    try:
-        _DEPLOY_STATE["log"].append(str(line))
-        # ограничим лог, чтобы не раздувался
-        _DEPLOY_STATE["log"] = _DEPLOY_STATE["log"][-200:]
+# Что уже сделано прошлыми деплоями (хеши package-lock.json и каталога, собранный коммит), см. graceful_reload.py
+DEPLOY_STAMPS = graceful_reload.DeployStamps(CACHE_DIR / "deploy-state.json")
+# Метки "воркер прогрет" (ставятся хуками gunicorn.conf.py)
+WORKER_REGISTRY = graceful_reload.WorkerRegistry(CACHE_DIR / "workers")
+# Что запросить при прогреве нового воркера (через тестовый клиент: кэши заполняются как от живых запросов)
+WARMUP_PATHS = [
+    p.strip() for p in (os.getenv("WARMUP_PATHS") or "/api/dishes,/api/menus,/api/sections,/api/wines,/api/bar-items").split(",")
+    if p.strip()
+]
+
+# Фоновые задачи (импорт меню, оптимизация картинок, деплой): таблица задач — общий файл SQLite,
+# статус виден из любого воркера, см. jobs.py
+JOBS = jobs.JobRunner(
+    jobs.JobStore(Path(os.getenv("JOBS_DB_PATH") or CACHE_DIR / "jobs.sqlite3")),
+    io_workers=_env_int("JOBS_IO_WORKERS", 2),
+    cpu_workers=_env_int("JOBS_CPU_WORKERS", max(1, (os.cpu_count() or 2) // 2)),
+    context=app.app_context,
+    logger=app.logger,
+)
+atexit.register(JOBS.shutdown)
+# Сколько дней хранить завершённые задачи и их лог
+JOBS_KEEP_DAYS = _env_int("JOBS_KEEP_DAYS", 14)
+
+# Журнал событий деплоя для потока /api/admin/deploy/stream (общий для всех воркеров), см. deploy_events.py
+DEPLOY_EVENTS = deploy_events.DeployEventLog(CACHE_DIR / "deploy-events.jsonl")
+# Сколько секунд держать один поток SSE (потом браузер переподключится сам)
+DEPLOY_STREAM_MAX_SECONDS = _env_int("DEPLOY_STREAM_MAX_SECONDS", 300)
+
+def _deploy_log(job, line: str):
+    """Строка лога деплоя: в лог задачи (для статуса) и в журнал событий (для потока)."""
+    try:
+        job.log(str(line))
+        DEPLOY_EVENTS.append("log", {"line": str(line)})
     except Exception:
         pass
 
+def _deploy_set(job, state: dict, **fields):
+    """Сменить шаг/статус деплоя: прогресс задачи + событие "state" в поток."""
+    state.update(fields)
+    job.progress(step=state.get("step"), run_id=state.get("run_id"))
+    DEPLOY_EVENTS.append("state", dict(state))
+
+def _deploy_state() -> dict:
+    """Состояние последнего деплоя в прежнем виде (для /deploy/status и /deploy/job) — из таблицы задач."""
+    job = JOBS.store.latest("deploy")
+    if job is None:
+        return {
+            "status": "idle", "started_at": None, "finished_at": None, "step": None,
+            "log": [], "error": None, "run_id": None, "job_id": None,
+        }
+    progress = job.get("progress") or {}
+    return {
+        "status": "running" if job["status"] in jobs.ACTIVE_STATUSES else job["status"],
+        "started_at": job["started_at"] or job["created_at"],
+        "finished_at": job["finished_at"],
+        "step": progress.get("step"),
+        "log": JOBS.store.tail(job["id"], 200),
+        "error": job["error"],
+        "run_id": progress.get("run_id"),
+        "job_id": job["id"],
+    }
+
 def _require_admin():
     """
     Проверка прав: только авторизованный администратор.
@@ -351,11 +535,41 @@ def _require_admin():
     from flask_login import current_user
     if not current_user.is_authenticated:
         return jsonify({"error": "Not authenticated"}), 401
-    user = User.query.get(current_user.id) if current_user.id not in (0, "guest") else None
-    if not user or user.role != "администратор":
+    # current_user — CachedUser из load_user (или GuestUser): роль уже известна, в БД не ходим
+    if not getattr(current_user, "is_admin", False):
         return jsonify({"error": "Доступ запрещен"}), 403
     return None
 
+def _client_ip() -> str:
+    """
+    IP клиента. За nginx remote_addr — это 127.0.0.1, настоящий адрес — в X-Forwarded-For.
+    Берём адрес, который дописал НАШ прокси (TRUSTED_PROXY_HOPS с конца): начало заголовка
+    клиент может подставить сам.
+    """
+    if TRUSTED_PROXY_HOPS > 0:
+        forwarded = [p.strip() for p in (request.headers.get("X-Forwarded-For") or "").split(",") if p.strip()]
+        if len(forwarded) >= TRUSTED_PROXY_HOPS:
+            return forwarded[-TRUSTED_PROXY_HOPS]
+        real_ip = (request.headers.get("X-Real-IP") or "").strip()
+        if real_ip:
+            return real_ip
+    return request.remote_addr or "unknown"
+
+def _rate_limited(*hits):
+    """
+    Проверка лимитов: _rate_limited(("login_ip", ip), ("login_user", username)).
+    Возвращает (json, 429) с заголовком Retry-After, если запросов слишком много, иначе None.
+    """
+    retry_after = RATE_LIMITER.check(*hits)
+    if not retry_after:
+        return None
+    resp = jsonify({
+        "error": f"Слишком много попыток. Повторите через {retry_after} с.",
+        "retry_after": retry_after,
+    })
+    resp.headers["Retry-After"] = str(retry_after)
+    return resp, 429
+
 def _atomic_write_json(path: Path, data_obj):
     path.parent.mkdir(parents=True, exist_ok=True)
     tmp = path.with_suffix(path.suffix + ".tmp")
@@ -367,6 +581,7 @@ def _atomic_write_json(path: Path, data_obj):
 def _dedupe_menu_items(items: list[dict]):
     """
     Нормализует id (str + strip) и убирает дубликаты по id (оставляет последнюю запись).
+    HTML-поля (contains, features, contains-en) приводятся к каноническому виду — см. html_normalizer.py.
     """
     unique_by_id = {}
     duplicates = 0
@@ -383,6 +598,7 @@ def _dedupe_menu_items(items: list[dict]):
             skipped_no_id += 1
             continue
         item["id"] = norm_id
+        html_normalizer.normalize_item_html(item)
         if norm_id in unique_by_id:
             duplicates += 1
         unique_by_id[norm_id] = item
@@ -592,34 +808,301 @@ def _load_menu_db_by_id():
     _MENU_DB_BY_ID_CACHE = db_map
     return _MENU_DB_BY_ID_CACHE
 
-def _enrich_wine_dict(wine_dict: dict) -> dict:
+# ========== КАТАЛОГ (снимок в памяти) ==========
+# Тех-термин: **снимок каталога** — уже смёрдженный список (БД + JSON), который
+# собирается один раз и живёт, пока не изменятся исходные файлы.
+
+def _catalog_fingerprint():
+    """
+    Дешёвый отпечаток исходных данных: mtime + размер обоих JSON.
+    Все записи из админки меняют JSON (а после commit в БД мы "трогаем" файл),
+    поэтому другие gunicorn-воркеры тоже увидят изменение.
+    Плюс версии папок images/audio в манифесте: каталог содержит размеры картинок и озвучку.
+    """
+    fp = []
+    for path in (MENU_DB_PATH, MENU_DB_BACKUP_PATH):
+        try:
+            st = path.stat()
+            fp.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            fp.append(None)
+    fp.append(STATIC_MANIFEST.root_version('images'))
+    fp.append(STATIC_MANIFEST.root_version('audio'))
+    return tuple(fp)
+
+
+def _image_rel_from_src(src: str) -> str | None:
+    """
+    "../images/wine/a.webp" -> "wine/a.webp" (путь внутри папки images).
+    Для внешних ссылок и путей не из images возвращает None.
+    """
+    path = str(src or '').split('?', 1)[0].strip()
+    while path.startswith('../') or path.startswith('./'):
+        path = path.split('/', 1)[1]
+    path = path.lstrip('/')
+    if not path.startswith('images/'):
+        return None
+    return path[len('images/'):] or None
+
+
+def _with_image_variants(item: dict) -> dict:
+    """
+    Дополняет image вычисляемыми полями:
+    - width/height — реальные размеры (клиент заранее резервирует место под картинку)
+    - placeholder — крошечная размытая заглушка (data URI), видна сразу, пока грузится фото
+    - srcset — ссылки на уменьшенные копии (?w=...&v=<хеш файла>); браузер сам выберет ширину,
+      а ?v делает ссылку "неизменяемой"
+    """
+    image = item.get('image')
+    if not isinstance(image, dict) or not image_derivatives.is_available():
+        return item
+    src = str(image.get('src') or '')
+    rel = _image_rel_from_src(src)
+    entry = STATIC_MANIFEST.lookup('images', rel) if rel else None
+    if not entry or not image_derivatives.can_resize(entry.path):
+        return item
+    image = dict(image)
+    meta = IMAGE_META.get(entry.path, entry.etag)
+    if meta:
+        image['width'] = meta['width']
+        image['height'] = meta['height']
+        image['placeholder'] = meta['placeholder']
+
+    base = src.split('?', 1)[0]
+    version = entry.etag[:12]
+    # Копии шире оригинала не нужны (сервер всё равно отдаст оригинал) — последней ставим саму картинку
+    widths = [w for w in image_derivatives.ALLOWED_WIDTHS if not meta or w < meta['width']]
+    candidates = [f"{base}?w={w}&v={version} {w}w" for w in widths]
+    if meta:
+        candidates.append(f"{base}?v={version} {meta['width']}w")
+    image['srcset'] = ", ".join(candidates)
+    item = dict(item)
+    item['image'] = image
+    return item
+
+
+def _ensure_icon_sprite() -> dict | None:
+    """Собирает спрайт иконок, если иконки изменились; иначе просто читает карту координат."""
+    try:
+        return sprites.build_icon_sprite(ICONS_DIR, SPRITES_DIR)
+    except Exception as e:
+        app.logger.warning(f"Не удалось собрать спрайт иконок: {e}")
+        return sprites.load_sprite_map(SPRITES_DIR)
+
+
+def _with_section_icon_sprite(item: dict, sprite_map: dict | None) -> dict:
     """
-    Подмешивает в ответ поля из menu-database.json, которых может не быть в БД.
-    БД остаётся источником правды; мы добавляем только отсутствующие ключи.
+    Если section_icon.src указывает на иконку из спрайта — добавляет section_icon.sprite
+    с координатами. Исходный src не трогаем (старые клиенты продолжают работать).
     """
-    if not wine_dict or not wine_dict.get("id"):
-        return wine_dict
+    icon = item.get('section_icon')
+    if not sprite_map or not isinstance(icon, dict) or not icon.get('src'):
+        return item
+    name = str(icon['src']).split('?', 1)[0].rstrip('/').rsplit('/', 1)[-1]
+    coords = sprite_map.get('icons', {}).get(name)
+    if not coords:
+        return item
+    icon = dict(icon)
+    icon['sprite'] = {
+        'url': f"/sprites/{sprite_map['image']}",
+        'url2x': f"/sprites/{sprite_map['image2x']}",
+        'sheet_width': sprite_map['width'],
+        'sheet_height': sprite_map['height'],
+        **coords,
+    }
+    item = dict(item)
+    item['section_icon'] = icon
+    return item
+
+
+def _with_audio(item: dict, audio_entries: dict) -> dict:
+    """
+    Добавляет item['audio'] = {"en": {url, size, duration, hash, source}}, если озвучка нашлась.
+    url уже с ?v=<хеш>, так что клиенту не нужно собирать путь из "../audio/...".
+    """
+    found = AUDIO_INDEX.resolve(item, audio_entries)
+    if not found:
+        return item
+    item = dict(item)
+    item['audio'] = found
+    return item
 
-    full = _load_menu_db_by_id().get(wine_dict["id"])
-    if not full:
-        return wine_dict
 
-    # Поля, которые нужны фронту для карточки вина
-    extra_keys = [
-        "origin",
-        "region",
-        "producer",
-        "grapeVarieties",
-        "features",
-        "category",
-        "alcoholContent",
+def _build_catalog_items() -> list[dict]:
+    """
+    Полный каталог для снимка: БД + JSON, плюс вычисляемые поля
+    (размеры/заглушки/srcset картинок, координаты иконок в спрайте, озвучка).
+    """
+    sprite_map = _ensure_icon_sprite()
+    audio_entries = STATIC_MANIFEST.entries('audio')
+    items = [
+        _with_audio(_with_section_icon_sprite(_with_image_variants(it), sprite_map), audio_entries)
+        for it in _get_all_dishes_dicts_with_json_fallback()
     ]
+    try:
+        IMAGE_META.flush()
+    except OSError as e:
+        app.logger.warning(f"Не удалось сохранить кэш метаданных картинок: {e}")
+    return items
+
+
+CATALOG = CatalogStore(_build_catalog_items, _catalog_fingerprint)
+# Стоп-лист отдельно от каталога (см. availability.py): переключение не пересобирает снимок
+AVAILABILITY = availability.AvailabilityStore(CACHE_DIR / "availability.version")
+
+
+def _catalog_changed():
+    """
+    Вызывать ПОСЛЕ commit в БД, когда поменялись позиции меню.
+    - сбрасываем снимок в этом воркере
+    - обновляем mtime JSON, чтобы остальные воркеры тоже пересобрали снимок
+      (иначе они могли успеть собрать снимок "между" записью JSON и commit в БД)
+    """
+    try:
+        if MENU_DB_PATH.exists():
+            os.utime(MENU_DB_PATH, None)
+    except OSError:
+        pass
+    CATALOG.invalidate()
+
+
+def _catalog_versions() -> tuple[str, dict]:
+    """
+    (версия каталога, {id: версия позиции}) — для рассылки изменений (catalog_events.py).
+    Стоп-лист входит в версии: снятая с продажи позиция приходит клиентам как "изменённая".
+    """
+    # Поток рассылки работает вне запроса, а сборка снимка читает БД
+    with app.app_context():
+        snapshot = CATALOG.get()
+        stop = AVAILABILITY.current()
+    if not stop.items:
+        return f"{snapshot.version}.{stop.version}", snapshot.item_versions
+    item_versions = dict(snapshot.item_versions)
+    for item_id in stop.items:
+        if item_id in item_versions:
+            item_versions[item_id] += stop.item_tag(item_id)
+    return f"{snapshot.version}.{stop.version}", item_versions
+
+
+# Один "вещатель" изменений каталога на воркер: GET /api/events
+CATALOG_EVENTS = catalog_events.CatalogBroadcaster(
+    _catalog_versions,
+    interval=_env_int("EVENTS_CHECK_INTERVAL_MS", 1000) / 1000.0,
+    max_listeners=_env_int("EVENTS_MAX_CLIENTS", 24),
+    logger=app.logger,
+)
+# Сколько секунд держать одно подключение /api/events (потом браузер переподключится сам)
+EVENTS_STREAM_MAX_SECONDS = _env_int("EVENTS_STREAM_MAX_SECONDS", 600)
+
+
+def _split_list_arg(name: str, sep: str | None = None) -> tuple[str, ...]:
+    """
+    Читает query-параметр, который может повторяться (?menu=A&menu=B),
+    а если задан sep — ещё и через разделитель (?fields=id,title).
+    Пустые значения и дубли отбрасываем, порядок сохраняем.
+    """
+    out = []
+    for raw in request.args.getlist(name):
+        parts = str(raw).split(sep) if sep else [raw]
+        for part in parts:
+            val = part.strip()
+            if val and val not in out:
+                out.append(val)
+    return tuple(out)
+
+
+def _project_catalog_items(items: list[dict], fields: tuple[str, ...], menus: tuple[str, ...], sections: tuple[str, ...],
+                           view: list[dict] | None = None, stop_list=None) -> list[dict]:
+    """
+    Проекция каталога:
+    - menus/sections: оставляем только позиции нужных меню/разделов
+    - fields: оставляем только перечисленные поля (id есть всегда)
+    - view: те же позиции в другом представлении (язык/формат текстов), в том же порядке.
+      Фильтруем всё равно по items: ?menu= всегда русское название, даже при ?lang=en.
+    - stop_list: наложить доступность (available/stop) — есть всегда, даже при fields
+    Исходные dict не меняем — это общий снимок.
+    """
+    menu_set = set(menus)
+    section_set = set(sections)
+    out = []
+    for idx, it in enumerate(items):
+        if menu_set and _normalize_menu_value(it.get("menu")) not in menu_set:
+            continue
+        if section_set and str(it.get("section") or "").strip() not in section_set:
+            continue
+        shown = view[idx] if view is not None else it
+        if fields:
+            shown = {k: shown[k] for k in fields if k in shown}
+        out.append(stop_list.overlay(shown) if stop_list is not None else shown)
+    return out
+
+
+def _format_arg(raw=None) -> str:
+    """
+    Какое представление текстовых полей нужно клиенту (?format=):
+    raw — как в базе (по умолчанию), html — безопасный HTML, text — простой текст (для поиска).
+    Неизвестное значение -> ValueError (ответим 400).
+    """
+    fmt = str((request.args.get('format') if raw is None else raw) or 'raw').strip().lower()
+    if fmt not in rich_text.FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(rich_text.FORMATS)}")
+    return fmt
+
+
+def _lang_arg(raw=None) -> str:
+    """
+    Язык ответа (?lang=ru|en). ru — позиции как есть; en — переводы в обычных полях
+    (см. i18n_projection.py). Неизвестный язык -> ValueError (ответим 400).
+    """
+    lang = str((request.args.get('lang') if raw is None else raw) or i18n_projection.DEFAULT_LANG).strip().lower()
+    if lang not in i18n_projection.LANGS:
+        raise ValueError(f"lang must be one of: {', '.join(i18n_projection.LANGS)}")
+    return lang
+
+
+def _catalog_view(snapshot, fmt: str, lang: str = i18n_projection.DEFAULT_LANG) -> tuple[list[dict], dict[str, dict]]:
+    """
+    (items, by_id) снимка на нужном языке и в нужном представлении текстовых полей.
+    Каждое сочетание считается один раз на версию каталога (а тексты — один раз на содержимое).
+    """
+    if fmt == 'raw' and lang == i18n_projection.DEFAULT_LANG:
+        return snapshot.items, snapshot.by_id
+
+    def _build():
+        shown = {
+            id(it): rich_text.render_item(i18n_projection.localize_item(it, lang), fmt)
+            for it in snapshot.items
+        }
+        return (
+            [shown[id(it)] for it in snapshot.items],
+            {item_id: shown[id(it)] for item_id, it in snapshot.by_id.items()},
+        )
+
+    return snapshot.derived(('view', fmt, lang), _build)
+
+
+def _view_etag(etag: str | None, fmt: str, lang: str) -> str | None:
+    """ETag позиции в другом представлении: "<версия позиции>-html-en" и т.п."""
+    if not etag:
+        return etag
+    suffix = "".join(
+        f"-{part}" for part, default in ((fmt, 'raw'), (lang, i18n_projection.DEFAULT_LANG)) if part != default
+    )
+    return etag + suffix
 
-    for k in extra_keys:
-        if k not in wine_dict and k in full:
-            wine_dict[k] = full.get(k)
 
-    return wine_dict
+def _catalog_json_response(snapshot, key, producer, etag: str | None = None):
+    """
+    Отдаёт готовые байты из кэша снимка + ETag.
+    Если клиент прислал тот же ETag (If-None-Match) — вернётся 304 без тела.
+    """
+    body = snapshot.cached_bytes(key, producer)
+    resp = app.response_class(body, mimetype="application/json")
+    resp.set_etag(etag or f"{snapshot.version}-{short_hash(repr(key).encode('utf-8'), 8)}")
+    resp.headers["X-Catalog-Version"] = snapshot.version
+    # no-cache = "можно хранить, но перед использованием спроси сервер" (дёшево благодаря ETag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp.make_conditional(request)
 
 # Класс для гостевого пользователя (не сохраняется в базе данных)
 class GuestUser(UserMixin):
@@ -673,7 +1156,10 @@ class GuestUser(UserMixin):
 # Загрузка пользователя (для Flask-Login)
 @login_manager.user_loader
 def load_user(user_id):
-    """Загружает пользователя по ID из базы данных"""
+    """
+    Загружает пользователя по ID: из кэша USERS, а при промахе — из базы данных.
+    Flask-Login вызывает это один раз на запрос (дальше current_user уже в памяти).
+    """
     try:
         # Проверяем, что user_id не пустой
         if not user_id:
@@ -681,9 +1167,26 @@ def load_user(user_id):
         # Если ID = 'guest' или '0', это гость
         if str(user_id) == 'guest' or str(user_id) == '0':
             return GuestUser()
-        # Иначе пытаемся преобразовать в int и загрузить из базы данных
-        user_id_int = int(user_id)
-        return User.query.get(user_id_int)
+        # Иначе "<id>:<версия учётных данных>" (см. CachedUser.get_id) — загружаем из кэша/базы данных
+        user_id_int, known = user_cache.split_login_id(user_id)
+        user = USERS.get(user_id_int, User.query.get)
+        if user is None:
+            return None
+
+        if known is None:
+            # Старая сессия (id без версии): версия лежит рядом в сессии
+            from flask import session
+            known = session.get(SESSION_CRED_KEY)
+        if known is None:
+            # Ни в id, ни в сессии версии нет (старая remember-cookie) — проверить нечем, просим войти заново
+            return None
+        if known != user.cred_version:
+            # Пароль могли сменить в другом воркере — перечитываем один раз
+            USERS.invalidate(user_id_int)
+            user = USERS.get(user_id_int, User.query.get)
+            if user is None or known != user.cred_version:
+                return None  # пароль сменили: старая сессия больше не действует
+        return user
     except (ValueError, TypeError):
         # Если user_id не является числом, возвращаем None
         return None
@@ -765,42 +1268,199 @@ def get_menu_json():
 
 @app.route('/api/dishes', methods=['GET'])
 def get_dishes():
-    """Возвращает все позиции (БД + JSON fallback)"""
+    """
+    Возвращает позиции (БД + JSON fallback).
+
+    Параметры (все необязательные):
+    - fields=id,title,section,image — отдать только эти поля (id есть всегда).
+      Для списков меню этого достаточно; "тяжёлые" поля (contains, i18n, reference_info)
+      экран деталей берёт через /api/dishes/<id>.
+    - menu=... (можно несколько раз) — только позиции этих меню
+    - section=... (можно несколько раз) — только позиции этих разделов
+    - format=raw|html|text — представление description/contains/features/reference_info
+      (и их -en версий): как в базе, готовый безопасный HTML или простой текст для поиска
+    - lang=ru|en — язык: переводы в обычных полях (title, description ...), без блока i18n;
+      где перевода нет — русский текст (имена таких полей в "fallback")
+    """
     try:
+        try:
+            fmt = _format_arg()
+            lang = _lang_arg()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         # Важно: в проде бывает ситуация, когда menu-database.json уже обновлён,
         # а БД ещё не мигрирована. Тогда админка видит "обрезанный" список.
         # KISS-решение: отдаём объединённый список (БД как источник правды + JSON как фолбэк).
-        return jsonify(_get_all_dishes_dicts_with_json_fallback())
+        snapshot = CATALOG.get()
+        fields = _split_list_arg('fields', ',')
+        if fields:
+            fields = ('id',) + tuple(f for f in fields if f != 'id')
+        menus = _split_list_arg('menu')
+        sections = _split_list_arg('section')
+        # Стоп-лист накладывается поверх снимка: его версия — часть ключа (снимок не пересобирается)
+        stop = AVAILABILITY.current()
+        key = ('dishes', fields, tuple(sorted(menus)), tuple(sorted(sections)), fmt, lang, stop.version)
+        return _catalog_json_response(
+            snapshot,
+            key,
+            lambda: _project_catalog_items(
+                snapshot.items, fields, menus, sections, view=_catalog_view(snapshot, fmt, lang)[0], stop_list=stop,
+            ),
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Ограничение на размер пачки: защищает от запросов "дай всё по одному id"
+BATCH_MAX_IDS = 500
+
+@app.route('/api/dishes/batch', methods=['GET', 'POST'])
+def get_dishes_batch():
+    """
+    Возвращает сразу несколько позиций по id (блюда, вина, бар — всё из одного каталога).
+
+    - GET  /api/dishes/batch?ids=0001,0002
+    - POST /api/dishes/batch  {"ids": ["0001", "0002", ...]}  (для длинных списков)
+
+    Ответ: {"version": ..., "items": {id: позиция | null}, "not_found": [id, ...]}
+    null в items = такой позиции нет (например, её удалили, а в избранном она осталась).
+    ?format=raw|html|text и ?lang=ru|en (или "format"/"lang" в теле POST) — как в /api/dishes.
+    """
+    try:
+        if request.method == 'POST':
+            data = request.get_json(silent=True)
+            raw_ids = data.get('ids') if isinstance(data, dict) else None
+            if not isinstance(raw_ids, list):
+                return jsonify({'error': 'Payload must be an object with "ids" list'}), 400
+            raw_format = data.get('format') or request.args.get('format')
+            raw_lang = data.get('lang') or request.args.get('lang')
+        else:
+            raw_ids = list(_split_list_arg('ids', ','))
+            raw_format = raw_lang = None
+        try:
+            fmt = _format_arg(raw_format)
+            lang = _lang_arg(raw_lang)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        ids = []
+        for raw in raw_ids:
+            norm = str(raw or '').strip()
+            if norm and norm not in ids:
+                ids.append(norm)
+        if not ids:
+            return jsonify({'error': 'ids are required'}), 400
+        if len(ids) > BATCH_MAX_IDS:
+            return jsonify({'error': f'Too many ids (max {BATCH_MAX_IDS})'}), 400
+
+        snapshot = CATALOG.get()
+        stop = AVAILABILITY.current()
+        # ETag по версиям именно запрошенных позиций: правка "чужого" блюда его не меняет
+        etag = short_hash(
+            (f"{fmt}|{lang}|" + "|".join(
+                f"{i}:{snapshot.item_versions.get(i, '-')}{stop.item_tag(i)}" for i in ids
+            )).encode('utf-8')
+        )
+        if request.method == 'GET' and request.if_none_match.contains(etag):
+            resp = app.response_class(status=304)
+            resp.set_etag(etag)
+            return resp
+
+        by_id = _catalog_view(snapshot, fmt, lang)[1]
+        items = {i: stop.overlay(by_id.get(i)) for i in ids}
+        body = dumps_bytes({
+            'version': snapshot.version,
+            'items': items,
+            'not_found': [i for i, it in items.items() if it is None],
+        })
+        resp = app.response_class(body, mimetype='application/json')
+        resp.set_etag(etag)
+        resp.headers['X-Catalog-Version'] = snapshot.version
+        resp.headers['Cache-Control'] = 'no-cache'
+        return resp
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/dishes/<dish_id>', methods=['GET'])
 def get_dish(dish_id):
-    """Возвращает одну позицию по ID (с fallback на JSON)"""
+    """Возвращает одну позицию по ID (с fallback на JSON). ?format= и ?lang= — как в /api/dishes"""
     try:
         dish_id_norm = str(dish_id or "").strip()
         if not dish_id_norm:
             return jsonify({'error': 'Dish not found'}), 404
+        try:
+            fmt = _format_arg()
+            lang = _lang_arg()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Снимок каталога уже содержит и позиции из БД (смёрдженные с JSON), и JSON-фолбэк
+        snapshot = CATALOG.get()
+        item = _catalog_view(snapshot, fmt, lang)[1].get(dish_id_norm)
+        if item is None:
+            return jsonify({'error': 'Dish not found'}), 404
+        stop = AVAILABILITY.current()
+        stop_tag = stop.item_tag(dish_id_norm)
+        return _catalog_json_response(
+            snapshot,
+            ('dish', dish_id_norm, fmt, lang, stop_tag),
+            lambda: stop.overlay(item),
+            etag=_view_etag(snapshot.item_versions.get(dish_id_norm), fmt, lang) + stop_tag,
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        # 1) Пытаемся найти в БД
-        dish = Dish.query.get(dish_id_norm)
-        if dish:
-            base = dish.to_dict()
-            full = _load_menu_db_by_id().get(dish_id_norm)
-            return jsonify(_deep_merge_dicts(full or {}, base))
-
-        # 2) Фолбэк: ищем в JSON по id
-        from_json = _load_menu_db_by_id().get(dish_id_norm)
-        if isinstance(from_json, dict):
-            return jsonify(from_json)
+@app.route('/api/events', methods=['GET'])
+def catalog_events_stream():
+    """
+    Поток изменений каталога (SSE).
+    - "hello" {version} — сразу после подключения;
+    - "catalog" {version, changed: [id...], removed: [id...], full} — после каждой правки;
+      full=true — пропущено слишком много, перезапросите каталог целиком.
+    При переподключении браузер сам присылает Last-Event-ID (версию) и получает только пропущенное.
+    """
+    try:
+        last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+        stream = CATALOG_EVENTS.stream(last_event_id, max_seconds=EVENTS_STREAM_MAX_SECONDS)
+    except catalog_events.TooManyListeners:
+        resp = jsonify({'error': 'Too many event listeners, retry later'})
+        resp.status_code = 503
+        resp.headers['Retry-After'] = '30'
+        return resp
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    return Response(
+        stream,
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-store",
+            # nginx: не копить ответ в буфере, отдавать события сразу
+            "X-Accel-Buffering": "no",
+        },
+    )
 
-        return jsonify({'error': 'Dish not found'}), 404
+@app.route('/api/availability', methods=['GET'])
+def get_availability():
+    """
+    Стоп-лист целиком: {"version": N, "stop_list": [{id, note, stopped_at}, ...]} (кто поставил — только в админских ответах).
+    Маленький ответ: клиент может держать его отдельно и накладывать на закэшированный каталог.
+    """
+    try:
+        stop = AVAILABILITY.current()
+        resp = app.response_class(dumps_bytes(stop.to_dict()), mimetype='application/json')
+        resp.set_etag(f"stop-{stop.version}")
+        resp.headers['X-Availability-Version'] = str(stop.version)
+        # Общий кэш (nginx) тоже обязан перепроверять: стоп-лист меняется посреди смены
+        resp.headers['Cache-Control'] = 'public, no-cache'
+        return resp.make_conditional(request)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/menus', methods=['GET'])
 def get_menus():
-    """Возвращает список всех меню (уникальные значения поля 'menu')"""
+    """
+    Возвращает список всех меню (уникальные значения поля 'menu').
+    Без ?lang: это ключи фильтра ?menu= (всегда по-русски); названия на языке — в поле menu позиций.
+    """
     try:
         menu_set = set()
 
@@ -843,23 +1503,119 @@ def get_sections():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _offload_static_entry(entry):
+    """
+    Ответ без тела: только заголовки + указание веб-серверу, какой файл отдать.
+    Проверку ETag (304) делаем сами, а Range/отправку байтов — веб-сервер.
+    """
+    resp = app.response_class(mimetype=entry.mime or 'application/octet-stream')
+    resp.set_etag(entry.etag)
+    resp.last_modified = entry.mtime_ns / 1e9
+    resp = resp.make_conditional(request)
+    if resp.status_code == 304:
+        # Важно: на 304 НЕ ставим X-Accel-Redirect, иначе nginx отдаст файл целиком
+        return resp
+    if STATIC_OFFLOAD_MODE == 'nginx':
+        resp.headers['X-Accel-Redirect'] = quote(f"{STATIC_OFFLOAD_PREFIX}/{entry.root}/{entry.rel}")
+    else:
+        # mod_xsendfile по умолчанию раскодирует %XX (XSendFileUnescape On) — так проходят кириллические имена
+        resp.headers['X-Sendfile'] = quote(str(entry.path))
+    return resp
+
+def _send_static_entry(entry, immutable_hint: bool = False):
+    """
+    Отдаёт файл из манифеста с сильным ETag (хеш содержимого) и заголовками кэширования.
+    - URL с ?v=<хеш файла> (или immutable_hint) -> кэш "навсегда" (immutable)
+    - HTML -> no-cache (всегда сверяемся с сервером, это "точка входа")
+    - остальное -> кэш на STATIC_MAX_AGE секунд, дальше перепроверка по ETag
+    """
+    immutable = immutable_hint or STATIC_MANIFEST.is_fingerprint_match(entry, request.args.get('v'))
+    if STATIC_OFFLOAD_MODE:
+        resp = _offload_static_entry(entry)
+    else:
+        try:
+            resp = send_file(
+                str(entry.path),
+                mimetype=entry.mime,
+                etag=entry.etag,
+                conditional=True,
+            )
+        except FileNotFoundError:
+            # Файл удалили после последнего сканирования: убираем запись, папки пересканируются в фоне
+            STATIC_MANIFEST.forget(entry)
+            return jsonify({'error': f'File not found: {entry.rel}'}), 404
+    if immutable:
+        resp.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    elif (entry.mime or '').startswith('text/html'):
+        resp.headers['Cache-Control'] = 'no-cache'
+    else:
+        resp.headers['Cache-Control'] = f'public, max-age={STATIC_MAX_AGE}'
+    return resp
+
+def _image_derivative_entry(entry, width: int, fmt: str | None = None):
+    """
+    Возвращает StaticEntry уменьшенной копии (формат — fmt или по Accept) или None,
+    если уменьшать не нужно/нельзя. Ошибки генерации не роняют запрос — отдадим оригинал.
+    """
+    if not image_derivatives.is_available() or not image_derivatives.can_resize(entry.path):
+        return None
+    fmt = fmt or image_derivatives.negotiate_format(request.headers.get('Accept'))
+    try:
+        path = DERIVATIVES.get(entry.path, entry.etag, width, fmt)
+    except Exception as e:
+        app.logger.warning(f"Не удалось сделать копию {entry.rel} (w={width}, {fmt}): {e}")
+        return None
+    if path == entry.path:
+        # Исходник и так не шире запрошенного — отдаём его
+        return None
+    st = path.stat()
+    return StaticEntry(
+        'derivatives',
+        path,
+        path.relative_to(IMAGE_DERIVATIVES_DIR).as_posix(),
+        st.st_size,
+        st.st_mtime_ns,
+        # Начинается с хеша исходника: ?v=<хеш исходника> остаётся "неизменяемой" ссылкой
+        f"{entry.etag}-{width}{fmt}",
+        image_derivatives.FORMAT_MIME[fmt],
+    )
+
+def _optimized_image_entry(entry):
+    """
+    Пережатая копия картинки (если optimize_images её сделал для ЭТОГО содержимого исходника), иначе сам entry.
+    ETag начинается с хеша исходника: ?v=<хеш исходника> остаётся "неизменяемой" ссылкой.
+    """
+    if entry.root != 'images':
+        return entry
+    # Без поиска на диске: копии появляются только после оптимизации, а она сама обновляет манифест
+    copy = STATIC_MANIFEST.entries('images-optimized').get(optimize_images.optimized_rel(entry.rel, entry.etag))
+    if copy is None:
+        return entry
+    return copy._replace(etag=f"{entry.etag}-o")
+
 @app.route('/images/<path:filename>')
 def serve_image(filename):
-    """Отдаёт изображения из папки images"""
+    """
+    Отдаёт изображения из папки images.
+    ?w=320 — уменьшенная копия (ширина прилипает к одной из image_derivatives.ALLOWED_WIDTHS).
+    """
     try:
-        guessed_mime, _ = mimetypes.guess_type(filename)
-
         # 1) Основной источник: корневая папка проекта /images (используется для изображений блюд и т.п.)
-        if IMAGES_DIR.exists() and (IMAGES_DIR / filename).exists():
-            return send_from_directory(str(IMAGES_DIR), filename, mimetype=guessed_mime)
-
         # 2) Фолбэк: изображения из React сборки (frontend/build/images/*)
         # Это нужно, потому что в UI есть обложки меню (main-menu-head.webp и др.), которые лежат именно там.
-        build_images_dir = FRONTEND_BUILD_DIR / "images"
-        if build_images_dir.exists() and (build_images_dir / filename).exists():
-            return send_from_directory(str(build_images_dir), filename, mimetype=guessed_mime)
-
-        return jsonify({'error': 'Image not found'}), 404
+        entry = STATIC_MANIFEST.lookup('images', filename) or STATIC_MANIFEST.lookup('frontend', f'images/{filename}')
+        if not entry:
+            return jsonify({'error': 'Image not found'}), 404
+
+        width = image_derivatives.snap_width(request.args.get('w')) if request.args.get('w') else None
+        if width:
+            derivative = _image_derivative_entry(entry, width)
+            if derivative:
+                resp = _send_static_entry(derivative)
+                # Формат зависит от Accept — кэши (браузер, nginx) должны это учитывать
+                resp.vary.add('Accept')
+                return resp
+        return _send_static_entry(_optimized_image_entry(entry))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -867,11 +1623,10 @@ def serve_image(filename):
 def serve_audio(filename):
     """Отдаёт аудиофайлы из папки audio"""
     try:
-        audio_file = AUDIO_DIR / filename
-        if AUDIO_DIR.exists() and audio_file.exists() and audio_file.is_file():
-            return send_from_directory(str(audio_file.parent), audio_file.name)
-        else:
-            return jsonify({'error': f'Audio file not found: {filename}'}), 404
+        entry = STATIC_MANIFEST.lookup('audio', filename)
+        if entry:
+            return _send_static_entry(entry)
+        return jsonify({'error': f'Audio file not found: {filename}'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -879,18 +1634,11 @@ def serve_audio(filename):
 def serve_menu_html(filename):
     """Отдаёт HTML файлы и PDF из папки frontend/public/menus"""
     try:
-        # Проверяем, что файл существует в директории меню
-        file_path = MENUS_DIR / filename
-        if MENUS_DIR.exists() and file_path.exists() and file_path.is_file():
-            # Определяем MIME-тип на основе расширения файла
-            if filename.endswith('.pdf'):
-                return send_from_directory(str(MENUS_DIR), filename, mimetype='application/pdf')
-            elif filename.endswith('.html'):
-                return send_from_directory(str(MENUS_DIR), filename, mimetype='text/html')
-            else:
-                return send_from_directory(str(MENUS_DIR), filename)
-        else:
-            return jsonify({'error': f'File not found: {filename}'}), 404
+        # MIME-тип (pdf/html) уже определён в манифесте по расширению файла
+        entry = STATIC_MANIFEST.lookup('menus', filename)
+        if entry:
+            return _send_static_entry(entry)
+        return jsonify({'error': f'File not found: {filename}'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -898,75 +1646,467 @@ def serve_menu_html(filename):
 def serve_trainer_html(filename):
     """Отдаёт HTML файлы из папки frontend/public/trainer"""
     try:
-        # Проверяем, что файл существует в директории тренажера
-        file_path = TRAINER_DIR / filename
-        if TRAINER_DIR.exists() and file_path.exists() and file_path.is_file():
-            if filename.endswith('.html'):
-                return send_from_directory(str(TRAINER_DIR), filename, mimetype='text/html')
-            else:
-                return send_from_directory(str(TRAINER_DIR), filename)
-        else:
-            return jsonify({'error': f'File not found: {filename}'}), 404
+        entry = STATIC_MANIFEST.lookup('trainer', filename)
+        if entry:
+            return _send_static_entry(entry)
+        return jsonify({'error': f'File not found: {filename}'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# ========== API ДЛЯ ВИН ==========
-
-@app.route('/api/wines', methods=['GET'])
-def get_wines():
-    """Возвращает все вина (меню содержит 'вино' / 'wine' и т.п.)"""
+@app.route('/sprites/<path:filename>')
+def serve_sprite(filename):
+    """Отдаёт спрайт иконок (имя содержит хеш — кэшируется навсегда) и карту sprite.json"""
     try:
-        return jsonify(_get_wines_dicts())
+        entry = STATIC_MANIFEST.lookup('sprites', filename)
+        if entry:
+            return _send_static_entry(entry, immutable_hint=entry.rel.startswith('icons-'))
+        return jsonify({'error': f'File not found: {filename}'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/wines/category/<category>', methods=['GET'])
-def get_wines_by_category(category):
-    """Возвращает вина по категории (by-glass/coravin/half-bottles)"""
+@app.route('/api/audio/manifest', methods=['GET'])
+def get_audio_manifest():
+    """
+    Список файлов озвучки для предзагрузки (service worker качает только нужное меню).
+
+    - ?menu=<название меню> (можно несколько) — только позиции этих меню
+    Ответ: {version, count, total_bytes, total_duration, files: [{url, size, duration, hash, lang, ids}]}
+    Один файл может озвучивать несколько позиций (ids) — в списке он один раз.
+    """
     try:
-        wines = _get_wines_dicts()
-        filtered = [w for w in wines if isinstance(w, dict) and w.get("category") == category]
-        return jsonify(filtered)
+        menus = _split_list_arg('menu')
+        snapshot = CATALOG.get()
+
+        def _produce():
+            files: dict[str, dict] = {}
+            for it in snapshot.items:
+                if menus and _normalize_menu_value(it.get('menu')) not in menus:
+                    continue
+                for lang, meta in (it.get('audio') or {}).items():
+                    row = files.get(meta['url'])
+                    if row is None:
+                        row = files[meta['url']] = {
+                            'url': meta['url'],
+                            'size': meta['size'],
+                            'duration': meta['duration'],
+                            'hash': meta['hash'],
+                            'lang': lang,
+                            'ids': [],
+                        }
+                    if it.get('id') not in row['ids']:
+                        row['ids'].append(it.get('id'))
+            rows = list(files.values())
+            return {
+                'version': snapshot.version,
+                'menus': list(menus),
+                'count': len(rows),
+                'total_bytes': sum(r['size'] for r in rows),
+                'total_duration': round(sum(r['duration'] or 0 for r in rows), 2),
+                'files': rows,
+            }
+
+        return _catalog_json_response(snapshot, ('audio-manifest', tuple(sorted(menus))), _produce)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/wines/<wine_id>', methods=['GET'])
-def get_wine(wine_id):
-    """Возвращает одно вино по ID"""
+@app.route('/api/admin/audio/report', methods=['GET'])
+@login_required
+def admin_audio_report():
+    """Проблемы с озвучкой: позиции без найденного файла (missing) и файлы без позиции (orphaned)"""
+    admin_check = _require_admin()
+    if admin_check:
+        return admin_check
     try:
-        # 1) Пытаемся найти в БД
-        wine_id_norm = str(wine_id or "").strip()
-        wine = Dish.query.filter(Dish.id == wine_id_norm).first()
-        if wine and (_text_contains(wine.menu, ['вин', 'wine']) or _text_contains(wine.section, ['вин', 'wine'])):
-            base = wine.to_dict()
-            full = _load_menu_db_by_id().get(base.get("id"))
-            merged = _deep_merge_dicts(full or {}, base)
-            return jsonify(_enrich_wine_dict(merged))
-
-        # 2) Фолбэк: ищем в JSON по id
-        wine_dict = _load_menu_db_by_id().get(wine_id_norm)
-        if wine_dict and (_text_contains(wine_dict.get("menu"), ['вин', 'wine']) or _text_contains(wine_dict.get("section"), ['вин', 'wine'])):
-            return jsonify(wine_dict)
-
-        return jsonify({'error': 'Wine not found'}), 404
+        snapshot = CATALOG.get()
+        report = audio_index.AudioIndex.report(snapshot.items, STATIC_MANIFEST.entries('audio'))
+        with_audio = sum(1 for it in snapshot.items if it.get('audio'))
+        return jsonify({
+            'version': snapshot.version,
+            'items_total': len(snapshot.items),
+            'items_with_audio': with_audio,
+            'missing': report['missing'],
+            'orphaned': report['orphaned'],
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# ========== API ДЛЯ БАРНОГО МЕНЮ ==========
-
-@app.route('/api/bar-items', methods=['GET'])
-def get_bar_items():
-    """Возвращает все барные напитки (меню содержит 'бар' / 'напит' и т.п.)"""
+@app.route('/api/admin/i18n/coverage', methods=['GET'])
+@login_required
+def admin_i18n_coverage():
+    """
+    Сколько переведено (?lang=en): по полям (с id позиций без перевода) и по меню.
+    Позиции без перевода в ?lang= ответах показываются по-русски — здесь видно, что доперевести.
+    """
+    admin_check = _require_admin()
+    if admin_check:
+        return admin_check
     try:
-        return jsonify(_get_bar_items_dicts())
+        try:
+            lang = _lang_arg(request.args.get('lang') or 'en')
+            if lang == i18n_projection.DEFAULT_LANG:
+                raise ValueError(f'{lang} is the source language, nothing to translate')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        snapshot = CATALOG.get()
+        return _catalog_json_response(
+            snapshot,
+            ('i18n_coverage', lang),
+            lambda: {'version': snapshot.version, **i18n_projection.coverage(snapshot.items, lang)},
+        )
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# ========== АДМИНСКИЕ API (требуют авторизации) ==========
-
-@app.route('/api/admin/login', methods=['POST'])
-def admin_login():
-    """Вход в систему с логином и паролем"""
+@app.route('/api/admin/rate-limit', methods=['GET'])
+@login_required
+def admin_rate_limit_stats():
+    """
+    Лимиты входа/обратной связи: правила и счётчики (сколько пропущено / отклонено с 429).
+    Счётчики — этого воркера (с момента его запуска); вёдра при RATE_LIMIT_STORE=sqlite — общие.
+    """
+    admin_check = _require_admin()
+    if admin_check:
+        return admin_check
+    try:
+        return jsonify({'pid': os.getpid(), **RATE_LIMITER.stats()})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/events', methods=['GET'])
+@login_required
+def admin_events_stats():
+    """Подписчики и рассылки /api/events в ЭТОМ воркере."""
+    admin_check = _require_admin()
+    if admin_check:
+        return admin_check
+    return jsonify(CATALOG_EVENTS.stats())
+
+def _precache_json_response(payload: dict, etag: str):
+    """JSON + ETag: повторная проверка без изменений стоит клиенту один 304."""
+    resp = app.response_class(dumps_bytes(payload), mimetype='application/json')
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp.make_conditional(request)
+
+@app.route('/api/precache/manifest', methods=['GET'])
+def get_precache_manifest():
+    """
+    Полный манифест предзагрузки: {hash, count, total_bytes, files: {url: {hash, size}}}.
+    Генерируется по файлам на диске (вместо ручного precache-files.json).
+    """
+    try:
+        manifest = PRECACHE.get_current()
+        return _precache_json_response(manifest, manifest['hash'])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/precache/diff', methods=['GET'])
+def get_precache_diff():
+    """
+    Что изменилось с версии клиента: ?since=<hash манифеста, который уже в кэше телефона>.
+    Ответ: {hash, since, full, added, changed, removed, download_bytes, total_bytes}.
+    full=true — версия клиента неизвестна, в added весь манифест (как первая установка).
+    """
+    try:
+        since = (request.args.get('since') or '').strip()
+        diff = PRECACHE.diff(since or None)
+        return _precache_json_response(diff, f"{since or 'none'}-{diff['hash']}")
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Ширина картинок в офлайн-пакете по умолчанию (телефон: карточка меню во всю ширину)
+OFFLINE_PACK_DEFAULT_WIDTH = 480
+
+def _offline_pack_plan(items: list[dict]) -> list[tuple]:
+    """
+    Какие файлы войдут в офлайн-пакет — без генерации копий (только поиск в манифесте):
+    [(корень, rel, запись исходника, что отдать без уменьшения, уменьшать ли)].
+    Всё, от чего зависят байты архива, есть здесь — поэтому план входит в ETag пакета.
+    """
+    plan = []
+    seen = set()
+    for item in items:
+        rel = _image_rel_from_src((item.get('image') or {}).get('src'))
+        entry = STATIC_MANIFEST.lookup('images', rel) if rel else None
+        if entry and ('images', rel) not in seen:
+            seen.add(('images', rel))
+            resize = image_derivatives.is_available() and image_derivatives.can_resize(entry.path)
+            plan.append(('images', rel, entry, _optimized_image_entry(entry), resize))
+        for meta in (item.get('audio') or {}).values():
+            rel = meta['url'].split('?', 1)[0][len('/audio/'):]
+            entry = STATIC_MANIFEST.lookup('audio', rel)
+            if entry and ('audio', rel) not in seen:
+                seen.add(('audio', rel))
+                plan.append(('audio', rel, entry, entry, False))
+    return plan
+
+def _offline_pack_members(plan: list[tuple], items: list[dict], width: int, catalog_version: str, menus):
+    """
+    Содержимое офлайн-пакета (лениво, по одному файлу — уменьшенные копии делаются по ходу отдачи):
+    - images/..., audio/... — файлы (картинки уменьшены до width, WebP)
+    - catalog.json — позиции меню (как в /api/dishes)
+    - pack.json — оглавление: какой URL сайта лежит в каком файле архива (+ MIME)
+
+    Копию, которую не удалось сделать (ошибка/таймаут), НЕ заменяем оригиналом: исключение обрывает пакет.
+    Иначе архив с тем же ETag мог бы собраться по-разному, и докачка Range склеила бы битый файл.
+    """
+    files: dict[str, dict] = {}
+    for root, rel, entry, source, resize in plan:
+        name = f"{root}/{rel}"
+        if resize:
+            path = DERIVATIVES.get(entry.path, entry.etag, width, 'webp')
+            if path != entry.path:
+                files[f"/{name}"] = {'path': name, 'mime': image_derivatives.FORMAT_MIME['webp'],
+                                     'hash': entry.etag, 'width': width}
+                yield name, path
+                continue
+        meta = {'path': name, 'mime': source.mime, 'hash': entry.etag}
+        if root == 'images':
+            meta['width'] = None
+        files[f"/{name}"] = meta
+        yield name, source.path
+
+    yield 'catalog.json', dumps_bytes(items)
+    yield 'pack.json', dumps_bytes({
+        'version': catalog_version,
+        'menus': list(menus),
+        'image_width': width,
+        'items': len(items),
+        'files': dict(sorted(files.items())),
+    })
+
+@app.route('/api/offline-pack', methods=['GET'])
+def get_offline_pack():
+    """
+    Один ZIP со всем, что нужно меню офлайн: catalog.json, картинки (уменьшенные) и озвучка.
+
+    - ?menu=<название> (можно несколько; без параметра — весь каталог)
+    - ?image_width=480 (прилипает к одной из разрешённых ширин)
+
+    Первая загрузка версии идёт потоком (и параллельно сохраняется в кэш).
+    Дальше — готовый файл с поддержкой Range: оборванную загрузку можно докачать.
+    Если уменьшенная копия картинки не получилась — пакет обрывается (а не подменяет её оригиналом).
+    """
+    try:
+        menus = tuple(sorted(_split_list_arg('menu')))
+        raw_width = request.args.get('image_width')
+        width = image_derivatives.snap_width(raw_width or OFFLINE_PACK_DEFAULT_WIDTH)
+        if width is None:
+            return jsonify({'error': 'image_width must be a positive integer'}), 400
+
+        snapshot = CATALOG.get()
+        items = [it for it in snapshot.items if not menus or _normalize_menu_value(it.get('menu')) in menus]
+        if not items:
+            return jsonify({'error': 'Menu not found'}), 404
+
+        plan = _offline_pack_plan(items)
+        # Ключ = всё, от чего зависят байты архива: версия, фильтр, ширина и выбранный файл для каждой позиции
+        pack_key = short_hash("|".join(
+            [snapshot.version, *menus, str(width)]
+            + [f"{root}/{rel}:{entry.etag}:{source.etag}:{int(resize)}" for root, rel, entry, source, resize in plan]
+        ).encode('utf-8'))
+        pack_path = OFFLINE_PACKS_DIR / f"pack-{pack_key}.zip"
+        download_name = f"sabor-offline-{pack_key}.zip"
+
+        if request.if_none_match.contains(pack_key):
+            resp = app.response_class(status=304)
+            resp.set_etag(pack_key)
+            return resp
+
+        if pack_path.is_file():
+            # Готовый файл: Range (докачка), 304 и т.п. — как у обычной статики
+            resp = send_file(
+                pack_path,
+                mimetype='application/zip',
+                as_attachment=True,
+                download_name=download_name,
+                etag=pack_key,
+                conditional=True,
+                max_age=0,
+            )
+        else:
+            # Файла ещё нет (в том числе при Range: весь архив внутри запроса не собираем) —
+            # отдаём поток целиком (200 без Range допустим по HTTP) и параллельно сохраняем копию
+            members = _offline_pack_members(plan, items, width, snapshot.version, menus)
+
+            def _generate():
+                yield from offline_pack.stream_zip(members, tee_path=pack_path)
+                offline_pack.prune_packs(OFFLINE_PACKS_DIR)
+
+            resp = app.response_class(_generate(), mimetype='application/zip')
+            resp.set_etag(pack_key)
+            resp.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+            # Размер заранее неизвестен, но докачка поддерживается (следующий запрос отдаст файл)
+            resp.headers['Accept-Ranges'] = 'bytes'
+        resp.headers['X-Catalog-Version'] = snapshot.version
+        resp.headers['Cache-Control'] = 'no-cache'
+        return resp
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Ограничение размера колоды тренажёра за один запрос
+TRAINER_DECK_MAX_CARDS = 200
+
+def _int_arg(name: str, default: int, minimum: int = 0, maximum: int | None = None) -> int:
+    """Целый query-параметр с границами. Некорректное значение -> ValueError (ответим 400)."""
+    raw = request.args.get(name)
+    if raw is None or str(raw).strip() == '':
+        return default
+    value = int(str(raw).strip())
+    if value < minimum or (maximum is not None and value > maximum):
+        raise ValueError(f'{name} must be between {minimum} and {maximum}')
+    return value
+
+@app.route('/api/trainer/deck', methods=['GET'])
+def get_trainer_deck():
+    """
+    Колода тренажёра на одну сессию (карточки строятся из каталога, с готовыми вариантами ответов).
+
+    - ?menu=, ?section= — фильтр (можно несколько)
+    - ?n=20 — сколько карточек (до TRAINER_DECK_MAX_CARDS), ?offset= — следующая "страница"
+    - ?seed= — порядок перемешивания; если не передан, сервер выберет и вернёт его в ответе
+      (для следующей страницы передайте тот же seed)
+    """
+    try:
+        try:
+            n = _int_arg('n', 20, 1, TRAINER_DECK_MAX_CARDS)
+            offset = _int_arg('offset', 0, 0)
+            seed = _int_arg('seed', -1, 0)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        menus = tuple(sorted(_split_list_arg('menu')))
+        sections = tuple(sorted(_split_list_arg('section')))
+
+        snapshot = CATALOG.get()
+        cards = snapshot.derived(
+            'trainer-cards', lambda: trainer_deck.build_cards(snapshot.items, snapshot.version)
+        )
+
+        def _produce(seed_value):
+            total, page = trainer_deck.sample_deck(cards, seed_value, offset, n, menus, sections)
+            return {
+                'version': snapshot.version,
+                'seed': seed_value,
+                'total': total,
+                'offset': offset,
+                'n': n,
+                'cards': page,
+            }
+
+        if seed < 0:
+            # Случайный seed — ответ уникальный, в кэш проекций его не кладём
+            seed = random.randrange(2 ** 31)
+            resp = app.response_class(dumps_bytes(_produce(seed)), mimetype='application/json')
+            resp.headers['X-Catalog-Version'] = snapshot.version
+            resp.headers['Cache-Control'] = 'no-store'
+            return resp
+        key = ('trainer-deck', menus, sections, seed, offset, n)
+        return _catalog_json_response(snapshot, key, lambda: _produce(seed))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/sprites/icons', methods=['GET'])
+def get_icon_sprite():
+    """Карта спрайта иконок: url 1x/2x, размер листа и координаты каждой иконки по имени файла"""
+    try:
+        sprite_map = _ensure_icon_sprite()
+        if not sprite_map:
+            return jsonify({'error': 'Sprite not available'}), 404
+        return jsonify({
+            **sprite_map,
+            'url': f"/sprites/{sprite_map['image']}",
+            'url2x': f"/sprites/{sprite_map['image2x']}",
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ========== API ДЛЯ ВИН ==========
+
+def _catalog_subset_response(key: tuple, keep, lang: str):
+    """
+    Часть каталога (вина, бар ...) из снимка: готовые байты на версию каталога + язык + версию стоп-листа.
+    keep(item) проверяется по исходной позиции — как ?menu= в /api/dishes, независимо от языка.
+    """
+    snapshot = CATALOG.get()
+    stop = AVAILABILITY.current()
+
+    def _produce():
+        shown = _catalog_view(snapshot, 'raw', lang)[0]
+        return [stop.overlay(shown[idx]) for idx, it in enumerate(snapshot.items) if keep(it)]
+
+    return _catalog_json_response(snapshot, key + (lang, stop.version), _produce)
+
+@app.route('/api/wines', methods=['GET'])
+def get_wines():
+    """Возвращает все вина (меню содержит 'вино' / 'wine' и т.п.). ?lang=ru|en — как в /api/dishes"""
+    try:
+        try:
+            lang = _lang_arg()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return _catalog_subset_response(('wines',), _is_wine_item, lang)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/wines/category/<category>', methods=['GET'])
+def get_wines_by_category(category):
+    """Возвращает вина по категории (by-glass/coravin/half-bottles). ?lang=ru|en — как в /api/dishes"""
+    try:
+        try:
+            lang = _lang_arg()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return _catalog_subset_response(
+            ('wines', category),
+            lambda it: _is_wine_item(it) and it.get("category") == category,
+            lang,
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/wines/<wine_id>', methods=['GET'])
+def get_wine(wine_id):
+    """Возвращает одно вино по ID. ?lang=ru|en — как в /api/dishes"""
+    try:
+        try:
+            lang = _lang_arg()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        wine_id_norm = str(wine_id or "").strip()
+        snapshot = CATALOG.get()
+        raw = snapshot.by_id.get(wine_id_norm)
+        if raw is None or not _is_wine_item(raw):
+            return jsonify({'error': 'Wine not found'}), 404
+        item = _catalog_view(snapshot, 'raw', lang)[1][wine_id_norm]
+        stop = AVAILABILITY.current()
+        stop_tag = stop.item_tag(wine_id_norm)
+        return _catalog_json_response(
+            snapshot,
+            ('wine', wine_id_norm, lang, stop_tag),
+            lambda: stop.overlay(item),
+            etag=_view_etag(snapshot.item_versions.get(wine_id_norm), 'raw', lang) + stop_tag,
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ========== API ДЛЯ БАРНОГО МЕНЮ ==========
+
+@app.route('/api/bar-items', methods=['GET'])
+def get_bar_items():
+    """Возвращает все барные напитки (меню содержит 'бар' / 'напит' и т.п.). ?lang=ru|en — как в /api/dishes"""
+    try:
+        try:
+            lang = _lang_arg()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return _catalog_subset_response(('bar-items',), _is_bar_item, lang)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ========== АДМИНСКИЕ API (требуют авторизации) ==========
+
+@app.route('/api/admin/login', methods=['POST'])
+def admin_login():
+    """Вход в систему с логином и паролем"""
     data = request.json
     username = data.get('username')
     password = data.get('password')
@@ -977,7 +2117,13 @@ def admin_login():
     # Проверяем, что переданы оба поля
     if not username or not password:
         return jsonify({'error': 'Логин и пароль обязательны'}), 400
-    
+
+    # Лимит попыток ДО проверки пароля: сама проверка (scrypt) и есть дорогая часть.
+    # По IP — против перебора с одного адреса, по логину — против перебора одного аккаунта с многих.
+    limited = _rate_limited(("login_ip", _client_ip()), ("login_user", str(username).strip().lower()))
+    if limited:
+        return limited
+
     # Ищем пользователя в базе данных по логину
     user = User.query.filter_by(username=username).first()
     
@@ -987,11 +2133,15 @@ def admin_login():
         # Если remember=False — сессия будет "до закрытия браузера".
         from flask import session
         session.permanent = remember
+        # CachedUser.get_id() = "<id>:<версия учётных данных>": версия попадёт и в remember-cookie
+        cached = user_cache.CachedUser.from_model(user)
         login_user(
-            user,
+            cached,
             remember=remember,
             duration=app.config["REMEMBER_COOKIE_DURATION"] if remember else None,
         )
+        session[SESSION_CRED_KEY] = cached.cred_version
+        USERS.put(user.id, cached)
         return jsonify({'status': 'ok', 'message': 'Успешный вход', 'user': user.to_dict()})
     else:
         return jsonify({'error': 'Неверный логин или пароль'}), 401
@@ -999,6 +2149,9 @@ def admin_login():
 @app.route('/api/admin/login/guest', methods=['POST'])
 def guest_login():
     """Вход в гостевой (demo) режим без логина и пароля"""
+    limited = _rate_limited(("guest_login_ip", _client_ip()))
+    if limited:
+        return limited
     try:
         # Создаём гостевого пользователя
         guest = GuestUser()
@@ -1024,6 +2177,8 @@ def admin_logout():
     Декоратор @login_required не нужен, так как logout можно вызвать без авторизации.
     """
     logout_user()
+    from flask import session
+    session.pop(SESSION_CRED_KEY, None)
     return jsonify({'status': 'ok'})
 
 @app.route('/api/admin/check', methods=['GET'])
@@ -1037,15 +2192,54 @@ def check_auth():
                 'authenticated': True,
                 'user': current_user.to_dict()
             })
-        # Иначе загружаем из базы данных
-        user = User.query.get(current_user.id)
+        # Иначе это CachedUser из load_user — данные уже есть, повторно в БД не ходим
         return jsonify({
             'authenticated': True,
-            'user': user.to_dict() if user else None
+            'user': current_user.to_dict()
         })
     else:
         return jsonify({'authenticated': False})
 
+def _menu_apply_job(job, items: list[dict]):
+    """
+    Задача "menu.apply": записать каталог в menu-database.json (и backup) и перезалить таблицу dishes.
+    items уже проверены и без дублей (это делает запрос, чтобы ошибки формата вернуть сразу 400).
+    """
+    try:
+        job.progress(step="save json")
+        deduped_len, _, _ = _save_menu_db_items(items)
+        job.progress(step="rebuild db")
+        imported = _rebuild_dishes_table_from_items(items)
+        _catalog_changed()
+    except Exception as e:
+        db.session.rollback()
+        if _is_readonly_db_error(e):
+            raise RuntimeError(f"DB_READONLY: {_readonly_db_hint()}") from e
+        raise
+    job.log(f"Сохранено позиций: {deduped_len}, в БД: {imported}")
+    return {
+        "deduped": deduped_len,
+        "imported_to_db": imported,
+        "menus_found": sorted({(it.get("menu") or "").strip() for it in items if it.get("menu")}),
+    }
+
+
+def _submit_menu_apply(items: list[dict], summary: dict):
+    """
+    Поставить задачу "menu.apply" и сразу ответить 202: {status: "queued", job_id, ...summary}.
+    Одновременно применяется только один каталог (второй запрос — 409, а не гонка двух перезаливок).
+    """
+    from flask_login import current_user
+    params = {**summary, "by": getattr(current_user, "username", None)}
+    try:
+        job = JOBS.submit("menu.apply", _menu_apply_job, params=params, args=(items,))
+    except jobs.JobConflict as e:
+        return jsonify({"error": "Меню уже применяется, дождитесь окончания", "job": e.job}), 409
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"status": "queued", "job_id": job["id"], **summary}), 202
+
+
 @app.route('/api/admin/dishes', methods=['POST'])
 @login_required
 def save_dishes():
@@ -1068,25 +2262,19 @@ def save_dishes():
         # Дедупликация по id (в исходных данных иногда бывают дубли)
         items, duplicates, skipped_no_id = _dedupe_menu_items(data)
 
-        # 1) Пишем в menu-database.json (это решает “почему вино/бар отдельно” — всё в одном файле)
-        deduped_len, _, _ = _save_menu_db_items(items)
-
-        # 2) Пересобираем БД из этого же списка (KISS: удалить и заново залить)
-        imported = _rebuild_dishes_table_from_items(items)
-
-        return jsonify({
-            'status': 'ok',
-            'message': 'Данные сохранены',
+        # Дальше — в фоне (задача "menu.apply"):
+        # 1) пишем в menu-database.json (это решает “почему вино/бар отдельно” — всё в одном файле)
+        # 2) пересобираем БД из этого же списка (KISS: удалить и заново залить)
+        return _submit_menu_apply(items, {
+            'source': 'admin',
             'received': len(data),
-            'deduped': deduped_len,
+            'deduped': len(items),
             'duplicates_removed': duplicates,
             'skipped_no_id': skipped_no_id,
-            'imported_to_db': imported,
         })
+    except html_normalizer.HtmlNormalizeError as e:
+        return jsonify({'error': f'Описание не сохранено: {e}'}), 400
     except Exception as e:
-        db.session.rollback()  # Откатываем изменения в случае ошибки
-        if _is_readonly_db_error(e):
-            return _readonly_db_response()
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/admin/dishes/<dish_id>', methods=['PUT'])
@@ -1109,6 +2297,7 @@ def update_dish(dish_id):
         # Доверяем id из URL, чтобы не было “переименований” id через тело запроса
         data = dict(data)
         data['id'] = dish_id_norm
+        html_normalizer.normalize_item_html(data)
 
         # 1) Сохраняем в JSON (не теряя специфичных полей)
         _upsert_menu_db_item(data)
@@ -1133,9 +2322,12 @@ def update_dish(dish_id):
             dish.i18n = updated_dish.i18n
 
         db.session.commit()
+        _catalog_changed()
 
         full = _load_menu_db_by_id().get(dish_id_norm)
         return jsonify({'status': 'ok', 'dish': _deep_merge_dicts(full or {}, dish.to_dict())})
+    except html_normalizer.HtmlNormalizeError as e:
+        return jsonify({'error': f'Описание не сохранено: {e}'}), 400
     except Exception as e:
         db.session.rollback()
         if _is_readonly_db_error(e):
@@ -1160,6 +2352,7 @@ def add_dish():
         if not dish_id_norm:
             return jsonify({'error': 'Dish must have an id'}), 400
         new_dish_data['id'] = dish_id_norm
+        html_normalizer.normalize_item_html(new_dish_data)
 
         # Проверяем, нет ли уже позиции с таким ID (и в БД, и в JSON)
         if Dish.query.get(dish_id_norm) or _load_menu_db_by_id().get(dish_id_norm):
@@ -1172,9 +2365,12 @@ def add_dish():
         new_dish = Dish.from_dict(new_dish_data)
         db.session.add(new_dish)
         db.session.commit()
+        _catalog_changed()
 
         full = _load_menu_db_by_id().get(dish_id_norm)
         return jsonify({'status': 'ok', 'dish': _deep_merge_dicts(full or {}, new_dish.to_dict())})
+    except html_normalizer.HtmlNormalizeError as e:
+        return jsonify({'error': f'Описание не сохранено: {e}'}), 400
     except Exception as e:
         db.session.rollback()
         if _is_readonly_db_error(e):
@@ -1210,6 +2406,7 @@ def delete_dish(dish_id):
             return jsonify({'error': 'Dish not found'}), 404
 
         db.session.commit()
+        _catalog_changed()
         return jsonify({'status': 'ok'})
     except Exception as e:
         db.session.rollback()
@@ -1217,6 +2414,69 @@ def delete_dish(dish_id):
             return _readonly_db_response()
         return jsonify({'error': str(e)}), 500
 
+# ========== СТОП-ЛИСТ (доступность позиций) ==========
+
+def _set_availability(ids, available, note=None):
+    """Общая часть переключателей: проверка id по каталогу + запись. Возвращает (json, status)."""
+    from flask_login import current_user
+    snapshot = CATALOG.get()
+    unknown = [i for i in ids if i not in snapshot.by_id]
+    if unknown:
+        return jsonify({'error': 'Unknown ids', 'not_found': unknown}), 404
+    stop, changed = AVAILABILITY.set_available(
+        ids, available, note=note, by=getattr(current_user, 'username', None),
+    )
+    return jsonify({'status': 'ok', 'changed': changed, **stop.to_dict(include_staff=True)}), 200
+
+
+@app.route('/api/admin/availability', methods=['POST'])
+@login_required
+def set_availability_bulk():
+    """
+    Поставить на стоп / вернуть в продажу сразу несколько позиций:
+    {"ids": ["0001", ...], "available": false, "note": "до 18:00"}.
+    Каталог и JSON не меняются — только таблица stop_list.
+    """
+    guest_check = check_not_guest()
+    if guest_check:
+        return guest_check
+    try:
+        data = request.get_json(silent=True) or {}
+        raw_ids = data.get('ids') if isinstance(data, dict) else None
+        if not isinstance(raw_ids, list) or not isinstance(data.get('available'), bool):
+            return jsonify({'error': 'Payload must be {"ids": [...], "available": true|false}'}), 400
+        ids = list(dict.fromkeys(str(i or '').strip() for i in raw_ids if str(i or '').strip()))
+        if not ids:
+            return jsonify({'error': 'ids are required'}), 400
+        if len(ids) > availability.MAX_IDS:
+            return jsonify({'error': f'Too many ids (max {availability.MAX_IDS})'}), 400
+        return _set_availability(ids, data['available'], data.get('note'))
+    except Exception as e:
+        db.session.rollback()
+        if _is_readonly_db_error(e):
+            return _readonly_db_response()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/admin/availability/<item_id>', methods=['PUT'])
+@login_required
+def set_availability_one(item_id):
+    """Одна позиция: {"available": false, "note": "..."}."""
+    guest_check = check_not_guest()
+    if guest_check:
+        return guest_check
+    try:
+        item_id_norm = str(item_id or '').strip()
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict) or not isinstance(data.get('available'), bool):
+            return jsonify({'error': 'Payload must be {"available": true|false}'}), 400
+        return _set_availability([item_id_norm], data['available'], data.get('note'))
+    except Exception as e:
+        db.session.rollback()
+        if _is_readonly_db_error(e):
+            return _readonly_db_response()
+        return jsonify({'error': str(e)}), 500
+
 # ========== API ДЛЯ ОБРАТНОЙ СВЯЗИ ==========
 
 @app.route('/api/feedback', methods=['POST'])
@@ -1228,21 +2488,38 @@ def submit_feedback():
         return jsonify({'error': 'Доступ запрещён. Гостевой режим поддерживает только просмотр данных.'}), 403
     try:
         data = request.json
-        
+
         # Проверяем, что есть текст сообщения
         if not data.get('message'):
             return jsonify({'error': 'Message is required'}), 400
-        
-        # Создаём новое сообщение
-        feedback = FeedbackMessage(
-            name=data.get('name', ''),
-            type=data.get('type', 'question'),
-            message=data.get('message'),
-            read=False
+
+        # Лимит на IP: спам не должен занимать запись в SQLite
+        limited = _rate_limited(("feedback_ip", _client_ip()))
+        if limited:
+            return limited
+
+        record = {
+            'name': data.get('name', ''),
+            'type': data.get('type', 'question'),
+            'message': data.get('message'),
+        }
+
+        # Обычный путь: журнал + очередь, в базу запишет фоновый поток (id — временный)
+        if FEEDBACK_QUEUE_ENABLED:
+            try:
+                ref = FEEDBACK_QUEUE.submit({**record, 'created_at': datetime.utcnow().isoformat()})
+                return jsonify({'status': 'ok', 'message': 'Сообщение отправлено', 'id': ref, 'queued': True})
+            except OSError as e:
+                app.logger.warning(f"Очередь обратной связи недоступна, пишем сразу в базу: {e}")
+
+        # Создаём новое сообщение (+1 к счётчику непрочитанных в той же транзакции)
+        feedback = feedback_inbox.add_message(
+            name=record['name'],
+            type_=record['type'],
+            message=record['message'],
         )
         
         # Сохраняем в базу данных
-        db.session.add(feedback)
         db.session.commit()
         
         return jsonify({'status': 'ok', 'message': 'Сообщение отправлено', 'id': feedback.id})
@@ -1255,18 +2532,135 @@ def submit_feedback():
 @app.route('/api/admin/feedback', methods=['GET'])
 @login_required
 def get_feedback_messages():
-    """Получение всех сообщений обратной связи (только для админа)"""
+    """
+    Сообщения обратной связи по страницам (новые сначала), см. feedback_inbox.py.
+
+    ?status=all|unread|read|archived  — вкладка (по умолчанию all)
+    ?limit=50                         — размер страницы (до 200)
+    ?cursor=...                       — next_cursor из предыдущей страницы
+    Ответ: {"items": [...], "next_cursor": "..." | null, "unread_count": N}
+    """
     # Проверяем, что это не гость
     guest_check = check_not_guest()
     if guest_check:
         return guest_check
     try:
-        # Получаем все сообщения, отсортированные по дате (новые сначала)
-        messages = FeedbackMessage.query.order_by(FeedbackMessage.created_at.desc()).all()
-        
-        # Преобразуем в список словарей
-        return jsonify([msg.to_dict() for msg in messages])
+        try:
+            limit = _int_arg('limit', feedback_inbox.DEFAULT_PAGE_SIZE, minimum=1,
+                             maximum=feedback_inbox.MAX_PAGE_SIZE)
+            result = feedback_inbox.page(
+                status=(request.args.get('status') or 'all').strip().lower(),
+                cursor=(request.args.get('cursor') or '').strip() or None,
+                limit=limit,
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        result['unread_count'] = feedback_inbox.unread_count()
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/feedback/unread-count', methods=['GET'])
+@login_required
+def get_feedback_unread_count():
+    """Число непрочитанных сообщений (для значка в меню) — одна строка из таблицы counters."""
+    guest_check = check_not_guest()
+    if guest_check:
+        return guest_check
+    try:
+        return jsonify({'unread_count': feedback_inbox.unread_count()})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _feedback_bulk_ids(data):
+    """ids из тела запроса: {"ids": [1, 2, 3]}. Ошибка -> ValueError (400)."""
+    if not isinstance(data, dict) or 'ids' not in data:
+        raise ValueError('ids is required')
+    return feedback_inbox.clean_ids(data.get('ids'))
+
+@app.route('/api/admin/feedback/queue', methods=['GET'])
+@login_required
+def get_feedback_queue_stats():
+    """Очередь записи обратной связи этого воркера: сколько ждёт, сколько записано, ошибки."""
+    admin_check = _require_admin()
+    if admin_check:
+        return admin_check
+    try:
+        return jsonify({'enabled': FEEDBACK_QUEUE_ENABLED, **FEEDBACK_QUEUE.stats()})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/feedback/read', methods=['POST'])
+@login_required
+def mark_feedback_read_bulk():
+    """
+    Отметить прочитанными пачку сообщений одним UPDATE.
+    Тело: {"ids": [1, 2, 3]} или {"all": true} — все непрочитанные.
+    """
+    guest_check = check_not_guest()
+    if guest_check:
+        return guest_check
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            ids = None if data.get('all') is True else _feedback_bulk_ids(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        updated = feedback_inbox.mark_read(ids)
+        db.session.commit()
+        return jsonify({'status': 'ok', 'updated': updated, 'unread_count': feedback_inbox.unread_count()})
     except Exception as e:
+        db.session.rollback()
+        if _is_readonly_db_error(e):
+            return _readonly_db_response()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/feedback/delete', methods=['POST'])
+@login_required
+def delete_feedback_bulk():
+    """Удалить пачку сообщений. Тело: {"ids": [1, 2, 3]}."""
+    guest_check = check_not_guest()
+    if guest_check:
+        return guest_check
+    try:
+        try:
+            ids = _feedback_bulk_ids(request.get_json(silent=True))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        deleted = feedback_inbox.delete_messages(ids)
+        db.session.commit()
+        return jsonify({'status': 'ok', 'deleted': deleted, 'unread_count': feedback_inbox.unread_count()})
+    except Exception as e:
+        db.session.rollback()
+        if _is_readonly_db_error(e):
+            return _readonly_db_response()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/feedback/archive', methods=['POST'])
+@login_required
+def archive_feedback():
+    """
+    Перенести в архив прочитанные сообщения старше N дней.
+    Тело: {"older_than_days": 30} (по умолчанию FEEDBACK_ARCHIVE_DAYS). Архив: ?status=archived.
+    """
+    guest_check = check_not_guest()
+    if guest_check:
+        return guest_check
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            days = int(data.get('older_than_days', FEEDBACK_ARCHIVE_DAYS))
+            if days < 1:
+                raise ValueError
+        except (TypeError, ValueError):
+            return jsonify({'error': 'older_than_days must be a positive integer'}), 400
+        moved = feedback_inbox.archive_read(days)
+        db.session.commit()
+        return jsonify({'status': 'ok', 'archived': moved})
+    except Exception as e:
+        db.session.rollback()
+        if _is_readonly_db_error(e):
+            return _readonly_db_response()
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/admin/feedback/<int:message_id>/read', methods=['PUT'])
@@ -1279,14 +2673,15 @@ def mark_feedback_read(message_id):
         return guest_check
     try:
         # Ищем сообщение в базе данных
-        message = FeedbackMessage.query.get(message_id)
+        message = db.session.get(FeedbackMessage, message_id)
         
         if not message:
             return jsonify({'error': 'Message not found'}), 404
         
-        # Отмечаем как прочитанное
-        message.read = True
+        # Отмечаем как прочитанное (счётчик непрочитанных — там же)
+        feedback_inbox.mark_read([message_id])
         db.session.commit()
+        db.session.refresh(message)
         
         return jsonify({'status': 'ok', 'message': message.to_dict()})
     except Exception as e:
@@ -1304,14 +2699,9 @@ def delete_feedback_message(message_id):
     if guest_check:
         return guest_check
     try:
-        # Ищем сообщение в базе данных
-        message = FeedbackMessage.query.get(message_id)
-        
-        if not message:
+        # Удаляем сообщение (и поправляем счётчик непрочитанных)
+        if not feedback_inbox.delete_messages([message_id]):
             return jsonify({'error': 'Message not found'}), 404
-        
-        # Удаляем сообщение
-        db.session.delete(message)
         db.session.commit()
         
         return jsonify({'status': 'ok'})
@@ -1334,7 +2724,7 @@ def get_users():
     try:
         # Проверяем, что текущий пользователь - администратор
         from flask_login import current_user
-        current_user_obj = User.query.get(current_user.id)
+        current_user_obj = current_user  # CachedUser из load_user — без повторного запроса в БД
         
         if not current_user_obj or current_user_obj.role != 'администратор':
             return jsonify({'error': 'Доступ запрещен'}), 403
@@ -1358,7 +2748,7 @@ def create_user():
     try:
         # Проверяем, что текущий пользователь - администратор
         from flask_login import current_user
-        current_user_obj = User.query.get(current_user.id)
+        current_user_obj = current_user  # CachedUser из load_user — без повторного запроса в БД
         
         if not current_user_obj or current_user_obj.role != 'администратор':
             return jsonify({'error': 'Доступ запрещен. Только администратор может создавать пользователей'}), 403
@@ -1398,6 +2788,8 @@ def create_user():
         # Сохраняем в базу данных
         db.session.add(new_user)
         db.session.commit()
+        # SQLite может выдать id удалённого пользователя — в кэше мог остаться "нет такого"
+        USERS.invalidate(new_user.id)
         
         return jsonify({'status': 'ok', 'message': 'Пользователь создан', 'user': new_user.to_dict()})
     except Exception as e:
@@ -1417,7 +2809,7 @@ def update_user(user_id):
     try:
         # Проверяем, что текущий пользователь - администратор
         from flask_login import current_user
-        current_user_obj = User.query.get(current_user.id)
+        current_user_obj = current_user  # CachedUser из load_user — без повторного запроса в БД
         
         if not current_user_obj or current_user_obj.role != 'администратор':
             return jsonify({'error': 'Доступ запрещен. Только администратор может редактировать пользователей'}), 403
@@ -1455,6 +2847,7 @@ def update_user(user_id):
         
         # Сохраняем изменения
         db.session.commit()
+        USERS.invalidate(user.id)
         
         return jsonify({'status': 'ok', 'message': 'Пользователь обновлен', 'user': user.to_dict()})
     except Exception as e:
@@ -1474,7 +2867,7 @@ def delete_user(user_id):
     try:
         # Проверяем, что текущий пользователь - администратор
         from flask_login import current_user
-        current_user_obj = User.query.get(current_user.id)
+        current_user_obj = current_user  # CachedUser из load_user — без повторного запроса в БД
         
         if not current_user_obj or current_user_obj.role != 'администратор':
             return jsonify({'error': 'Доступ запрещен. Только администратор может удалять пользователей'}), 403
@@ -1492,6 +2885,7 @@ def delete_user(user_id):
         # Удаляем пользователя
         db.session.delete(user)
         db.session.commit()
+        USERS.invalidate(user_id)
         
         return jsonify({'status': 'ok', 'message': 'Пользователь удален'})
     except Exception as e:
@@ -1532,35 +2926,78 @@ def admin_import_menu_json():
     if not isinstance(data, list):
         return jsonify({"error": "JSON должен быть списком объектов (list)"}), 400
 
-    items, duplicates, skipped_no_id = _dedupe_menu_items(data)
-
     try:
-        _atomic_write_json(MENU_DB_PATH, items)
-        _atomic_write_json(MENU_DB_BACKUP_PATH, items)
-    except Exception as e:
-        return jsonify({"error": f"Не удалось сохранить файл на сервере: {e}"}), 500
+        items, duplicates, skipped_no_id = _dedupe_menu_items(data)
+    except html_normalizer.HtmlNormalizeError as e:
+        return jsonify({"error": f"Описание не сохранено: {e}"}), 400
+    # Запись файлов и перезаливка таблицы — в фоне; ответ сразу, статус — GET /api/admin/jobs/<job_id>
+    return _submit_menu_apply(items, {
+        "source": "import",
+        "filename": filename,
+        "received": len(data),
+        "deduped": len(items),
+        "duplicates_removed": duplicates,
+        "skipped_no_id": skipped_no_id,
+    })
 
-    try:
-        # Сбрасываем кэш
-        global _MENU_DB_BY_ID_CACHE
-        _MENU_DB_BY_ID_CACHE = None
 
-        imported = _rebuild_dishes_table_from_items(items)
-        menus = sorted({(it.get("menu") or "").strip() for it in items if it.get("menu")})
-        return jsonify({
-            "status": "ok",
-            "received": len(data),
-            "deduped": len(items),
-            "duplicates_removed": duplicates,
-            "skipped_no_id": skipped_no_id,
-            "imported_to_db": imported,
-            "menus_found": menus,
-        })
+# ========== АДМИН: ОПТИМИЗАЦИЯ КАРТИНОК ==========
+
+def _image_optimize_job(job):
+    """Задача "images.optimize": пережатие идёт в общем пуле процессов, прогресс — в строке задачи."""
+    report = optimize_images.optimize_images(
+        IMAGES_DIR,
+        CACHE_DIR,
+        dry_run=bool(job.params.get("dry_run")),
+        progress=lambda done, total: job.progress(done=done, total=total),
+        pool=job.cpu_pool,
+    )
+    # Файлы поменялись — пусть манифест статики перечитает их сразу, а не через N секунд
+    STATIC_MANIFEST.refresh(force=True)
+    return report
+
+
+@app.route("/api/admin/images/optimize", methods=["GET"])
+@login_required
+def admin_images_optimize_status():
+    """Статус/отчёт последнего запуска оптимизации картинок."""
+    admin_check = _require_admin()
+    if admin_check:
+        return admin_check
+    job = JOBS.store.latest("images.optimize")
+    if job is None:
+        return jsonify({"status": "idle", "started_at": None, "finished_at": None,
+                        "progress": None, "report": None, "error": None, "job_id": None})
+    return jsonify({
+        "status": "running" if job["status"] in jobs.ACTIVE_STATUSES else job["status"],
+        "started_at": job["started_at"] or job["created_at"],
+        "finished_at": job["finished_at"],
+        "progress": job["progress"],
+        "report": job["result"],
+        "error": job["error"],
+        "job_id": job["id"],
+    })
+
+
+@app.route("/api/admin/images/optimize", methods=["POST"])
+@login_required
+def admin_images_optimize_run():
+    """
+    Запускает пережатие всех картинок из images/ (в фоне; копии — в кэше, исходники не меняются).
+    {"dry_run": true} — только посчитать экономию, ничего не меняя.
+    """
+    admin_check = _require_admin()
+    if admin_check:
+        return admin_check
+    data = request.get_json(silent=True) or {}
+    dry_run = bool(data.get("dry_run")) if isinstance(data, dict) else False
+    try:
+        job = JOBS.submit("images.optimize", _image_optimize_job, params={"dry_run": dry_run})
+    except jobs.JobConflict as e:
+        return jsonify({"error": "Optimization already running", "job": e.job}), 409
     except Exception as e:
-        db.session.rollback()
-        if _is_readonly_db_error(e):
-            return _readonly_db_response()
-        return jsonify({"error": f"Ошибка применения меню: {e}"}), 500
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"status": "started", "job_id": job["id"], "job": job}), 202
 
 
 @app.route("/api/admin/deploy/status", methods=["GET"])
@@ -1571,62 +3008,117 @@ def admin_deploy_status():
         return admin_check
     return jsonify({
         "enabled": ADMIN_DEPLOY_ENABLED and bool(DEPLOY_ADMIN_TOKEN),
-        "state": _DEPLOY_STATE,
+        "state": _deploy_state(),
     })
 
 
-def _run_cmd(cmd: list[str], cwd: Path | None = None):
-    _deploy_log(f"$ {' '.join(cmd)}")
-    res = subprocess.run(
+def _run_cmd(job, cmd: list[str], cwd: Path | None = None):
+    """Запустить команду деплоя; вывод идёт в лог построчно, пока команда работает."""
+    _deploy_log(job, f"$ {' '.join(cmd)}")
+    proc = subprocess.Popen(
         cmd,
         cwd=str(cwd) if cwd else None,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
         text=True,
+        errors="replace",
+        bufsize=1,
     )
-    out = (res.stdout or "").strip()
-    if out:
-        for line in out.splitlines()[-50:]:
-            _deploy_log(line)
-    if res.returncode != 0:
-        raise RuntimeError(f"Command failed ({res.returncode}): {' '.join(cmd)}")
-
-
-def _deploy_worker():
-    _DEPLOY_STATE["status"] = "running"
-    _DEPLOY_STATE["started_at"] = time.time()
-    _DEPLOY_STATE["finished_at"] = None
-    _DEPLOY_STATE["error"] = None
-    _DEPLOY_STATE["log"] = []
-    try:
-        _DEPLOY_STATE["step"] = "git pull"
-        _run_cmd(["git", "-C", str(ROOT_DIR), "pull"])
-
-        _DEPLOY_STATE["step"] = "frontend build"
-        _run_cmd(["npm", "ci"], cwd=ROOT_DIR / "frontend")
-        _run_cmd(["npm", "run", "build"], cwd=ROOT_DIR / "frontend")
-
-        _DEPLOY_STATE["step"] = "migrate db"
-        _run_cmd([str(ROOT_DIR / "venv" / "bin" / "python3"), str(ROOT_DIR / "backend" / "migrate_to_db.py"), "--yes"])
-
-        _DEPLOY_STATE["step"] = "restart (self-terminate master)"
-        _DEPLOY_STATE["status"] = "done"
-        _DEPLOY_STATE["finished_at"] = time.time()
-
-        # Аккуратно убиваем gunicorn master (родитель процесса), systemd поднимет заново.
-        def _kill_parent():
-            time.sleep(0.5)
-            try:
-                os.kill(os.getppid(), signal.SIGTERM)
-            except Exception:
-                pass
+    with proc:
+        for line in proc.stdout:
+            line = line.rstrip()
+            if line:
+                _deploy_log(job, line)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Command failed ({proc.returncode}): {' '.join(cmd)}")
+
+
+def _git_output(*args: str) -> str | None:
+    """Вывод git-команды (или None, если git недоступен/ошибка)."""
+    try:
+        res = subprocess.run(
+            ["git", "-C", str(ROOT_DIR), *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+    except OSError:
+        return None
+    return res.stdout.strip() if res.returncode == 0 else None
+
 
-        threading.Thread(target=_kill_parent, daemon=True).start()
+def _deploy_worker(job):
+    """Задача "deploy". Состояние для потока событий — state; статус и лог — в таблице задач."""
+    state = {"status": "running", "started_at": time.time(), "finished_at": None, "step": None,
+             "error": None, "run_id": DEPLOY_EVENTS.start_run(), "job_id": job.id}
+    _deploy_set(job, state)
+    try:
+        frontend_dir = ROOT_DIR / "frontend"
+
+        _deploy_set(job, state, step="git pull")
+        _run_cmd(job, ["git", "-C", str(ROOT_DIR), "pull"])
+        head = _git_output("rev-parse", "HEAD")
+        # Сравниваем с коммитом, из которого сборка реально СОБРАНА (а не с HEAD до этого pull):
+        # прошлая сборка могла упасть, а код — прийти не через деплой (deploy.ps1, ручной git pull)
+        built_head = DEPLOY_STAMPS.get("frontend_head")
+        if head and built_head == head:
+            frontend_changed = False
+        elif head and built_head:
+            # None — git не смог сравнить (например, собранного коммита больше нет) -> собираем
+            frontend_changed = _git_output("diff", "--name-only", built_head, head, "--", "frontend") != ""
+        else:
+            frontend_changed = True
+
+        # npm ci — только если поменялся package-lock.json (установка зависимостей — самый долгий шаг)
+        _deploy_set(job, state, step="frontend deps")
+        lock_hash = graceful_reload.file_sha256(frontend_dir / "package-lock.json")
+        deps_installed = False
+        if lock_hash and lock_hash == DEPLOY_STAMPS.get("npm_lock_hash") and (frontend_dir / "node_modules").is_dir():
+            _deploy_log(job, "package-lock.json не изменился — npm ci пропущен")
+        else:
+            _run_cmd(job, ["npm", "ci"], cwd=frontend_dir)
+            DEPLOY_STAMPS.set("npm_lock_hash", lock_hash)
+            deps_installed = True
+
+        # Сборка — только если в frontend/ что-то поменялось (или сборки ещё нет)
+        _deploy_set(job, state, step="frontend build")
+        if not (frontend_changed or deps_installed) and FRONTEND_INDEX.exists():
+            _deploy_log(job, "frontend/ не изменился — сборка пропущена")
+        else:
+            _run_cmd(job, ["npm", "run", "build"], cwd=frontend_dir)
+            DEPLOY_STAMPS.set("frontend_head", head)
+
+        # Миграция JSON -> SQLite — только если поменялся файл каталога
+        _deploy_set(job, state, step="migrate db")
+        catalog_path = MENU_DB_PATH if MENU_DB_PATH.exists() else MENU_DB_BACKUP_PATH
+        catalog_hash = graceful_reload.file_sha256(catalog_path)
+        if catalog_hash and catalog_hash == DEPLOY_STAMPS.get("catalog_hash"):
+            _deploy_log(job, "Каталог не изменился — миграция пропущена")
+        else:
+            _run_cmd(job, [str(ROOT_DIR / "venv" / "bin" / "python3"), str(ROOT_DIR / "backend" / "migrate_to_db.py"), "--yes"])
+            DEPLOY_STAMPS.set("catalog_hash", catalog_hash)
+
+        _deploy_set(job, state, step="reload workers", status="done", finished_at=time.time())
+
+        # Замена воркеров без простоя: новые (с новым кодом) прогреваются, потом уходят старые.
+        # Этот воркер тоже старый — поэтому деплой завершается "done" заранее, а замена идёт отдельной задачей
+        # (её строки дописываются в лог деплоя).
+        JOBS.submit("deploy.reload", _deploy_reload_workers, params={"deploy_job_id": job.id},
+                    args=(job,), exclusive=False)
+    except Exception as e:
+        _deploy_log(job, f"ERROR: {e}")
+        _deploy_set(job, state, status="error", error=str(e), finished_at=time.time())
+        raise
+
+
+def _deploy_reload_workers(reload_job, deploy_job):
+    """Задача "deploy.reload": пауза, чтобы статус "done" успел уйти в браузер, потом замена воркеров."""
+    time.sleep(0.5)
+    try:
+        return graceful_reload.rotate_workers(os.getppid(), WORKER_REGISTRY, lambda line: _deploy_log(deploy_job, line))
     except Exception as e:
-        _DEPLOY_STATE["status"] = "error"
-        _DEPLOY_STATE["error"] = str(e)
-        _DEPLOY_STATE["finished_at"] = time.time()
-        _deploy_log(f"ERROR: {e}")
+        _deploy_log(deploy_job, f"ERROR: перезапуск воркеров не удался: {e}")
+        raise
 
 
 @app.route("/api/admin/deploy/run", methods=["POST"])
@@ -1643,11 +3135,13 @@ def admin_deploy_run():
     if token != DEPLOY_ADMIN_TOKEN:
         return jsonify({"error": "Bad deploy token"}), 403
 
-    if _DEPLOY_STATE.get("status") == "running":
-        return jsonify({"error": "Deploy already running", "state": _DEPLOY_STATE}), 409
-
-    threading.Thread(target=_deploy_worker, daemon=True).start()
-    return jsonify({"status": "started", "state": _DEPLOY_STATE})
+    try:
+        job = JOBS.submit("deploy", _deploy_worker)
+    except jobs.JobConflict:
+        return jsonify({"error": "Deploy already running", "state": _deploy_state()}), 409
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"status": "started", "job_id": job["id"], "state": _deploy_state()})
 
 
 @app.route("/api/admin/deploy/job", methods=["GET"])
@@ -1656,7 +3150,84 @@ def admin_deploy_job():
     admin_check = _require_admin()
     if admin_check:
         return admin_check
-    return jsonify(_DEPLOY_STATE)
+    return jsonify(_deploy_state())
+
+
+@app.route("/api/admin/deploy/stream", methods=["GET"])
+@login_required
+def admin_deploy_stream():
+    """
+    Поток событий деплоя (SSE): "state" — шаг/статус, "log" — строка вывода.
+    Продолжение после обрыва — по заголовку Last-Event-ID (или ?last_event_id=).
+    """
+    admin_check = _require_admin()
+    if admin_check:
+        return admin_check
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    stream = DEPLOY_EVENTS.stream(last_event_id, max_seconds=DEPLOY_STREAM_MAX_SECONDS)
+    return Response(
+        stream_with_context(stream),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # nginx: не копить ответ в буфере, отдавать события сразу
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+# ========== АДМИН: ФОНОВЫЕ ЗАДАЧИ (jobs.py) ==========
+
+# Задачи, статус которых видит не только админ: "Сохранить всё" в админке доступно редакторам
+_EDITOR_JOB_KINDS = ("menu.apply",)
+
+
+def _job_access_check(kind: str | None):
+    """Админ видит все задачи; остальные (кроме гостя) — только задачи сохранения меню."""
+    from flask_login import current_user
+    if getattr(current_user, "is_admin", False):
+        return None
+    guest_check = check_not_guest()
+    if guest_check:
+        return guest_check
+    if kind not in _EDITOR_JOB_KINDS:
+        return jsonify({"error": "Доступ запрещен"}), 403
+    return None
+
+
+@app.route("/api/admin/jobs", methods=["GET"])
+@login_required
+def admin_jobs_list():
+    """Последние задачи (?kind=deploy&limit=20) и пулы этого воркера."""
+    admin_check = _require_admin()
+    if admin_check:
+        return admin_check
+    try:
+        kind = (request.args.get("kind") or "").strip() or None
+        limit = max(1, min(request.args.get("limit", default=20, type=int) or 20, 200))
+        return jsonify({"jobs": JOBS.store.recent(kind, limit), "runner": JOBS.stats()})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/admin/jobs/<int:job_id>", methods=["GET"])
+@login_required
+def admin_job_status(job_id):
+    """
+    Статус одной задачи из любого воркера: строка задачи + лог.
+    ?after_log=<id> — только строки лога после этой (для опроса без повторов), ?log_limit= — сколько строк.
+    """
+    try:
+        job = JOBS.store.get(job_id)
+        access_check = _job_access_check(job["kind"] if job else None)
+        if access_check:
+            return access_check
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        after_log = request.args.get("after_log", default=0, type=int) or 0
+        log_limit = max(1, min(request.args.get("log_limit", default=500, type=int) or 500, 2000))
+        return jsonify({**job, "logs": JOBS.store.logs(job_id, after_log, log_limit)})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
 # ========== ОТДАЧА СТАТИКИ ФРОНТЕНДА (React) ==========
 
@@ -1671,32 +3242,69 @@ def serve_frontend(path):
     """
     # Проверяем, что это не API или статические маршруты
     if path.startswith('api/') or path.startswith('images/') or \
-       path.startswith('audio/') or path.startswith('menus/') or path.startswith('trainer/'):
+       path.startswith('audio/') or path.startswith('menus/') or path.startswith('trainer/') or \
+       path.startswith('sprites/'):
         return jsonify({'error': 'Not found'}), 404
     
     # Если запрошен РЕАЛЬНЫЙ файл из сборки (например /icons/logo.png, /manifest.webmanifest, /asset-manifest.json),
     # отдаём его как есть. Иначе React Router сломается, потому что файл заменится на index.html.
     if path:
-        requested_file = FRONTEND_BUILD_DIR / path
-        if requested_file.exists() and requested_file.is_file():
-            guessed_mime, _ = mimetypes.guess_type(str(requested_file))
-            return send_from_directory(str(FRONTEND_BUILD_DIR), path, mimetype=guessed_mime)
+        entry = STATIC_MANIFEST.lookup('frontend', path)
+        if entry:
+            # static/js|css|media/* у React уже содержат хеш в имени файла — их можно кэшировать навсегда
+            return _send_static_entry(entry, immutable_hint=entry.rel.startswith('static/'))
     
     # Для всех остальных маршрутов отдаём index.html (React Router)
-    if FRONTEND_INDEX.exists():
-        return send_file(str(FRONTEND_INDEX))
+    index_entry = STATIC_MANIFEST.lookup('frontend', FRONTEND_INDEX.name)
+    if index_entry:
+        return _send_static_entry(index_entry)
     else:
         return jsonify({
             'error': 'Frontend not built',
             'message': 'Please build the frontend first: cd frontend && npm run build'
         }), 503
 
+# ========== ПРОГРЕВ ВОРКЕРА ==========
+
+def _warm_up():
+    """
+    Прогрев нового воркера (хук post_worker_init в gunicorn.conf.py): каталог, представления и
+    готовые байты популярных ответов строятся ДО первого живого запроса.
+    Заодно запускается очередь обратной связи (дописывает журналы упавших воркеров).
+    """
+    _start_feedback_queue()
+    with app.test_client() as client:
+        for path in WARMUP_PATHS:
+            resp = client.get(path)
+            if resp.status_code >= 400:
+                app.logger.warning(f"Прогрев: {path} -> {resp.status_code}")
+
+
+app.extensions["sabor_lifecycle"] = graceful_reload.WorkerLifecycle(WORKER_REGISTRY, _warm_up, logger=app.logger)
+
 # ========== ИНИЦИАЛИЗАЦИЯ БАЗЫ ДАННЫХ ==========
 
 # Создаём таблицы при первом запуске (если их ещё нет)
 with app.app_context():
     db.create_all()
 
+    # Обратная связь: индексы для существующей таблицы, счётчик непрочитанных, архив старых
+    try:
+        feedback_inbox.ensure_schema()
+        archived = feedback_inbox.archive_read(FEEDBACK_ARCHIVE_DAYS)
+        db.session.commit()
+        if archived:
+            app.logger.info(f"Обратная связь: в архив перенесено {archived} сообщений")
+    except Exception as e:
+        db.session.rollback()
+        app.logger.warning(f"Не удалось подготовить таблицы обратной связи: {e}")
+
+    # Фоновые задачи: убрать старые завершённые (и их лог), чтобы файл задач не рос бесконечно
+    try:
+        JOBS.store.prune(JOBS_KEEP_DAYS)
+    except Exception as e:
+        app.logger.warning(f"Не удалось почистить старые фоновые задачи: {e}")
+
     def _bootstrap_admin_if_configured():
         """
         KISS-предохранитель: если база пустая/сброшена и админа нет,
@@ -1780,5 +3388,9 @@ with app.app_context():
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
     debug = os.getenv('FLASK_DEBUG', 'True').lower() == 'true'
+    # Локальный сервер: хуков gunicorn нет — журналы прошлых запусков подбираем сразу
+    # (при debug — только в процессе, который отвечает на запросы, а не в наблюдателе перезагрузки)
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        _start_feedback_queue()
     app.run(debug=debug, port=port, host='0.0.0.0')
 
@@ -0,0 +1,260 @@
+"""
+Индекс озвучки: какой MP3 относится к какой позиции меню.
+
+Зачем нужно:
+- файлы audio/en/*.mp3 и audio/wine/*.mp3 связаны с блюдами только по имени (транслит названия);
+- клиент "угадывал" URL, а /audio/... отвечал 404, если угадал неправильно;
+- service worker не знал, сколько весит озвучка конкретного меню, и не мог качать её выборочно.
+
+Теперь при сборке каталога для каждой позиции находим файл(ы) озвучки и запоминаем:
+размер, длительность и хеш содержимого. Заодно видно проблемы:
+- **missing** — у позиции указан путь к аудио, но файла нет;
+- **orphaned** — файл лежит в audio/, но ни одна позиция на него не ссылается.
+
+Тех-термин: **длительность MP3** читаем из заголовков, не декодируя звук:
+- если в первом кадре есть заголовок Xing/Info/VBRI — там записано число кадров (точно, и для VBR);
+- иначе считаем файл CBR (постоянный битрейт): длительность = размер_аудио * 8 / битрейт.
+"""
+
+import re
+import struct
+from pathlib import Path
+
+# Битрейты MPEG Layer III, кбит/с (индекс 0 — "free", 15 — запрещён)
+_BITRATES_V1_L3 = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, None)
+_BITRATES_V2_L3 = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, None)
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+# Сколько байт от начала аудио читаем в поисках первого кадра
+_SCAN_BYTES = 64 * 1024
+
+# Транслитерация в стиле, которым названы файлы в audio/en (ё -> e, х -> h, щ -> sch, ь/ъ -> "")
+_TRANSLIT = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh",
+    "з": "z", "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "h", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "sch", "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu",
+    "я": "ya",
+}
+
+
+def slugify(text: str) -> str:
+    """'Томат и краб' -> 'tomat-i-krab' (так же, как называются файлы озвучки)."""
+    out = "".join(_TRANSLIT.get(ch, ch) for ch in str(text or "").lower())
+    out = out.replace("'", "").replace("’", "")
+    return re.sub(r"[^a-z0-9]+", "-", out).strip("-")
+
+
+def audio_rel_from_src(src) -> str | None:
+    """
+    "../audio/en/a.mp3" -> "en/a.mp3" (путь внутри папки audio).
+    Пустые/битые пути ("../audio/en/..mp3") -> None.
+    """
+    path = str(src or "").split("?", 1)[0].strip()
+    while path.startswith("../") or path.startswith("./"):
+        path = path.split("/", 1)[1]
+    path = path.lstrip("/")
+    if not path.startswith("audio/"):
+        return None
+    rel = path[len("audio/"):]
+    stem = rel.rsplit("/", 1)[-1].rsplit(".", 1)[0]
+    if not rel or not stem.strip("."):
+        return None
+    return rel
+
+
+def declared_audio(item: dict) -> dict[str, str]:
+    """Пути к озвучке, указанные в позиции: {"en": "../audio/en/a.mp3"} (из i18n.<lang>.audio-<lang>)."""
+    out = {}
+    i18n = item.get("i18n")
+    if not isinstance(i18n, dict):
+        return out
+    for lang, block in i18n.items():
+        if isinstance(block, dict) and block.get(f"audio-{lang}"):
+            out[lang] = str(block[f"audio-{lang}"])
+    return out
+
+
+def _id3v2_size(head: bytes) -> int:
+    """Размер тега ID3v2 в начале файла (0, если тега нет)."""
+    if len(head) < 10 or head[:3] != b"ID3":
+        return 0
+    size = 0
+    for b in head[6:10]:
+        size = (size << 7) | (b & 0x7F)  # "syncsafe" число: по 7 бит на байт
+    footer = 10 if head[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _parse_frame_header(data: bytes, pos: int):
+    """Разбирает 4-байтовый заголовок кадра Layer III. None — если это не заголовок."""
+    if pos + 4 > len(data):
+        return None
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    if data[pos] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version = (b1 >> 3) & 0x03      # 3 = MPEG1, 2 = MPEG2, 0 = MPEG2.5
+    layer = (b1 >> 1) & 0x03        # 1 = Layer III
+    if version == 1 or layer != 1:
+        return None
+    bitrate_idx = (b2 >> 4) & 0x0F
+    rate_idx = (b2 >> 2) & 0x03
+    if rate_idx == 3:
+        return None
+    table = _BITRATES_V1_L3 if version == 3 else _BITRATES_V2_L3
+    bitrate = table[bitrate_idx]
+    if not bitrate:
+        return None
+    sample_rate = _SAMPLE_RATES[version][rate_idx]
+    samples = 1152 if version == 3 else 576
+    padding = (b2 >> 1) & 0x01
+    frame_len = (samples // 8) * bitrate * 1000 // sample_rate + padding
+    mono = ((b3 >> 6) & 0x03) == 3
+    return {
+        "version": version,
+        "bitrate": bitrate * 1000,
+        "sample_rate": sample_rate,
+        "samples": samples,
+        "frame_len": frame_len,
+        "mono": mono,
+    }
+
+
+def _vbr_frames(data: bytes, pos: int, hdr: dict) -> int | None:
+    """Число кадров из заголовка Xing/Info или VBRI (если он есть в первом кадре)."""
+    if hdr["version"] == 3:
+        side_info = 17 if hdr["mono"] else 32
+    else:
+        side_info = 9 if hdr["mono"] else 17
+    xing = pos + 4 + side_info
+    tag = data[xing:xing + 4]
+    if tag in (b"Xing", b"Info") and len(data) >= xing + 12:
+        flags = struct.unpack(">I", data[xing + 4:xing + 8])[0]
+        if flags & 0x01:
+            return struct.unpack(">I", data[xing + 8:xing + 12])[0]
+    vbri = pos + 4 + 32
+    if data[vbri:vbri + 4] == b"VBRI" and len(data) >= vbri + 18:
+        return struct.unpack(">I", data[vbri + 14:vbri + 18])[0]
+    return None
+
+
+def mp3_duration(path: Path) -> float | None:
+    """Длительность MP3 в секундах (до сотых) или None, если файл не похож на MP3."""
+    path = Path(path)
+    try:
+        size = path.stat().st_size
+        with open(path, "rb") as f:
+            head = f.read(10)
+            start = _id3v2_size(head)
+            f.seek(start)
+            data = f.read(_SCAN_BYTES)
+            f.seek(max(0, size - 128))
+            has_id3v1 = f.read(3) == b"TAG"
+    except OSError:
+        return None
+
+    # Ищем первый кадр; "настоящий" — если сразу за ним начинается следующий кадр
+    pos = data.find(b"\xff")
+    while 0 <= pos < len(data) - 4:
+        hdr = _parse_frame_header(data, pos)
+        if hdr:
+            nxt = pos + hdr["frame_len"]
+            if nxt + 4 > len(data) or _parse_frame_header(data, nxt):
+                break
+        pos = data.find(b"\xff", pos + 1)
+    else:
+        return None
+
+    frames = _vbr_frames(data, pos, hdr)
+    if frames:
+        seconds = frames * hdr["samples"] / hdr["sample_rate"]
+    else:
+        audio_bytes = size - start - pos - (128 if has_id3v1 else 0)
+        seconds = audio_bytes * 8 / hdr["bitrate"]
+    return round(seconds, 2)
+
+
+class AudioIndex:
+    """
+    Сопоставление позиций меню и файлов озвучки.
+
+    entries — записи статического манифеста для корня "audio" ({rel: StaticEntry}).
+    Длительность кэшируется по хешу файла, поэтому пересборка каталога не перечитывает MP3.
+    """
+
+    def __init__(self):
+        self._durations: dict[str, float | None] = {}
+
+    def _duration(self, entry) -> float | None:
+        if entry.etag not in self._durations:
+            self._durations[entry.etag] = mp3_duration(entry.path)
+        return self._durations[entry.etag]
+
+    def describe(self, entry, source: str) -> dict:
+        """Метаданные одного файла в том виде, в каком их видит клиент."""
+        return {
+            "url": f"/audio/{entry.rel}?v={entry.etag[:12]}",
+            "size": entry.size,
+            "duration": self._duration(entry),
+            "hash": entry.etag,
+            "source": source,  # declared — путь из данных; slug — найден по названию
+        }
+
+    @staticmethod
+    def _slug_candidates(item: dict, lang: str) -> list[str]:
+        """Возможные имена файла: по русскому названию (блюда) и по названию на языке озвучки (вина)."""
+        folder = "wine" if item.get("menu") == "Вино" else lang
+        titles = [item.get("title")]
+        block = (item.get("i18n") or {}).get(lang)
+        if isinstance(block, dict):
+            titles.append(block.get(f"title-{lang}"))
+        out = []
+        for title in titles:
+            slug = slugify(title)
+            if slug:
+                for name in (slug, f"vino-{slug}") if folder == "wine" else (slug,):
+                    rel = f"{folder}/{name}.mp3"
+                    if rel not in out:
+                        out.append(rel)
+        return out
+
+    def resolve(self, item: dict, entries: dict, langs=("en",)) -> dict:
+        """
+        Озвучка одной позиции: {lang: описание файла}.
+        Если путь не указан (или битый/файла нет) — пробуем найти файл по транслиту названия.
+        """
+        found = {}
+        declared = declared_audio(item)
+        for lang in sorted(set(langs) | set(declared)):
+            rel = audio_rel_from_src(declared.get(lang))
+            entry = entries.get(rel) if rel else None
+            if entry:
+                found[lang] = self.describe(entry, "declared")
+                continue
+            for cand in self._slug_candidates(item, lang):
+                entry = entries.get(cand)
+                if entry:
+                    found[lang] = self.describe(entry, "slug")
+                    break
+        return found
+
+    @staticmethod
+    def report(items: list[dict], entries: dict) -> dict:
+        """
+        Проблемы с озвучкой по уже собранному каталогу (items с полем audio):
+        missing — позиции с указанным, но ненайденным файлом; orphaned — файлы без позиции.
+        """
+        used = set()
+        missing = []
+        for it in items:
+            audio = it.get("audio") or {}
+            for meta in audio.values():
+                used.add(meta["url"].split("?", 1)[0][len("/audio/"):])
+            for lang, src in declared_audio(it).items():
+                if lang not in audio:
+                    missing.append({"id": it.get("id"), "menu": it.get("menu"), "lang": lang, "declared": src})
+        orphaned = sorted(
+            rel for rel in entries
+            if rel.lower().endswith(".mp3") and rel not in used
+        )
+        return {"missing": missing, "orphaned": orphaned}
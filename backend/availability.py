@@ -0,0 +1,189 @@
+"""
+Стоп-лист ("86"): что сейчас нельзя заказать — отдельно от тяжёлого каталога.
+
+Как было:
+- снять блюдо с продажи можно было только полной правкой позиции (PUT /api/admin/dishes/<id>):
+  переписывались оба JSON-файла и строка в БД, а каталог во всех воркерах собирался заново;
+- посреди смены, когда стоп-лист меняется каждые несколько минут, это дорого и медленно.
+
+Как стало:
+- маленькая таблица stop_list (строка есть = позиция на стопе) + счётчик версии в counters;
+- в каждом воркере — словарь {id: запись стоп-листа} в памяти, с этой версией;
+- переключение = одна короткая транзакция (строка + версия) и запись версии в файл-сигнал.
+  Каталог, JSON и снимки не трогаются;
+- другие воркеры сверяют файл-сигнал (один stat, как отпечаток каталога) и перечитывают
+  крошечную таблицу только когда версия поменялась;
+- ответы каталога получают поле available (и stop — причина/время) поверх готового снимка;
+  версия стоп-листа входит в ключ кэша ответа и в ETag.
+
+Тех-термины:
+- **86** (жарг. общепита) — "закончилось, снять с продажи";
+- **overlay** (наложение) — поверх неизменяемого снимка добавляем пару полей в копию позиции;
+- **файл-сигнал** — файл, который переписывают после каждой записи: по его mtime все воркеры
+  дёшево узнают "данные поменялись".
+"""
+
+import os
+import threading
+from pathlib import Path
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from catalog import short_hash
+from models import db, Counter, StopListItem
+
+VERSION_COUNTER = "availability_version"
+# Больше ID за раз не берём: у SQLite ограничение на число параметров в одном запросе
+MAX_IDS = 500
+MAX_NOTE_LENGTH = 200
+
+
+class StopList:
+    """
+    Неизменяемый снимок стоп-листа: version + {id: {"id", "note", "stopped_at", "stopped_by"}}.
+    items НЕЛЬЗЯ менять снаружи — их читают параллельные запросы.
+    """
+
+    def __init__(self, version: int, items: dict[str, dict]):
+        self.version = version
+        self.items = items
+
+    def is_available(self, item_id) -> bool:
+        return str(item_id) not in self.items
+
+    def item_tag(self, item_id) -> str:
+        """Добавка к ETag позиции: "" (в продаже) или "-stop<хеш записи>"."""
+        entry = self.items.get(str(item_id))
+        if entry is None:
+            return ""
+        return "-stop" + short_hash(f"{entry['note']}|{entry['stopped_at']}".encode("utf-8"), 6)
+
+    def overlay(self, item: dict | None) -> dict | None:
+        """Копия позиции с available (и stop, если на стопе). Исходный dict не меняем — это общий снимок."""
+        if not isinstance(item, dict):
+            return item
+        entry = self.items.get(str(item.get("id") or ""))
+        if entry is None:
+            return {**item, "available": True}
+        return {**item, "available": False, "stop": {"note": entry["note"], "stopped_at": entry["stopped_at"]}}
+
+    def overlay_list(self, items: list) -> list:
+        return [self.overlay(it) for it in items]
+
+    def to_dict(self, include_staff: bool = False) -> dict:
+        """
+        include_staff=False — публичный вид (GET /api/availability, общий кэш): без stopped_by.
+        Логины сотрудников наружу не отдаём — это ровно те имена, которые подбирают при входе.
+        """
+        if include_staff:
+            return {"version": self.version, "stop_list": list(self.items.values())}
+        return {
+            "version": self.version,
+            "stop_list": [{k: v for k, v in entry.items() if k != "stopped_by"} for entry in self.items.values()],
+        }
+
+
+class AvailabilityStore:
+    """
+    Стоп-лист в памяти воркера + таблица stop_list. Все методы — внутри app context (нужна БД).
+    signal_path — файл-сигнал версии (общий для всех воркеров, обычно в папке кэша).
+    """
+
+    def __init__(self, signal_path: Path):
+        self.signal_path = Path(signal_path)
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._current: StopList | None = None
+        self._reloads = 0
+        self._writes = 0
+
+    def _read_stamp(self):
+        try:
+            st = os.stat(self.signal_path)
+            return st.st_mtime_ns, st.st_size, st.st_ino
+        except OSError:
+            return None
+
+    def _load(self) -> StopList:
+        counter = db.session.get(Counter, VERSION_COUNTER)
+        items = {row.item_id: row.to_dict() for row in StopListItem.query.order_by(StopListItem.stopped_at)}
+        return StopList(counter.value if counter else 0, items)
+
+    def current(self) -> StopList:
+        """Текущий стоп-лист. Обычно — один stat файла-сигнала, без запроса в БД."""
+        stamp = self._read_stamp()
+        current = self._current
+        if current is not None and stamp == self._stamp:
+            return current
+        with self._lock:
+            if self._current is not None and stamp == self._stamp:
+                return self._current
+            self._current = self._load()
+            self._stamp = stamp
+            self._reloads += 1
+            return self._current
+
+    def _signal(self, version: int):
+        """Сообщить всем воркерам "стоп-лист поменялся": новый файл (новые inode/mtime)."""
+        self.signal_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.signal_path.with_name(f"{self.signal_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(str(version), encoding="utf-8")
+        os.replace(tmp, self.signal_path)
+
+    def set_available(self, ids: list[str], available: bool, note: str | None = None,
+                      by: str | None = None) -> tuple[StopList, list[str]]:
+        """
+        Вернуть в продажу (available=True) или поставить на стоп (False) позиции ids.
+        Одна транзакция: строки stop_list + версия. Возвращает (новый стоп-лист, id, которые реально изменились).
+        """
+        note = (note or "").strip()[:MAX_NOTE_LENGTH] or None
+        existing = {row.item_id: row for row in StopListItem.query.filter(StopListItem.item_id.in_(ids))}
+        changed = []
+        if available:
+            changed = [item_id for item_id in ids if item_id in existing]
+            if changed:
+                StopListItem.query.filter(StopListItem.item_id.in_(changed)).delete(synchronize_session=False)
+        else:
+            for item_id in ids:
+                row = existing.get(item_id)
+                if row is None:
+                    db.session.add(StopListItem(item_id=item_id, note=note, stopped_by=by))
+                    changed.append(item_id)
+                elif row.note != note:
+                    row.note = note
+                    changed.append(item_id)
+        if not changed:
+            return self.current(), []
+
+        # Версия растёт в той же транзакции (UPDATE value = value + 1 атомарен между воркерами)
+        db.session.execute(
+            sqlite_insert(Counter.__table__)
+            .values(name=VERSION_COUNTER, value=1)
+            .on_conflict_do_update(index_elements=["name"], set_={"value": Counter.__table__.c.value + 1})
+        )
+        db.session.commit()
+        with self._lock:
+            # Порядок важен: сигнал -> метка -> чтение из БД. Если другой воркер успеет записать
+            # между ними, метка окажется старше данных — это лишь одна лишняя перезагрузка,
+            # а не пропущенное изменение (как было бы при "чтение -> сигнал -> метка").
+            try:
+                counter = db.session.get(Counter, VERSION_COUNTER)
+                self._signal(counter.value if counter else 0)
+            except OSError:
+                # Без сигнала другие воркеры увидят изменение позже (при следующей записи) — не повод отвечать 500
+                pass
+            stamp = self._read_stamp()
+            self._current = self._load()
+            self._stamp = stamp
+            self._writes += 1
+            return self._current, changed
+
+    def stats(self) -> dict:
+        current = self._current
+        return {
+            "pid": os.getpid(),
+            "version": current.version if current else None,
+            "stopped": len(current.items) if current else None,
+            "reloads": self._reloads,
+            "writes": self._writes,
+        }
@@ -0,0 +1,102 @@
+"""
+Бенчмарк: нормализация HTML-полей меню — старый скрипт (регулярные выражения) vs html_normalizer.
+
+Что меряем на записях data/menu-database.json (поля contains, features, i18n.en.contains-en):
+- regex: clean_html_content_regex из clean_html_formatting.py (20+ проходов re.sub на строку)
+- single-pass: html_normalizer без памяти (кэш очищается перед каждым проходом)
+- memo: html_normalizer с памятью — так работает повторное сохранение из админки
+  (HTML почти всегда тот же, что уже лежит в базе)
+
+Заодно проверяем главное: нормализатор не теряет текст (видимый текст без тегов и пробелов
+до и после совпадает). Для сравнения показываем, на скольких полях текст теряет regex-версия.
+
+Запуск (из папки backend):
+  python bench_html_normalizer.py
+  python bench_html_normalizer.py --repeat 50 ../data/menu-database.json
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import html_normalizer  # noqa: E402
+from clean_html_formatting import clean_html_content_regex  # noqa: E402
+
+
+def _html_values(items: list[dict]) -> list[str]:
+    """Все значения HTML-полей (те же поля, что нормализуются при записи)."""
+    values = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        for path in html_normalizer.HTML_FIELDS:
+            val = item
+            for key in path:
+                val = val.get(key) if isinstance(val, dict) else None
+            if isinstance(val, str) and val:
+                values.append(val)
+    return values
+
+
+def _time(fn, values: list[str], repeat: int, before=None) -> float:
+    """Медиана времени одного прохода по всем значениям, секунды."""
+    timings = []
+    for _ in range(repeat):
+        if before:
+            before()
+        started = time.perf_counter()
+        for v in values:
+            fn(v)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нормализация HTML: regex-скрипт vs однопроходный нормализатор")
+    parser.add_argument("--repeat", type=int, default=20, help="повторов каждого замера")
+    parser.add_argument("path", nargs="?", default=str(ROOT / "data" / "menu-database.json"))
+    args = parser.parse_args()
+
+    items = json.loads(Path(args.path).read_text(encoding="utf-8"))
+    values = _html_values(items)
+    with_tags = sum(1 for v in values if "<" in v)
+
+    lost = []
+    regex_lost = 0
+    for v in values:
+        html_normalizer._memo.clear()
+        try:
+            html_normalizer.normalize_html(v)
+        except html_normalizer.HtmlNormalizeError:
+            lost.append(v)
+        if html_normalizer.visible_text(clean_html_content_regex(v)) != html_normalizer.visible_text(v):
+            regex_lost += 1
+    values = [v for v in values if v not in lost]
+
+    regex_s = _time(clean_html_content_regex, values, args.repeat)
+    single_s = _time(html_normalizer.normalize_html, values, args.repeat, before=html_normalizer._memo.clear)
+    # Память прогрета последним проходом single-pass
+    memo_s = _time(html_normalizer.normalize_html, values, args.repeat)
+
+    print(f"Файл: {args.path}")
+    print(f"Записей: {len(items)}, HTML-полей: {len(values)} (с тегами: {with_tags}), повторов: {args.repeat}\n")
+    print(f"{'вариант':<12} {'проход, мс':>11} {'на поле, мкс':>13} {'ускорение':>10}")
+    for name, seconds in (("regex", regex_s), ("single-pass", single_s), ("memo", memo_s)):
+        per_field = seconds / max(1, len(values)) * 1_000_000
+        print(f"{name:<12} {seconds * 1000:>11.2f} {per_field:>13.1f} {regex_s / seconds:>9.1f}x")
+
+    print(f"\nПолей, где нормализатор потерял бы текст (отклонено): {len(lost)}")
+    for v in lost[:5]:
+        print("  ", repr(v[:120]))
+    print(f"Полей, где текст теряет regex-версия: {regex_lost}")
+    return 1 if lost else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
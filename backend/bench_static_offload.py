@@ -0,0 +1,112 @@
+"""
+Бенчмарк: сколько времени gunicorn-воркер занят отдачей статики — с offload и без.
+
+Идея:
+- sync-воркер gunicorn занят, пока ВСЁ тело ответа не уйдёт клиенту;
+- медленный телефон качает, скажем, 2 Мбит/с — значит 4 МБ PDF держат воркер ~16 секунд;
+- в режиме offload (X-Accel-Redirect / X-Sendfile) Flask отдаёт только заголовки,
+  а байты отправляет nginx/Apache.
+
+Что меряем для каждого файла:
+- handler_ms: реальное время работы Flask (поиск в манифесте + формирование ответа + чтение тела)
+- body_bytes: сколько байт прошло через Python
+- occupancy_s: оценка занятости воркера = handler + body_bytes / скорость клиента
+
+Запуск (из папки backend):
+  python bench_static_offload.py
+  python bench_static_offload.py --client-mbps 2 --repeat 20
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# База для бенчмарка — во временной папке (не в backend/), чтобы не трогать рабочую и не мусорить в репо
+os.environ.setdefault("SABOR_DB_PATH", str(Path(tempfile.mkdtemp(prefix="sabor-bench-")) / "bench-static.db"))
+
+import app as app_module  # noqa: E402
+from werkzeug.test import EnvironBuilder  # noqa: E402
+
+
+DEFAULT_URLS = [
+    "/images/wine/vino-prosecco-casa-defra.webp",
+    "/audio/en/anna-pavlova.mp3",
+    "/menus/kompleks_dlya_novyh_sotrudnikov_01_12_2025.pdf.pdf",
+    "/menus/waiter-guide.html",
+]
+
+
+def _run_once(url: str) -> tuple[float, int, int]:
+    """Вызывает WSGI-приложение напрямую и вычитывает тело до конца (как это делает воркер)."""
+    environ = EnvironBuilder(path=url.split("?")[0], query_string=url.partition("?")[2]).get_environ()
+    status_holder = {}
+
+    def start_response(status, headers, exc_info=None):
+        status_holder["status"] = int(status.split()[0])
+
+    started = time.perf_counter()
+    body = app_module.app.wsgi_app(environ, start_response)
+    size = 0
+    try:
+        for chunk in body:
+            size += len(chunk)
+    finally:
+        if hasattr(body, "close"):
+            body.close()
+    return time.perf_counter() - started, size, status_holder.get("status", 0)
+
+
+def _bench(mode: str, urls: list[str], repeat: int, client_bps: float) -> list[dict]:
+    app_module.STATIC_OFFLOAD_MODE = mode
+    rows = []
+    for url in urls:
+        timings = []
+        size = status = 0
+        for _ in range(repeat):
+            elapsed, size, status = _run_once(url)
+            timings.append(elapsed)
+        handler = statistics.median(timings)
+        rows.append({
+            "mode": mode or "flask",
+            "url": url,
+            "status": status,
+            "handler_ms": handler * 1000,
+            "body_bytes": size,
+            "occupancy_s": handler + size / client_bps,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Занятость воркера при отдаче статики: Flask vs offload")
+    parser.add_argument("--client-mbps", type=float, default=2.0, help="скорость клиента, Мбит/с (по умолчанию 2)")
+    parser.add_argument("--repeat", type=int, default=10, help="повторов на каждый URL")
+    parser.add_argument("--mode", default="nginx", choices=["nginx", "apache"], help="режим offload для сравнения")
+    parser.add_argument("urls", nargs="*", help="URL для проверки (по умолчанию — картинка, mp3, PDF, HTML)")
+    args = parser.parse_args()
+
+    urls = args.urls or DEFAULT_URLS
+    client_bps = args.client_mbps * 1_000_000 / 8
+
+    rows = _bench("", urls, args.repeat, client_bps) + _bench(args.mode, urls, args.repeat, client_bps)
+
+    print(f"Клиент: {args.client_mbps} Мбит/с, повторов: {args.repeat}\n")
+    print(f"{'mode':<7} {'status':>6} {'handler, ms':>12} {'через Python, байт':>19} {'воркер занят, с':>16}  url")
+    for r in rows:
+        print(
+            f"{r['mode']:<7} {r['status']:>6} {r['handler_ms']:>12.2f} {r['body_bytes']:>19} "
+            f"{r['occupancy_s']:>16.3f}  {r['url']}"
+        )
+
+    flask_total = sum(r["occupancy_s"] for r in rows if r["mode"] == "flask")
+    offload_total = sum(r["occupancy_s"] for r in rows if r["mode"] != "flask")
+    print(f"\nИтого занятость воркера на один проход: flask={flask_total:.3f} с, offload={offload_total:.4f} с")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Снимок каталога (catalog snapshot) в памяти процесса.
+
+Зачем нужно:
+- /api/dishes раньше на КАЖДЫЙ запрос ходил в БД, читал JSON и заново мёрджил ~200 позиций.
+- Теперь мы собираем каталог один раз, а дальше отдаём готовые байты JSON,
+  пока данные на диске не изменятся.
+
+Тех-термины:
+- **Снимок** (snapshot): готовый список позиций + индекс по id, собранный за один проход.
+- **Отпечаток** (fingerprint): дешёвая проверка "изменилось ли что-то на диске" (mtime/размер файлов).
+- **Версия каталога**: короткий хеш содержимого снимка. Одинаковые данные = одинаковая версия,
+  даже в разных gunicorn-воркерах. Её удобно использовать в ETag.
+- **Проекция**: ответ с выбранными полями/фильтрами (например, только id + title для списка).
+  Каждую проекцию кэшируем сразу в виде готовых байтов, чтобы не сериализовать JSON повторно.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+
+def dumps_bytes(obj) -> bytes:
+    """
+    Компактная сериализация в JSON (без пробелов, кириллица как есть).
+    Так ответ заметно меньше, чем у jsonify с ensure_ascii.
+    """
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def short_hash(data: bytes, length: int = 16) -> str:
+    """Короткий sha1-хеш (для версий и ETag)."""
+    return hashlib.sha1(data).hexdigest()[:length]
+
+
+class CatalogSnapshot:
+    """
+    Неизменяемый снимок каталога.
+
+    Важно: items и by_id НЕЛЬЗЯ менять снаружи — их читают параллельные запросы.
+    Если нужно "подправить" позицию для ответа, делайте копию dict.
+    """
+
+    # Сколько разных проекций держим в памяти на одну версию.
+    # Ключи приходят от клиентов (fields/menu/section), поэтому кэш ограничен.
+    MAX_CACHED_PROJECTIONS = 64
+
+    def __init__(self, items: list[dict], fingerprint: Hashable):
+        self.items = items
+        self.fingerprint = fingerprint
+        self.by_id: dict[str, dict] = {}
+        self.item_versions: dict[str, str] = {}
+        for it in items:
+            item_id = str(it.get("id") or "").strip()
+            if not item_id or item_id in self.by_id:
+                continue
+            self.by_id[item_id] = it
+            self.item_versions[item_id] = short_hash(dumps_bytes(it), 12)
+        self.version = short_hash(
+            "|".join(f"{k}:{v}" for k, v in self.item_versions.items()).encode("utf-8")
+        )
+        self._bytes_cache: OrderedDict = OrderedDict()
+        self._derived: dict = {}
+        self._lock = threading.Lock()
+
+    def cached_bytes(self, key: Hashable, producer: Callable[[], object]) -> bytes:
+        """
+        Возвращает готовые байты JSON для ключа проекции.
+        producer вызывается только при первом обращении к ключу (в рамках этой версии).
+        """
+        with self._lock:
+            body = self._bytes_cache.get(key)
+            if body is not None:
+                self._bytes_cache.move_to_end(key)
+                return body
+
+        # Сериализуем вне блокировки: это самая "дорогая" часть
+        body = dumps_bytes(producer())
+
+        with self._lock:
+            self._bytes_cache[key] = body
+            self._bytes_cache.move_to_end(key)
+            while len(self._bytes_cache) > self.MAX_CACHED_PROJECTIONS:
+                self._bytes_cache.popitem(last=False)
+        return body
+
+
+    def derived(self, key: Hashable, producer: Callable[[], object]):
+        """
+        Производные структуры (индексы, колоды тренажёра и т.п.), посчитанные один раз на версию.
+        В отличие от cached_bytes, ключи задаёт только наш код — поэтому кэш без ограничения.
+        Результат нельзя менять снаружи (как и items).
+        """
+        with self._lock:
+            if key in self._derived:
+                return self._derived[key]
+        value = producer()
+        with self._lock:
+            return self._derived.setdefault(key, value)
+
+
+class CatalogStore:
+    """
+    Держит текущий снимок и пересобирает его, когда меняется отпечаток.
+
+    build_items: функция, которая собирает полный список позиций (БД + JSON).
+    fingerprint: функция, которая ДЁШЕВО говорит, изменились ли исходные данные.
+    """
+
+    def __init__(self, build_items: Callable[[], list[dict]], fingerprint: Callable[[], Hashable]):
+        self._build_items = build_items
+        self._fingerprint = fingerprint
+        self._snapshot: CatalogSnapshot | None = None
+        self._lock = threading.Lock()
+
+    def get(self) -> CatalogSnapshot:
+        fp = self._fingerprint()
+        snap = self._snapshot
+        if snap is not None and snap.fingerprint == fp:
+            return snap
+
+        # Пересборку делаем под блокировкой, чтобы параллельные запросы
+        # не собирали один и тот же снимок по нескольку раз.
+        with self._lock:
+            snap = self._snapshot
+            if snap is not None and snap.fingerprint == fp:
+                return snap
+            snap = CatalogSnapshot(self._build_items(), fp)
+            self._snapshot = snap
+            return snap
+
+    def invalidate(self):
+        """Сбросить снимок (следующий get() соберёт его заново)."""
+        self._snapshot = None
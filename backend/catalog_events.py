@@ -0,0 +1,261 @@
+"""
+Живые изменения каталога: GET /api/events (SSE) вместо "перекачать всё меню и сравнить".
+
+Как было:
+- админ правит блюдо — официант увидит правку, только когда его экран случайно перезапросит
+  весь каталог (перезаход на страницу, обновление).
+
+Как стало:
+- в каждом воркере один общий "вещатель" (broadcaster) — фоновый поток, который раз в секунду
+  спрашивает снимок каталога (дёшево: сверка отпечатка файлов, см. catalog.py);
+- версия поменялась -> сравниваем версии позиций старого и нового снимка и рассылаем ВСЕМ
+  подключённым клиентам одно событие: новая версия + какие id изменились/удалены;
+- клиент дозапрашивает только эти позиции (/api/dishes/batch), а не весь каталог.
+
+Почему это дёшево при сотне "молчащих" подключений:
+- клиенты не опрашивают ни базу, ни каталог: каждый просто ждёт на общем Condition;
+- проверку делает один поток на воркер, а не каждый клиент;
+- правки из другого воркера тоже видны: они меняют отпечаток (mtime JSON), общий для всех.
+
+Номер события (id) — версия каталога. Это хеш содержимого, он одинаков во всех воркерах,
+поэтому переподключение с Last-Event-ID работает, даже если клиент попал в другой воркер:
+если такая версия есть в недавней истории — клиент получает объединённый список пропущенных id,
+если нет — событие с full=true ("перезапроси всё").
+
+Тех-термины:
+- **fan-out** (рассылка) — одно событие уходит всем подписчикам;
+- **Condition** — "ждите, пока разбужу": потоки спят без нагрузки, notify_all будит всех разом;
+- **heartbeat** — комментарий раз в N секунд, чтобы прокси не закрыл молчащее соединение.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+def format_sse(event: str, data, event_id: str | None = None) -> str:
+    """Одно событие в формате text/event-stream."""
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+    return "\n".join(lines) + "\n\n"
+
+
+def diff_versions(old: dict[str, str], new: dict[str, str]) -> tuple[list[str], list[str]]:
+    """(изменённые или новые id, удалённые id) между двумя наборами версий позиций."""
+    changed = [item_id for item_id, v in new.items() if old.get(item_id) != v]
+    removed = [item_id for item_id in old if item_id not in new]
+    return changed, removed
+
+
+class TooManyListeners(Exception):
+    """Воркер уже держит максимум подключений (в API это 503 + Retry-After)."""
+
+
+class _ListenerStream:
+    """
+    Поток одного подписчика, место которого уже занято в stream().
+    Место освобождается ровно один раз: когда поток закончился, упал или его закрыли (close()),
+    в том числе если до первого шага дело так и не дошло — у незапущенного генератора finally не сработает.
+    """
+
+    def __init__(self, gen, release):
+        self._gen = gen
+        self._release = release
+        self._released = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._gen)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        self._gen.close()
+        if not self._released:
+            self._released = True
+            self._release()
+
+    def __del__(self):
+        self.close()
+
+
+class CatalogBroadcaster:
+    """
+    current() -> (версия, {id: версия позиции}) — текущее состояние каталога (дёшево, из снимка).
+    Поток проверки запускается при первом подписчике и работает, только пока подписчики есть.
+    """
+
+    def __init__(self, current, interval: float = 1.0, history: int = 64,
+                 max_listeners: int = 100, logger=None):
+        self.current = current
+        self.interval = max(0.1, interval)
+        self.max_listeners = max(1, max_listeners)
+        self.logger = logger
+        self._history_size = max(1, history)
+        self._pid = None
+        self._cond = threading.Condition()
+        self._start_lock = threading.Lock()
+        self._events: deque = deque(maxlen=self._history_size)
+        self._seq = 0
+        self._version = None
+        self._item_versions: dict[str, str] = {}
+        self._listeners = 0
+        self._broadcasts = 0
+        self._last_error = None
+
+    # ---------- поток проверки ----------
+
+    def _ensure_started(self):
+        """Поднять поток проверки (один на процесс; после fork — заново)."""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._start_lock:
+            if self._pid == pid:
+                return
+            self._cond = threading.Condition()
+            self._events = deque(maxlen=self._history_size)
+            self._listeners = 0
+            self._version, self._item_versions = self.current()
+            self._pid = pid
+            threading.Thread(target=self._run, name="catalog-events", daemon=True).start()
+
+    def _run(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            with self._cond:
+                while not self._listeners:
+                    self._cond.wait()
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception as e:
+                self._last_error = str(e)
+                if self.logger:
+                    self.logger.warning(f"catalog events: проверка каталога не удалась: {e}")
+
+    def check(self) -> bool:
+        """Сверить каталог с последней разосланной версией; если поменялся — разослать событие."""
+        version, item_versions = self.current()
+        with self._cond:
+            if version == self._version:
+                return False
+            changed, removed = diff_versions(self._item_versions, item_versions)
+            self._seq += 1
+            self._events.append({
+                "seq": self._seq,
+                "version": version,
+                "previous": self._version,
+                "changed": changed,
+                "removed": removed,
+            })
+            self._version, self._item_versions = version, item_versions
+            self._broadcasts += 1
+            self._cond.notify_all()
+        return True
+
+    # ---------- подписчики ----------
+
+    def _since_version(self, version: str | None) -> dict | None:
+        """
+        Что клиент пропустил с версии version (под self._cond):
+        None — ничего; иначе событие "catalog" (full=True, если истории не хватает).
+        """
+        if not version or version == self._version:
+            return None
+        changed: dict[str, None] = {}
+        removed: dict[str, None] = {}
+        found = False
+        for event in self._events:
+            if not found:
+                found = event["previous"] == version
+                if not found:
+                    continue
+            for item_id in event["changed"]:
+                changed[item_id] = None
+                removed.pop(item_id, None)
+            for item_id in event["removed"]:
+                removed[item_id] = None
+                changed.pop(item_id, None)
+        if not found:
+            return {"version": self._version, "full": True, "changed": [], "removed": []}
+        return {"version": self._version, "full": False, "changed": list(changed), "removed": list(removed)}
+
+    def stream(self, last_event_id: str | None = None, heartbeat: float = 25.0, max_seconds: float = 600.0):
+        """
+        Генератор строк text/event-stream для одного клиента.
+        Сначала "hello" (текущая версия) или пропущенное после Last-Event-ID, потом события по мере правок.
+        Слишком много подключений -> TooManyListeners (сразу, чтобы успеть ответить 503).
+        Место подписчика занимается здесь же, под той же блокировкой, что и проверка лимита, —
+        иначе параллельные подключения проходят проверку все разом.
+        """
+        self._ensure_started()
+        with self._cond:
+            if self._listeners >= self.max_listeners:
+                raise TooManyListeners()
+            self._listeners += 1
+            self._cond.notify_all()  # разбудить поток проверки, если он спал без подписчиков
+            missed = self._since_version(last_event_id)
+            version = self._version
+            seq = self._seq
+        return _ListenerStream(
+            self._stream(last_event_id, missed, version, seq, heartbeat, max_seconds),
+            self._release_listener,
+        )
+
+    def _release_listener(self):
+        with self._cond:
+            self._listeners = max(0, self._listeners - 1)
+
+    def _stream(self, last_event_id, missed, version, seq, heartbeat, max_seconds):
+        yield f"retry: {int(self.interval * 3000)}\n\n"
+        if missed:
+            yield format_sse("catalog", missed, missed["version"])
+        elif not last_event_id:
+            yield format_sse("hello", {"version": version}, version)
+        deadline = time.monotonic() + max_seconds
+        while True:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return
+            with self._cond:
+                self._cond.wait_for(lambda: self._seq != seq, timeout=min(heartbeat, left))
+                fresh = [e for e in self._events if e["seq"] > seq]
+                lost = bool(fresh) and fresh[0]["seq"] != seq + 1  # история успела вытеснить часть событий
+                seq = self._seq
+                current = self._version
+            if lost:
+                yield format_sse("catalog", {"version": current, "full": True, "changed": [], "removed": []}, current)
+            elif fresh:
+                for event in fresh:
+                    data = {
+                        "version": event["version"],
+                        "full": False,
+                        "changed": event["changed"],
+                        "removed": event["removed"],
+                    }
+                    yield format_sse("catalog", data, event["version"])
+            else:
+                yield ": ping\n\n"
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "pid": os.getpid(),
+                "running": self._pid == os.getpid(),
+                "listeners": self._listeners,
+                "max_listeners": self.max_listeners,
+                "version": self._version,
+                "broadcasts": self._broadcasts,
+                "history": len(self._events),
+                "last_error": self._last_error,
+            }
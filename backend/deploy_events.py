@@ -0,0 +1,148 @@
+"""
+Живой лог деплоя: поток событий (SSE) вместо опроса /api/admin/deploy/job.
+
+Как было:
+- страница деплоя раз в 2 секунды запрашивала весь _DEPLOY_STATE (до 200 строк лога) заново;
+- вывод команд (git, npm, миграция) копился до конца команды: 5 минут сборки — пустой экран,
+  потом сразу последние 50 строк;
+- состояние жило в памяти воркера, который запустил деплой: запрос, попавший в другой воркер, видел "idle".
+
+Как стало:
+- каждое изменение (строка лога, смена шага/статуса) — событие с номером в файле-журнале
+  deploy-events.jsonl (в папке кэша), одна JSON-строка на событие;
+- вывод команд читается построчно прямо во время работы;
+- GET /api/admin/deploy/stream отдаёт события потоком: сначала уже накопленные, потом новые по мере появления.
+  Журнал общий для всех воркеров — поток работает, в какой бы воркер ни попал браузер,
+  и переживает замену воркеров в конце деплоя;
+- при обрыве браузер сам переподключается с заголовком Last-Event-ID и получает только пропущенное.
+
+Номер события — "<запуск>.<порядковый номер>". Новый деплой = новый запуск, журнал начинается заново;
+если Last-Event-ID от прошлого запуска — поток отдаёт новый запуск целиком.
+
+Тех-термины:
+- **SSE** (Server-Sent Events) — ответ text/event-stream, который не заканчивается: сервер дописывает
+  в него события, браузер (EventSource) получает их по одному;
+- **Last-Event-ID** — номер последнего полученного события, браузер присылает его при переподключении;
+- **heartbeat** — пустой комментарий раз в N секунд, чтобы прокси не закрыл "молчащее" соединение.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# Чем закончился деплой: после такого события новых уже не будет (кроме строк замены воркеров)
+FINAL_STATUSES = ("done", "error")
+
+
+def format_sse(event: str, data, event_id: str | None = None) -> str:
+    """Одно событие в формате text/event-stream."""
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    for chunk in json.dumps(data, ensure_ascii=False).splitlines() or [""]:
+        lines.append(f"data: {chunk}")
+    return "\n".join(lines) + "\n\n"
+
+
+def parse_event_id(value: str | None) -> tuple[str, int] | None:
+    """"<запуск>.<номер>" -> (запуск, номер). Пусто/мусор -> None (отдать всё с начала)."""
+    try:
+        run, seq = (value or "").strip().rsplit(".", 1)
+        return (run, int(seq)) if run else None
+    except ValueError:
+        return None
+
+
+class DeployEventLog:
+    """
+    Журнал событий одного (последнего) деплоя. Пишет только поток деплоя, читают все воркеры.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._run = None
+        self._seq = 0
+
+    def start_run(self) -> str:
+        """Новый деплой: журнал начинается заново."""
+        with self._lock:
+            self._run = str(int(time.time() * 1000))
+            self._seq = 0
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "w", encoding="utf-8"):
+                pass
+            return self._run
+
+    def append(self, event: str, data: dict) -> str | None:
+        """Дописать событие. Ошибки диска не должны ронять деплой — тогда просто None."""
+        with self._lock:
+            if self._run is None:
+                return None
+            self._seq += 1
+            event_id = f"{self._run}.{self._seq}"
+            line = json.dumps({"id": event_id, "event": event, "data": data}, ensure_ascii=False)
+            try:
+                # Одна строка за один write в режиме "a": читатели не видят половину события
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError:
+                return None
+            return event_id
+
+    def read_from(self, offset: int) -> tuple[list[dict], int]:
+        """
+        События, дописанные после байта offset: (события, новый offset).
+        Файл стал короче offset -> начался новый деплой, читаем с начала.
+        Недописанная последняя строка остаётся на следующий раз.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                if size < offset:
+                    offset = 0
+                f.seek(offset)
+                chunk = f.read(size - offset)
+        except OSError:
+            return [], offset
+        end = chunk.rfind(b"\n") + 1
+        events = []
+        for raw in chunk[:end].splitlines():
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and record.get("id"):
+                events.append(record)
+        return events, offset + end
+
+    def stream(self, last_event_id: str | None = None, poll: float = 0.5,
+               heartbeat: float = 15.0, max_seconds: float = 300.0):
+        """
+        Генератор строк text/event-stream: накопленное после last_event_id, потом новое.
+        Через max_seconds поток закрывается (браузер переподключится с Last-Event-ID):
+        долгое соединение не держит воркер бесконечно.
+        """
+        resume = parse_event_id(last_event_id)
+        yield "retry: 3000\n\n"
+        offset = 0
+        started = last_sent = time.monotonic()
+        while True:
+            events, offset = self.read_from(offset)
+            for record in events:
+                parsed = parse_event_id(record["id"])
+                if resume and parsed and parsed[0] == resume[0] and parsed[1] <= resume[1]:
+                    continue  # это браузер уже видел
+                yield format_sse(record.get("event") or "message", record.get("data"), record["id"])
+                last_sent = time.monotonic()
+            now = time.monotonic()
+            if now - started >= max_seconds:
+                return
+            if now - last_sent >= heartbeat:
+                yield ": ping\n\n"
+                last_sent = now
+            time.sleep(poll)
@@ -0,0 +1,248 @@
+"""
+Входящие обратной связи: постраничный список, счётчик непрочитанных, массовые действия, архив.
+
+Как было:
+- /api/admin/feedback отдавал ВСЕ сообщения за всё время, сортировка по created_at без индекса;
+- "прочитано"/"удалить" — отдельный HTTP-запрос на каждое сообщение;
+- число непрочитанных фронтенд считал сам, скачав весь список.
+
+Как стало:
+- список по страницам с курсором: "следующие 50 после вот этого сообщения";
+- число непрочитанных лежит в таблице counters и меняется в той же транзакции, что и сами сообщения;
+- "прочитать выбранные / все" и "удалить выбранные" — один UPDATE/DELETE на всю пачку;
+- старые прочитанные сообщения переезжают в feedback_messages_archive: основная таблица остаётся маленькой.
+
+Тех-термины:
+- **keyset-пагинация** (курсор) — вместо OFFSET 1000 ("пропусти 1000 строк") запрос
+  "created_at < X": база сразу прыгает по индексу в нужное место, страница 100 стоит как страница 1;
+- **курсор** — непрозрачная строка с (created_at, id) последнего сообщения страницы.
+"""
+
+import base64
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, delete, insert, literal, select, text, tuple_
+
+from models import db, Counter, FeedbackArchive, FeedbackMessage
+
+UNREAD_COUNTER = "feedback_unread"
+STATUSES = ("all", "unread", "read", "archived")
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Больше ID за раз не берём: у SQLite ограничение на число параметров в одном запросе
+MAX_BULK_IDS = 500
+
+
+def encode_cursor(created_at: datetime | None, row_id: int) -> str:
+    raw = f"{created_at.isoformat() if created_at else ''}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Строка курсора -> (created_at, id). Битый курсор -> ValueError (в API это 400)."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created, row_id = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8").split("|", 1)
+        return datetime.fromisoformat(created) if created else datetime.min, int(row_id)
+    except Exception:
+        raise ValueError("bad cursor")
+
+
+def clean_ids(raw) -> list[int]:
+    """Список ID из тела запроса (числа или строки с числами), без повторов."""
+    if not isinstance(raw, list):
+        raise ValueError("ids must be a list")
+    ids = []
+    for value in raw:
+        try:
+            ids.append(int(value))
+        except (TypeError, ValueError):
+            raise ValueError(f"bad id: {value!r}")
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > MAX_BULK_IDS:
+        raise ValueError(f"too many ids (max {MAX_BULK_IDS})")
+    return ids
+
+
+def page(status: str = "all", cursor: str | None = None, limit: int = DEFAULT_PAGE_SIZE) -> dict:
+    """
+    Одна страница сообщений, новые сверху: {"items": [...], "next_cursor": "..." | None}.
+    status: all | unread | read | archived.
+    """
+    if status not in STATUSES:
+        raise ValueError(f"unknown status: {status} (allowed: {', '.join(STATUSES)})")
+    limit = max(1, min(MAX_PAGE_SIZE, int(limit)))
+
+    if status == "archived":
+        model, key = FeedbackArchive, FeedbackArchive.archive_id
+    else:
+        model, key = FeedbackMessage, FeedbackMessage.id
+    query = model.query
+    if status == "unread":
+        query = query.filter(FeedbackMessage.read == False)  # noqa: E712 (SQL, а не Python)
+    elif status == "read":
+        query = query.filter(FeedbackMessage.read == True)  # noqa: E712
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(model.created_at, key) < tuple_(created_at, row_id))
+
+    # Берём на одну строку больше: так без COUNT(*) понятно, есть ли следующая страница
+    rows = query.order_by(model.created_at.desc(), key.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.archive_id if status == "archived" else last.id)
+    return {"items": [row.to_dict() for row in rows], "next_cursor": next_cursor}
+
+
+# ---------- Счётчик непрочитанных ----------
+
+def recount_unread() -> int:
+    """Пересчитать счётчик по таблице (при старте — на случай ручных правок базы)."""
+    value = FeedbackMessage.query.filter(FeedbackMessage.read == False).count()  # noqa: E712
+    counter = db.session.get(Counter, UNREAD_COUNTER)
+    if counter is None:
+        db.session.add(Counter(name=UNREAD_COUNTER, value=value))
+    else:
+        counter.value = value
+    return value
+
+
+def unread_count() -> int:
+    """Одна строка по первичному ключу вместо COUNT(*) по всей таблице."""
+    counter = db.session.get(Counter, UNREAD_COUNTER)
+    if counter is None:
+        value = recount_unread()
+        db.session.commit()
+        return value
+    return counter.value
+
+
+def _add_unread(delta: int):
+    """
+    Изменить счётчик в текущей транзакции (коммитит вызывающий код вместе с данными).
+    UPDATE value = value + N атомарен: параллельные воркеры не затирают друг друга.
+    """
+    if not delta:
+        return
+    db.session.execute(
+        Counter.__table__.update()
+        .where(Counter.name == UNREAD_COUNTER)
+        .values(value=db.func.max(0, Counter.value + delta))
+    )
+
+
+def add_message(name: str, type_: str, message: str, created_at: datetime | None = None,
+                ref: str | None = None) -> FeedbackMessage:
+    """Новое (непрочитанное) сообщение + счётчик. Коммит — за вызывающим кодом."""
+    feedback = _new_message(name, type_, message, created_at, ref)
+    _add_unread(1)
+    return feedback
+
+
+def _new_message(name, type_, message, created_at, ref) -> FeedbackMessage:
+    feedback = FeedbackMessage(name=name, type=type_, message=message, read=False, ref=ref,
+                               created_at=created_at or datetime.utcnow())
+    db.session.add(feedback)
+    return feedback
+
+
+def write_batch(records: list[dict]) -> int:
+    """
+    Пачка из очереди (feedback_queue.py) — в текущую транзакцию. Коммит — за вызывающим кодом.
+    Уже записанные ref пропускаются (журнал мог быть повторён после падения воркера).
+    """
+    refs = [r["ref"] for r in records]
+    done = {ref for (ref,) in db.session.query(FeedbackMessage.ref).filter(FeedbackMessage.ref.in_(refs))}
+    added = 0
+    for record in records:
+        if record["ref"] in done:
+            continue
+        done.add(record["ref"])
+        created_at = None
+        try:
+            created_at = datetime.fromisoformat(record["created_at"]) if record.get("created_at") else None
+        except ValueError:
+            pass
+        _new_message(
+            record.get("name") or "",
+            record.get("type") or "question",
+            record.get("message") or "",
+            created_at,
+            record["ref"],
+        )
+        added += 1
+    _add_unread(added)  # один UPDATE счётчика на всю пачку
+    return added
+
+
+# ---------- Массовые действия ----------
+
+def mark_read(ids: list[int] | None) -> int:
+    """Отметить прочитанными (ids=None — все непрочитанные). Возвращает, сколько реально изменилось."""
+    query = FeedbackMessage.query.filter(FeedbackMessage.read == False)  # noqa: E712
+    if ids is not None:
+        if not ids:
+            return 0
+        query = query.filter(FeedbackMessage.id.in_(ids))
+    updated = query.update({FeedbackMessage.read: True}, synchronize_session=False)
+    _add_unread(-updated)
+    return updated
+
+
+def delete_messages(ids: list[int]) -> int:
+    """
+    Удалить сообщения. Два DELETE (сначала непрочитанные, потом остальные):
+    первый сразу говорит, на сколько уменьшить счётчик — без отдельного SELECT.
+    """
+    if not ids:
+        return 0
+    base = FeedbackMessage.query.filter(FeedbackMessage.id.in_(ids))
+    unread = base.filter(FeedbackMessage.read == False).delete(synchronize_session=False)  # noqa: E712
+    rest = base.delete(synchronize_session=False)
+    _add_unread(-unread)
+    return unread + rest
+
+
+def archive_read(older_than_days: int) -> int:
+    """
+    Перенести прочитанные сообщения старше N дней в архив (INSERT ... SELECT + DELETE).
+    Условие read = 1 AND created_at < X идёт ровно по индексу (read, created_at).
+    """
+    if older_than_days <= 0:
+        return 0
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    src = FeedbackMessage.__table__
+    old = (src.c.read == True) & (src.c.created_at < cutoff)  # noqa: E712
+    moved = db.session.execute(
+        insert(FeedbackArchive.__table__).from_select(
+            ["id", "name", "type", "message", "read", "created_at", "archived_at"],
+            select(
+                src.c.id, src.c.name, src.c.type, src.c.message, src.c.read, src.c.created_at,
+                literal(datetime.utcnow(), DateTime),
+            ).where(old),
+        )
+    ).rowcount
+    if moved:
+        db.session.execute(delete(src).where(old))
+    return moved
+
+
+def ensure_schema():
+    """
+    При старте: колонка ref и индексы для уже существующей таблицы (create_all добавляет их
+    только новым таблицам),
+    read = NULL -> 0 (иначе такие строки не попадают ни в одну вкладку), пересчёт счётчика.
+    """
+    columns = {row[1] for row in db.session.execute(text("PRAGMA table_info(feedback_messages)"))}
+    if "ref" not in columns:
+        db.session.execute(text("ALTER TABLE feedback_messages ADD COLUMN ref VARCHAR(40)"))
+        db.session.commit()
+    for index in FeedbackMessage.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+    FeedbackMessage.query.filter(FeedbackMessage.read.is_(None)).update(
+        {FeedbackMessage.read: False}, synchronize_session=False
+    )
+    recount_unread()
@@ -0,0 +1,246 @@
+"""
+Очередь записи обратной связи: запрос не ждёт SQLite.
+
+Как было:
+- каждый POST /api/feedback открывал транзакцию записи и ждал fsync базы прямо в запросе;
+- SQLite пишет по одному: в конце смены (все отправляют отзывы разом) запросы стояли в очереди
+  за блокировкой записи, а gunicorn-воркеры были заняты ожиданием.
+
+Как стало:
+- запрос дописывает сообщение строкой JSON в свой файл-журнал (spool) и делает fsync —
+  это короткая запись в отдельный файл, ни с кем не конкурирующая;
+- ответ сразу: "принято", с временным id (ref);
+- фоновый поток раз в interval секунд пишет накопившееся в базу ОДНОЙ транзакцией (пачкой)
+  и очищает журнал;
+- если воркер упал, журнал остался на диске: следующий запущенный воркер подберёт его и допишет.
+  Повтор не создаёт дублей: ref сохраняется в базе, уже записанные ref пропускаются.
+
+У каждого процесса свой журнал feedback-<pid>.jsonl, пока процесс жив — файл заблокирован (flock).
+Незаблокированный чужой журнал = процесс умер, его можно забрать.
+На Windows (нет fcntl) блокировок нет: считаем, что процесс один (локальная разработка).
+
+Тех-термины:
+- **spool** (журнал, "катушка") — файл, куда сначала складывают данные, чтобы обработать позже;
+- **fsync** — просьба к ОС реально записать файл на диск, а не держать в памяти;
+- **group commit** (пачечная запись) — одна транзакция на много сообщений вместо транзакции на каждое.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+SPOOL_PREFIX = "feedback-"
+SPOOL_SUFFIX = ".jsonl"
+
+
+def new_ref() -> str:
+    """Временный id сообщения (до записи в базу). Он же ключ от дублей при повторе журнала."""
+    return uuid.uuid4().hex
+
+
+def _try_lock(f) -> bool:
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _read_records(f) -> list[dict]:
+    """Строки журнала. Недописанная последняя строка (процесс упал посреди write) пропускается."""
+    f.seek(0)
+    records = []
+    for line in f.read().splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(record, dict) and record.get("ref"):
+            records.append(record)
+    return records
+
+
+class FeedbackQueue:
+    """
+    flush(records) пишет пачку в базу (одной транзакцией) или бросает исключение —
+    тогда пачка остаётся в очереди и журнале, повтор через паузу.
+    """
+
+    def __init__(self, spool_dir: Path, flush, batch_size: int = 100, interval: float = 0.5, logger=None):
+        self.spool_dir = Path(spool_dir)
+        self.flush = flush
+        self.batch_size = max(1, batch_size)
+        self.interval = max(0.01, interval)
+        self.logger = logger
+        self._pid = None
+        self._path = None
+        self._file = None
+        self._pending: list[dict] = []
+        self._cond = threading.Condition()
+        self._start_lock = threading.Lock()
+        self._stopping = False
+        self._flushed = 0
+        self._failures = 0
+        self._last_error = None
+        self._claimed = 0
+
+    # ---------- запуск ----------
+
+    def start(self):
+        """
+        Открыть свой журнал, подобрать журналы упавших процессов, запустить поток записи.
+        Можно звать сколько угодно раз; после fork (новый pid) всё поднимается заново.
+        """
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._start_lock:
+            if self._pid == pid:
+                return
+            self.spool_dir.mkdir(parents=True, exist_ok=True)
+            # После fork блокировки/потоки родителя не наследуются как надо — всё создаём заново
+            self._cond = threading.Condition()
+            self._pending = []
+            self._stopping = False
+            path = self._path = self.spool_dir / f"{SPOOL_PREFIX}{pid}{SPOOL_SUFFIX}"
+            self._file = open(path, "a+", encoding="utf-8")
+            _try_lock(self._file)
+            # Журнал с тем же pid мог остаться от давно умершего процесса
+            self._pending.extend(_read_records(self._file))
+            self._file.seek(0, os.SEEK_END)
+            self._claim_orphans(path)
+            self._pid = pid
+            threading.Thread(target=self._run, name="feedback-writer", daemon=True).start()
+
+    def _claim_orphans(self, own_path: Path):
+        for path in sorted(self.spool_dir.glob(f"{SPOOL_PREFIX}*{SPOOL_SUFFIX}")):
+            if path == own_path:
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    if not _try_lock(f):
+                        continue  # процесс жив, журнал его
+                    if not path.exists() or os.fstat(f.fileno()).st_ino != os.stat(path).st_ino:
+                        continue  # пока ждали, журнал забрал другой воркер
+                    records = _read_records(f)
+                    if records:
+                        self._append(records)
+                        self._pending.extend(records)
+                        self._claimed += len(records)
+                    path.unlink()
+            except OSError as e:
+                if self.logger:
+                    self.logger.warning(f"feedback queue: не удалось забрать журнал {path.name}: {e}")
+
+    # ---------- запись ----------
+
+    def _append(self, records: list[dict]):
+        for record in records:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def submit(self, record: dict) -> str:
+        """Положить сообщение в журнал и очередь. Возвращает ref. Ошибка диска -> OSError."""
+        self.start()
+        record = {**record, "ref": record.get("ref") or new_ref()}
+        with self._cond:
+            self._append([record])
+            self._pending.append(record)
+            self._cond.notify()
+        return record["ref"]
+
+    def _run(self):
+        failures = 0
+        pid = os.getpid()
+        while self._pid == pid:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending and self._stopping:
+                    return
+            # Окно "набора пачки": даём подтянуться соседним сообщениям
+            if not self._stopping:
+                time.sleep(self.interval)
+            with self._cond:
+                batch = list(self._pending[:self.batch_size])
+            try:
+                self.flush(batch)
+            except Exception as e:
+                failures += 1
+                self._failures += 1
+                self._last_error = str(e)
+                if self.logger:
+                    self.logger.warning(f"feedback queue: запись пачки ({len(batch)}) не удалась: {e}")
+                if self._stopping:
+                    return
+                time.sleep(min(30.0, self.interval * (2 ** min(failures, 6))))
+                continue
+            failures = 0
+            with self._cond:
+                # Новые сообщения только дописываются в конец: первые len(batch) — это наша пачка
+                del self._pending[:len(batch)]
+                self._flushed += len(batch)
+                self._rewrite_spool()
+                self._cond.notify_all()
+
+    def _rewrite_spool(self):
+        """
+        Журнал = то, что ещё не в базе. Обычно очередь пуста -> просто обрезаем файл.
+        Иначе пишем остаток во временный файл и подменяем журнал (os.replace): если процесс
+        упадёт посередине, на диске останется либо старый журнал, либо новый — но не пустой.
+        """
+        if not self._pending:
+            self._file.seek(0)
+            self._file.truncate()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            return
+        tmp = self._path.with_name(self._path.name + ".tmp")
+        new_file = open(tmp, "w+", encoding="utf-8")
+        _try_lock(new_file)  # блокируем ДО подмены, чтобы другой воркер не принял журнал за брошенный
+        old_file, self._file = self._file, new_file
+        self._append(self._pending)
+        os.replace(tmp, self._path)
+        old_file.close()
+
+    # ---------- остановка / статистика ----------
+
+    def close(self, timeout: float = 5.0):
+        """Дописать очередь перед выходом процесса (что не успели — останется в журнале)."""
+        if self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            while self._pending and time.monotonic() < deadline:
+                self._cond.wait(timeout=max(0.0, deadline - time.monotonic()))
+
+    def stats(self) -> dict:
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            "pid": os.getpid(),
+            "running": self._pid == os.getpid(),
+            "pending": pending,
+            "flushed": self._flushed,
+            "claimed_from_spool": self._claimed,
+            "failures": self._failures,
+            "last_error": self._last_error,
+            "batch_size": self.batch_size,
+            "interval_seconds": self.interval,
+        }
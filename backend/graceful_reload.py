@@ -0,0 +1,207 @@
+"""
+Деплой без простоя: прогретые новые воркеры gunicorn вместо "убить мастер и ждать systemd".
+
+Как было:
+- после git pull / npm / миграции деплой слал SIGTERM мастеру gunicorn;
+- запросы "в полёте" обрывались, пока systemd поднимал сервис, сайт не отвечал;
+- новые воркеры стартовали "холодными": первый запрос каждого строил каталог и кэши.
+
+Как стало:
+- каждый воркер после старта прогревается (каталог, популярные ответы) и отмечается "готов"
+  файлом-меткой <pid> в папке workers (хуки в gunicorn.conf.py);
+- деплой просит мастер добавить столько же новых воркеров (сигнал TTIN), ждёт их меток "готов",
+  потом просит убрать столько же (TTOU) — мастер убирает САМЫЕ СТАРЫЕ, и они спокойно
+  доотвечают текущим запросам перед выходом;
+- если воркеры не запущены через gunicorn.conf.py (меток нет) — мягкий HUP мастеру:
+  он тоже меняет воркеров на новых без обрыва соединений, только без ожидания прогрева.
+
+Плюс "пропуски" в самом деплое:
+- npm ci — только если поменялся package-lock.json (хеш сохраняется после успешной установки);
+- миграция JSON -> SQLite — только если поменялся файл каталога.
+
+Тех-термины:
+- **TTIN / TTOU** — сигналы gunicorn: "+1 воркер" / "-1 воркер" (убирается самый старый);
+- **HUP** — "перечитай настройки и замени всех воркеров", соединения не рвутся;
+- **прогрев** (warm-up) — заранее выполнить дорогую работу первого запроса.
+"""
+
+import hashlib
+import json
+import os
+import signal
+import time
+from pathlib import Path
+
+
+def file_sha256(path: Path) -> str | None:
+    """Хеш файла (None, если файла нет)."""
+    try:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        return h.hexdigest()
+    except OSError:
+        return None
+
+
+class DeployStamps:
+    """
+    Маленький JSON "что уже сделано": хеш package-lock.json после npm ci, коммит последней удачной
+    сборки фронтенда, хеш каталога после миграции.
+    Файл можно удалить — следующий деплой просто сделает всё целиком.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def load(self) -> dict:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key: str):
+        return self.load().get(key)
+
+    def set(self, key: str, value):
+        data = self.load()
+        data[key] = value
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+# ---------- Метки "воркер готов" ----------
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+class WorkerRegistry:
+    """Папка с файлами-метками <pid>: воркер прогрет и принимает запросы."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+
+    def mark_ready(self, pid: int | None = None):
+        pid = pid or os.getpid()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / str(pid)).write_text(str(time.time()), encoding="utf-8")
+
+    def mark_exit(self, pid: int | None = None):
+        try:
+            (self.directory / str(pid or os.getpid())).unlink()
+        except OSError:
+            pass
+
+    def ready_workers(self) -> dict[int, float]:
+        """{pid: когда прогрелся} для живых воркеров; метки умерших удаляются."""
+        result = {}
+        if not self.directory.is_dir():
+            return result
+        for path in self.directory.iterdir():
+            if not path.name.isdigit():
+                continue
+            pid = int(path.name)
+            if not _pid_alive(pid):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+                continue
+            try:
+                result[pid] = float(path.read_text(encoding="utf-8") or 0)
+            except (OSError, ValueError):
+                result[pid] = 0.0
+        return result
+
+
+def _is_gunicorn(pid: int) -> bool:
+    """Похож ли процесс на мастер gunicorn (Linux: /proc/<pid>/cmdline)."""
+    try:
+        return b"gunicorn" in Path(f"/proc/{pid}/cmdline").read_bytes()
+    except OSError:
+        return False
+
+
+def rotate_workers(master_pid: int, registry: WorkerRegistry, log, timeout: float = 120.0) -> str:
+    """
+    Заменить воркеров мастера master_pid на новых (с новым кодом), не теряя запросов.
+    Возвращает, как это сделано: "rotate" | "hup" | "skipped".
+    log(str) — строка в лог деплоя.
+    """
+    if not _is_gunicorn(master_pid):
+        log(f"Родитель (pid {master_pid}) — не gunicorn: перезапуск пропущен, перезапустите сервис вручную")
+        return "skipped"
+
+    old = registry.ready_workers()
+    if os.getpid() not in old:
+        # Воркеры запущены без хуков gunicorn.conf.py: прогрев не отслеживается
+        log("Метки воркеров не найдены (gunicorn без gunicorn.conf.py?) — мягкая замена воркеров (HUP)")
+        os.kill(master_pid, signal.SIGHUP)
+        return "hup"
+
+    count = len(old)
+    started = time.time()
+    log(f"Добавляем {count} новых воркеров (TTIN), ждём прогрева...")
+    for _ in range(count):
+        os.kill(master_pid, signal.SIGTTIN)
+        time.sleep(0.1)
+
+    deadline = started + timeout
+    while time.time() < deadline:
+        fresh = [pid for pid, ready_at in registry.ready_workers().items() if pid not in old and ready_at >= started]
+        if len(fresh) >= count:
+            log(f"Новые воркеры готовы: {', '.join(map(str, sorted(fresh)))}")
+            break
+        time.sleep(0.5)
+    else:
+        log(f"Новые воркеры не прогрелись за {int(timeout)} с — мягкая замена всех воркеров (HUP)")
+        # Возвращаем прежнее число воркеров, а HUP заменит их всех на новых
+        for _ in range(count):
+            os.kill(master_pid, signal.SIGTTOU)
+        os.kill(master_pid, signal.SIGHUP)
+        return "hup"
+
+    log(f"Убираем {count} старых воркеров (TTOU): они доотвечают текущим запросам и выйдут")
+    # Этот воркер — тоже старый: мастер остановит его последним сигналом; всё важное уже в логе
+    for _ in range(count):
+        os.kill(master_pid, signal.SIGTTOU)
+        time.sleep(0.1)
+    return "rotate"
+
+
+class WorkerLifecycle:
+    """
+    Что делает воркер при старте/выходе (вызывается из хуков gunicorn.conf.py):
+    прогрев -> метка "готов"; выход -> метка убирается.
+    """
+
+    def __init__(self, registry: WorkerRegistry, warm_up, logger=None):
+        self.registry = registry
+        self.warm_up = warm_up
+        self.logger = logger
+
+    def worker_ready(self):
+        started = time.perf_counter()
+        try:
+            self.warm_up()
+        except Exception as e:
+            # Холодный воркер лучше, чем никакого: метку ставим всё равно
+            if self.logger:
+                self.logger.warning(f"Прогрев воркера {os.getpid()} не удался: {e}")
+        self.registry.mark_ready()
+        if self.logger:
+            self.logger.info(f"Воркер {os.getpid()} прогрет за {time.perf_counter() - started:.2f} с")
+
+    def worker_exit(self):
+        self.registry.mark_exit()
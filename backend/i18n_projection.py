@@ -0,0 +1,133 @@
+"""
+Проекция каталога на один язык (?lang=en).
+
+Как было:
+- каждая позиция приходит и с русскими полями, и с полным блоком i18n.en
+  (title-en, description-en, contains-en, allergens-en ...);
+- экрану на одном языке половина ответа не нужна, а клиент сам выбирал поле (getFieldValue).
+
+Как стало:
+- ?lang=en -> переводы лежат в "обычных" полях (title, description, allergens ...);
+- если перевода нет (поле пустое) — остаётся русское значение, а имя поля попадает в "fallback";
+- блок i18n из ответа убирается (кроме полей без русской пары, например "useful phrases & words").
+
+Тех-термин: **фолбэк** (fallback) — запасное значение, когда основного нет (тут — русский текст).
+"""
+
+# Языки каталога. Русский — основной: его проекция = позиция как есть
+DEFAULT_LANG = "ru"
+LANGS = ("ru", "en")
+
+# Поля, у которых в i18n.<lang> есть перевод "<поле>-<lang>"
+TRANSLATABLE_FIELDS = (
+    "title", "description", "contains", "features", "reference_info",
+    "menu", "section", "allergens", "tags", "comments",
+)
+# Поля-списки: в переводе они часто записаны строкой через запятую ("citrus, onion")
+_LIST_FIELDS = {"allergens", "tags", "comments"}
+
+
+def _is_empty(value) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return not value.strip()
+    if isinstance(value, (list, tuple, dict)):
+        return not value
+    return False
+
+
+def _as_list(value) -> list:
+    if isinstance(value, str):
+        return [part.strip() for part in value.split(",") if part.strip()]
+    return list(value)
+
+
+def _block(item: dict, lang: str) -> dict:
+    block = (item.get("i18n") or {}).get(lang) if isinstance(item.get("i18n"), dict) else None
+    return block if isinstance(block, dict) else {}
+
+
+def localize_item(item: dict, lang: str) -> dict:
+    """
+    Копия позиции на языке lang. Исходный dict не меняется.
+    Для DEFAULT_LANG возвращает саму позицию (без копии).
+    """
+    if lang == DEFAULT_LANG or lang not in LANGS:
+        return item
+    block = _block(item, lang)
+    out = {k: v for k, v in item.items() if k != "i18n"}
+    fallback = []
+    for field in TRANSLATABLE_FIELDS:
+        value = block.get(f"{field}-{lang}")
+        if _is_empty(value):
+            if not _is_empty(item.get(field)):
+                fallback.append(field)
+            continue
+        if field in _LIST_FIELDS and isinstance(item.get(field), list):
+            value = _as_list(value)
+        out[field] = value
+
+    # Поля без русской пары (audio-en уже есть в item["audio"]) оставляем в i18n
+    suffix = f"-{lang}"
+    rest = {
+        k: v for k, v in block.items()
+        if not (k.endswith(suffix) and (k[:-len(suffix)] in TRANSLATABLE_FIELDS or k == f"audio{suffix}"))
+    }
+    if rest:
+        out["i18n"] = {lang: rest}
+    out["lang"] = lang
+    out["fallback"] = fallback
+    return out
+
+
+def coverage(items: list[dict], lang: str, max_ids: int = 50) -> dict:
+    """
+    Сколько полей переведено: всего и по меню.
+    Считаем только поля, которые заполнены по-русски (переводить пустое не нужно).
+    missing_ids — первые max_ids позиций без перевода поля (для админки).
+    """
+    fields = {f: {"total": 0, "translated": 0, "missing_ids": []} for f in TRANSLATABLE_FIELDS}
+    by_menu: dict[str, dict] = {}
+    items_total = items_full = 0
+    for item in items:
+        block = _block(item, lang)
+        menu = str(item.get("menu") or "").strip() or "—"
+        menu_stats = by_menu.setdefault(menu, {"items": 0, "fully_translated": 0, "total": 0, "translated": 0})
+        menu_stats["items"] += 1
+        items_total += 1
+        complete = True
+        for field in TRANSLATABLE_FIELDS:
+            if _is_empty(item.get(field)):
+                continue
+            stats = fields[field]
+            stats["total"] += 1
+            menu_stats["total"] += 1
+            if _is_empty(block.get(f"{field}-{lang}")):
+                complete = False
+                if len(stats["missing_ids"]) < max_ids:
+                    stats["missing_ids"].append(item.get("id"))
+            else:
+                stats["translated"] += 1
+                menu_stats["translated"] += 1
+        if complete:
+            items_full += 1
+            menu_stats["fully_translated"] += 1
+
+    def _pct(done, total):
+        return round(100.0 * done / total, 1) if total else 100.0
+
+    for stats in list(fields.values()) + list(by_menu.values()):
+        stats["percent"] = _pct(stats["translated"], stats["total"])
+    total = sum(s["total"] for s in fields.values())
+    translated = sum(s["translated"] for s in fields.values())
+    return {
+        "lang": lang,
+        "items": items_total,
+        "fully_translated_items": items_full,
+        "fields_total": total,
+        "fields_translated": translated,
+        "percent": _pct(translated, total),
+        "fields": fields,
+        "menus": dict(sorted(by_menu.items())),
+    }
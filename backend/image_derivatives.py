@@ -0,0 +1,242 @@
+"""
+Уменьшенные копии картинок (derivatives) для телефонов.
+
+Зачем нужно:
+- в images/ лежат полноразмерные WebP (до ~320 КБ), а в списке меню они показываются миниатюрами;
+- теперь /images/<файл>?w=320 отдаёт копию нужной ширины, а браузер сам выбирает размер по srcset.
+
+Тех-термины:
+- **Derivative** (производная копия): уменьшенная/перекодированная версия исходной картинки.
+- **Content-addressed кэш**: имя файла в кэше строится из хеша ИСХОДНИКА + ширины + формата.
+  Поменяли картинку — у неё другой хеш, значит старая копия просто перестаёт использоваться.
+- **Согласование формата** (format negotiation): браузер в заголовке Accept пишет,
+  какие форматы понимает (image/avif, image/webp). Отдаём самый компактный из поддерживаемых.
+
+Pillow — необязательная зависимость: если её нет, отдаём оригиналы как раньше.
+"""
+
+import base64
+import io
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    from PIL import Image, ImageFilter, features
+except ImportError:  # Pillow не установлен — работаем без уменьшенных копий
+    Image = None
+    ImageFilter = None
+    features = None
+
+# Разрешённые ширины: любые ?w=... "прилипают" к ближайшей большей из списка.
+# Так в кэше не появится по копии на каждый пиксель.
+ALLOWED_WIDTHS = (160, 320, 480, 768, 1080)
+
+# Какие исходники умеем уменьшать (gif/svg отдаём как есть)
+SOURCE_SUFFIXES = {".webp", ".jpg", ".jpeg", ".png"}
+
+FORMAT_MIME = {
+    "avif": "image/avif",
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+}
+
+FORMAT_SAVE_OPTIONS = {
+    "avif": {"quality": 55},
+    "webp": {"quality": 78, "method": 4},
+    "jpeg": {"quality": 80, "optimize": True, "progressive": True},
+}
+
+
+def is_available() -> bool:
+    """True, если Pillow установлен и умеет WebP."""
+    return Image is not None and features.check("webp")
+
+
+def snap_width(raw) -> int | None:
+    """Приводит ?w=... к одной из ALLOWED_WIDTHS. Некорректное значение -> None."""
+    try:
+        width = int(str(raw).strip())
+    except (TypeError, ValueError):
+        return None
+    if width <= 0:
+        return None
+    for allowed in ALLOWED_WIDTHS:
+        if width <= allowed:
+            return allowed
+    return ALLOWED_WIDTHS[-1]
+
+
+def negotiate_format(accept_header: str | None) -> str:
+    """
+    Выбирает формат по заголовку Accept.
+    AVIF — только если его поддерживает и браузер, и наш Pillow.
+    JPEG — для старых браузеров, которые не заявили поддержку WebP.
+    """
+    accept = (accept_header or "").lower()
+    if "image/avif" in accept and features is not None and features.check("avif"):
+        return "avif"
+    if "image/webp" in accept or not accept:
+        return "webp"
+    return "jpeg"
+
+
+def can_resize(path: Path) -> bool:
+    return path.suffix.lower() in SOURCE_SUFFIXES
+
+
+def _source_marker(target: str | Path) -> Path:
+    """
+    Пустой файл-метка "исходник не шире этой ширины": <хеш>-<ширина>.source рядом с копиями.
+    Одна на все форматы — решение от формата не зависит.
+    """
+    return Path(target).with_suffix(".source")
+
+
+def _render(source: str, target: str, width: int, fmt: str) -> str:
+    """
+    Делает копию нужной ширины и атомарно кладёт её в кэш.
+    Если исходник и так не шире width — копию не делаем (возвращаем исходник, без увеличения)
+    и оставляем метку, чтобы следующие запросы не открывали картинку заново.
+    """
+    with Image.open(source) as im:
+        if im.width <= width:
+            marker = _source_marker(target)
+            marker.parent.mkdir(parents=True, exist_ok=True)
+            marker.touch()
+            return source
+        height = max(1, round(im.height * width / im.width))
+        im = im.convert("RGBA" if im.mode in ("RGBA", "LA", "P") and fmt != "jpeg" else "RGB")
+        resized = im.resize((width, height), Image.LANCZOS)
+        tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        Path(target).parent.mkdir(parents=True, exist_ok=True)
+        resized.save(tmp, format=fmt.upper(), **FORMAT_SAVE_OPTIONS[fmt])
+        os.replace(tmp, target)
+    return target
+
+
+class DerivativeCache:
+    """
+    Кэш уменьшенных копий на диске + пул потоков для их генерации.
+
+    Каждая копия генерируется ОДИН раз: если два запроса попросили одно и то же
+    одновременно, второй просто ждёт результат первого (общий Future).
+    Pillow отпускает GIL при ресайзе/кодировании, поэтому потоки реально работают параллельно.
+    """
+
+    def __init__(self, cache_dir: Path, max_workers: int = 2, wait_seconds: float = 15.0):
+        self.cache_dir = Path(cache_dir)
+        self.wait_seconds = wait_seconds
+        self._max_workers = max(1, max_workers)
+        self._pool: ThreadPoolExecutor | None = None
+        self._in_flight: dict[str, Future] = {}
+        # RLock: если задача уже завершилась, add_done_callback вызовет _forget сразу, под этой же блокировкой
+        self._lock = threading.RLock()
+
+    def target_path(self, source_hash: str, width: int, fmt: str) -> Path:
+        return self.cache_dir / source_hash[:2] / f"{source_hash}-{width}.{fmt}"
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="img-derivative")
+        return self._pool
+
+    def get(self, source: Path, source_hash: str, width: int, fmt: str) -> Path:
+        """
+        Возвращает путь к готовой копии (или к исходнику, если уменьшать не нужно).
+        При ошибке генерации пробрасывает исключение — вызывающий код отдаст оригинал.
+        """
+        target = self.target_path(source_hash, width, fmt)
+        if target.exists():
+            return target
+        if _source_marker(target).exists():
+            return Path(source)
+
+        key = str(target)
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is None:
+                future = self._get_pool().submit(_render, str(source), key, width, fmt)
+                self._in_flight[key] = future
+                future.add_done_callback(lambda _f, k=key: self._forget(k))
+        return Path(future.result(timeout=self.wait_seconds))
+
+    def _forget(self, key: str):
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+
+# Размер "размытой заглушки" (LQIP) по длинной стороне, в пикселях
+PLACEHOLDER_SIZE = 16
+
+
+def compute_image_meta(source: Path) -> dict:
+    """
+    Реальные размеры картинки + крошечная размытая заглушка (data URI, ~200 байт).
+
+    Тех-термин: **LQIP** (low-quality image placeholder) — мини-картинка, которую клиент
+    растягивает на место будущего фото, пока грузится настоящее. Вместе с width/height
+    это убирает "прыжки" вёрстки и пустые серые квадраты.
+    """
+    with Image.open(source) as im:
+        width, height = im.size
+        thumb = im.convert("RGB")
+        thumb.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+        thumb = thumb.filter(ImageFilter.GaussianBlur(1))
+        buf = io.BytesIO()
+        thumb.save(buf, format="WEBP", quality=30)
+    placeholder = "data:image/webp;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+    return {"width": width, "height": height, "placeholder": placeholder}
+
+
+class ImageMetaCache:
+    """
+    Кэш размеров/заглушек по ХЕШУ содержимого картинки (файл JSON на диске).
+    Пересчёт происходит только для новых/изменённых файлов; общий для всех воркеров.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._data: dict[str, dict] | None = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict[str, dict]:
+        if self._data is None:
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                self._data = data if isinstance(data, dict) else {}
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def get(self, source: Path, source_hash: str) -> dict | None:
+        """Метаданные картинки или None (если Pillow нет или файл не читается)."""
+        if Image is None:
+            return None
+        with self._lock:
+            meta = self._load().get(source_hash)
+        if meta is not None:
+            return meta
+        try:
+            meta = compute_image_meta(source)
+        except Exception:
+            return None
+        with self._lock:
+            self._load()[source_hash] = meta
+            self._dirty = True
+        return meta
+
+    def flush(self):
+        """Сохранить новые записи на диск (вызываем после сборки каталога)."""
+        with self._lock:
+            if not self._dirty or self._data is None:
+                return
+            data = dict(self._data)
+            self._dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
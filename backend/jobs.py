@@ -0,0 +1,396 @@
+"""
+Фоновые задачи (jobs): импорт меню, оптимизация картинок, деплой — не в запросе и не на "голых" потоках.
+
+Как было:
+- импорт меню и сохранение всего каталога выполнялись прямо в запросе: пока перезаливалась таблица,
+  запрос (и воркер gunicorn) ждал;
+- оптимизация картинок и деплой шли в threading.Thread, а статус жил в глобальном dict воркера:
+  опрос статуса, попавший в ДРУГОЙ воркер, видел "idle";
+- "уже запущено" (409) тоже проверялось только в своём воркере — два воркера могли запустить деплой дважды.
+
+Как стало:
+- каждая задача — строка в таблице jobs (отдельный файл SQLite, общий для всех воркеров):
+  вид, статус, параметры, прогресс, результат/ошибка; строки лога — в таблице job_logs;
+- запрос только ставит задачу и сразу отвечает 202 с job_id; статус — GET /api/admin/jobs/<id>
+  из любого воркера;
+- задачу выполняет пул потоков этого воркера (ожидание диска/сети/подпроцессов);
+  тяжёлые вычисления задача отдаёт в общий пул процессов (job.cpu_pool) — они не тормозят
+  потоки, которые отвечают на запросы (у Python один GIL на процесс);
+- "не больше одной задачи этого вида" проверяется внутри транзакции SQLite — честно для всех воркеров;
+- воркер жив — раз в несколько секунд отмечает свои задачи (heartbeat). Воркер умер посреди задачи —
+  метка устаревает, и задача помечается ошибкой, а не висит "running" вечно.
+
+Тех-термины:
+- **пул потоков / процессов** (ThreadPoolExecutor / ProcessPoolExecutor) — заранее ограниченное
+  число исполнителей, задачи ждут в очереди, а не плодят потоки без счёта;
+- **heartbeat** — периодическая отметка "я ещё работаю";
+- **WAL** — режим журнала SQLite, при котором чтение статуса не ждёт запись лога.
+"""
+
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+ACTIVE_STATUSES = ("queued", "running")
+FINAL_STATUSES = ("done", "error")
+# Строки лога длиннее этого обрезаются (вывод сборки иногда присылает "простыни" в одну строку)
+MAX_LOG_LINE = 4000
+
+
+class JobConflict(Exception):
+    """Задача этого вида уже выполняется (в API это 409)."""
+
+    def __init__(self, job: dict):
+        super().__init__(f"job {job['kind']} already running (id {job['id']})")
+        self.job = job
+
+
+def _dumps(value) -> str | None:
+    return None if value is None else json.dumps(value, ensure_ascii=False)
+
+
+def _loads(raw):
+    if raw is None:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+
+class JobStore:
+    """
+    Таблицы jobs и job_logs в общем файле SQLite. Каждая операция — короткая транзакция.
+    Соединение своё у каждого потока (sqlite3 не любит одно соединение на несколько потоков).
+    """
+
+    def __init__(self, path: Path, timeout: float = 5.0, stale_after: float = 60.0):
+        self.path = Path(path)
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, status TEXT NOT NULL,"
+            " params TEXT, progress TEXT, result TEXT, error TEXT, owner_pid INTEGER,"
+            " created_at REAL NOT NULL, started_at REAL, finished_at REAL, heartbeat_at REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_kind_id ON jobs (kind, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs (status)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_logs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, job_id INTEGER NOT NULL, ts REAL NOT NULL, line TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_job_logs_job ON job_logs (job_id, id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # После fork соединение родителя использовать нельзя — заводим своё
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(str(self.path), timeout=self.timeout, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _row(row) -> dict | None:
+        if row is None:
+            return None
+        job = dict(row)
+        for key in ("params", "progress", "result"):
+            job[key] = _loads(job[key])
+        return job
+
+    # ---------- создание / переходы статуса ----------
+
+    def _reap_stale(self, conn, now: float):
+        """Задачи, чей воркер давно не отмечался, — ошибка "воркер остановился"."""
+        conn.execute(
+            "UPDATE jobs SET status = 'error', error = 'worker stopped before the job finished',"
+            " finished_at = ? WHERE status IN ('queued', 'running') AND heartbeat_at < ?",
+            (now, now - self.stale_after),
+        )
+
+    def _reap_on_read(self, conn):
+        """
+        Перед чтением статуса: зависшие задачи умершего воркера сразу видны как error,
+        а не "running" до следующего create(). Не удалось (база занята записью) — прочитаем как есть.
+        """
+        try:
+            self._reap_stale(conn, time.time())
+        except sqlite3.OperationalError:
+            pass
+
+    def create(self, kind: str, params: dict | None = None, exclusive: bool = True) -> dict:
+        """Новая задача в статусе queued. exclusive и такая уже идёт -> JobConflict."""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._reap_stale(conn, now)
+            if exclusive:
+                active = conn.execute(
+                    "SELECT * FROM jobs WHERE kind = ? AND status IN ('queued', 'running') ORDER BY id DESC LIMIT 1",
+                    (kind,),
+                ).fetchone()
+                if active is not None:
+                    conn.execute("ROLLBACK")
+                    raise JobConflict(self._row(active))
+            job_id = conn.execute(
+                "INSERT INTO jobs (kind, status, params, owner_pid, created_at, heartbeat_at)"
+                " VALUES (?, 'queued', ?, ?, ?, ?)",
+                (kind, _dumps(params or {}), os.getpid(), now, now),
+            ).lastrowid
+            conn.execute("COMMIT")
+        except JobConflict:
+            raise
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(job_id)
+
+    def mark_running(self, job_id: int):
+        now = time.time()
+        self._connect().execute(
+            "UPDATE jobs SET status = 'running', started_at = ?, heartbeat_at = ? WHERE id = ?",
+            (now, now, job_id),
+        )
+
+    def finish(self, job_id: int, result=None, error: str | None = None):
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+            ("error" if error else "done", _dumps(result), error, time.time(), job_id),
+        )
+
+    def set_progress(self, job_id: int, progress: dict):
+        self._connect().execute(
+            "UPDATE jobs SET progress = ?, heartbeat_at = ? WHERE id = ?",
+            (_dumps(progress), time.time(), job_id),
+        )
+
+    def heartbeat(self, job_ids: list[int]):
+        if not job_ids:
+            return
+        marks = ",".join("?" * len(job_ids))
+        self._connect().execute(
+            f"UPDATE jobs SET heartbeat_at = ? WHERE id IN ({marks}) AND status IN ('queued', 'running')",
+            (time.time(), *job_ids),
+        )
+
+    def log(self, job_id: int, line: str) -> int:
+        return self._connect().execute(
+            "INSERT INTO job_logs (job_id, ts, line) VALUES (?, ?, ?)",
+            (job_id, time.time(), str(line)[:MAX_LOG_LINE]),
+        ).lastrowid
+
+    # ---------- чтение ----------
+
+    def get(self, job_id: int) -> dict | None:
+        conn = self._connect()
+        self._reap_on_read(conn)
+        return self._row(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def latest(self, kind: str) -> dict | None:
+        conn = self._connect()
+        self._reap_on_read(conn)
+        return self._row(conn.execute(
+            "SELECT * FROM jobs WHERE kind = ? ORDER BY id DESC LIMIT 1", (kind,)
+        ).fetchone())
+
+    def recent(self, kind: str | None = None, limit: int = 20) -> list[dict]:
+        conn = self._connect()
+        self._reap_on_read(conn)
+        if kind:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE kind = ? ORDER BY id DESC LIMIT ?", (kind, limit)
+            )
+        else:
+            rows = conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,))
+        return [self._row(row) for row in rows]
+
+    def logs(self, job_id: int, after_id: int = 0, limit: int = 500) -> list[dict]:
+        """Строки лога после after_id (для дозагрузки), не больше limit."""
+        rows = self._connect().execute(
+            "SELECT id, ts, line FROM job_logs WHERE job_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (job_id, after_id, limit),
+        )
+        return [dict(row) for row in rows]
+
+    def tail(self, job_id: int, limit: int = 200) -> list[str]:
+        """Последние limit строк лога (по порядку)."""
+        rows = self._connect().execute(
+            "SELECT line FROM (SELECT id, line FROM job_logs WHERE job_id = ? ORDER BY id DESC LIMIT ?)"
+            " ORDER BY id",
+            (job_id, limit),
+        )
+        return [row["line"] for row in rows]
+
+    def prune(self, keep_days: float):
+        """Удалить завершённые задачи (и их лог) старше keep_days дней."""
+        cutoff = time.time() - keep_days * 86400
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM job_logs WHERE job_id IN"
+                " (SELECT id FROM jobs WHERE status IN ('done', 'error') AND finished_at < ?)",
+                (cutoff,),
+            )
+            conn.execute("DELETE FROM jobs WHERE status IN ('done', 'error') AND finished_at < ?", (cutoff,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class Job:
+    """То, что получает функция задачи: id, лог, прогресс и пул процессов для тяжёлых вычислений."""
+
+    def __init__(self, runner: "JobRunner", row: dict):
+        self.runner = runner
+        self.id = row["id"]
+        self.kind = row["kind"]
+        self.params = row.get("params") or {}
+        self._progress: dict = {}
+
+    def log(self, line: str):
+        try:
+            self.runner.store.log(self.id, line)
+        except sqlite3.Error as e:
+            # Лог — не повод ронять задачу
+            if self.runner.logger:
+                self.runner.logger.warning(f"job {self.id}: строка лога не записана: {e}")
+
+    def progress(self, **fields):
+        """Обновить прогресс (поля сливаются с прежними): job.progress(step="build"), job.progress(done=3, total=10)."""
+        self._progress.update(fields)
+        self.runner.store.set_progress(self.id, self._progress)
+
+    @property
+    def cpu_pool(self):
+        """Общий пул процессов воркера (для функций, которые можно передать в другой процесс)."""
+        return self.runner.cpu_pool()
+
+
+class JobRunner:
+    """
+    Пулы этого процесса + хранилище задач.
+    context() — необязательная фабрика контекста (например, app.app_context): задача выполняется внутри него.
+    """
+
+    def __init__(self, store: JobStore, io_workers: int = 2, cpu_workers: int = 1,
+                 context=None, heartbeat_interval: float = 10.0, logger=None):
+        self.store = store
+        self.io_workers = max(1, io_workers)
+        self.cpu_workers = max(1, cpu_workers)
+        self.context = context
+        self.heartbeat_interval = heartbeat_interval
+        self.logger = logger
+        self._pid = None
+        self._lock = threading.Lock()
+        self._threads: ThreadPoolExecutor | None = None
+        self._processes: ProcessPoolExecutor | None = None
+        self._active: set[int] = set()
+
+    def _ensure_started(self):
+        """Пул потоков и heartbeat — один раз на процесс (после fork — заново)."""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._threads = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="job")
+            self._processes = None
+            self._active = set()
+            self._pid = pid
+            threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True).start()
+
+    def cpu_pool(self) -> ProcessPoolExecutor:
+        """
+        Пул процессов создаётся при первой тяжёлой задаче.
+        spawn — не копирует потоки/соединения воркера (fork из многопоточного процесса небезопасен).
+        """
+        self._ensure_started()
+        with self._lock:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(
+                    max_workers=self.cpu_workers, mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._processes
+
+    def _heartbeat_loop(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(self.heartbeat_interval)
+            try:
+                self.store.heartbeat(sorted(self._active))
+            except sqlite3.Error as e:
+                if self.logger:
+                    self.logger.warning(f"jobs: heartbeat не записан: {e}")
+
+    def submit(self, kind: str, fn, params: dict | None = None, args: tuple = (), exclusive: bool = True) -> dict:
+        """
+        Поставить задачу: fn(job, *args) выполнится в пуле потоков.
+        params — то, что увидит статус (JSON); args — данные только для fn (в базу не пишутся).
+        Возвращает строку задачи; exclusive и такая уже идёт -> JobConflict.
+        """
+        self._ensure_started()
+        row = self.store.create(kind, params, exclusive=exclusive)
+        self._active.add(row["id"])
+        try:
+            self._threads.submit(self._execute, row, fn, args)
+        except RuntimeError as e:
+            # Пул уже закрывается (воркер выходит)
+            self._active.discard(row["id"])
+            self.store.finish(row["id"], error=str(e))
+            raise
+        return row
+
+    def _execute(self, row: dict, fn, args: tuple):
+        job = Job(self, row)
+        try:
+            self.store.mark_running(job.id)
+            if self.context is not None:
+                with self.context():
+                    result = fn(job, *args)
+            else:
+                result = fn(job, *args)
+            self.store.finish(job.id, result=result)
+        except Exception as e:
+            if self.logger:
+                self.logger.warning(f"job {job.id} ({job.kind}) завершилась ошибкой: {e}")
+            try:
+                self.store.finish(job.id, error=str(e) or e.__class__.__name__)
+            except sqlite3.Error:
+                pass
+        finally:
+            self._active.discard(job.id)
+
+    def shutdown(self):
+        """При выходе процесса: не брать новые задачи, остановить пул процессов."""
+        if self._pid != os.getpid():
+            return
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "active_here": sorted(self._active),
+            "io_workers": self.io_workers,
+            "cpu_workers": self.cpu_workers,
+            "cpu_pool_started": self._processes is not None,
+        }
@@ -97,6 +97,12 @@ class FeedbackMessage(db.Model):
     
     # Указываем имя таблицы в базе данных
     __tablename__ = 'feedback_messages'
+    # Индексы под постраничный просмотр (см. feedback_inbox.py):
+    # вкладки "непрочитанные"/"прочитанные" идут по (read, created_at, id), вкладка "все" — по (created_at, id)
+    __table_args__ = (
+        db.Index('ix_feedback_read_created', 'read', 'created_at', 'id'),
+        db.Index('ix_feedback_created', 'created_at', 'id'),
+    )
     
     # Поля таблицы (колонки)
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)  # Автоматический ID
@@ -105,6 +111,8 @@ class FeedbackMessage(db.Model):
     message = db.Column(db.Text, nullable=False)  # Текст сообщения (обязательно)
     read = db.Column(db.Boolean, default=False)  # Прочитано ли сообщение админом
     created_at = db.Column(db.DateTime, default=datetime.utcnow)  # Дата создания
+    # Временный id из очереди записи (feedback_queue.py): по нему повтор журнала не создаёт дублей
+    ref = db.Column(db.String(40), unique=True, index=True)
     
     def to_dict(self):
         """
@@ -125,6 +133,76 @@ class FeedbackMessage(db.Model):
         return f'<FeedbackMessage {self.id}: {self.message[:50]}...>'
 
 
+class FeedbackArchive(db.Model):
+    """
+    Архив обратной связи: старые прочитанные сообщения переезжают сюда из feedback_messages.
+    Основная таблица остаётся маленькой, а история не теряется.
+    """
+
+    __tablename__ = 'feedback_messages_archive'
+    __table_args__ = (
+        db.Index('ix_feedback_archive_created', 'created_at', 'archive_id'),
+    )
+
+    # Свой ID: SQLite может выдать новому сообщению ID удалённого, поэтому исходный ID не уникален
+    archive_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    id = db.Column(db.Integer, index=True)  # ID, который был в основной таблице
+    name = db.Column(db.String(200))
+    type = db.Column(db.String(50), default='question')
+    message = db.Column(db.Text, nullable=False)
+    read = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)  # Когда перенесли в архив
+
+    def to_dict(self):
+        """Тот же формат, что у FeedbackMessage, плюс отметка архива."""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'type': self.type,
+            'message': self.message,
+            'read': self.read,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'archived': True,
+            'archived_at': self.archived_at.isoformat() if self.archived_at else None,
+        }
+
+
+class StopListItem(db.Model):
+    """
+    Стоп-лист: позиции, которые сейчас нельзя заказать (закончились на кухне/баре).
+    Строка есть = позиция недоступна; вернули в продажу = строка удалена.
+    Каталог (dishes + JSON) при этом не трогается, см. availability.py.
+    """
+
+    __tablename__ = 'stop_list'
+
+    item_id = db.Column(db.String(50), primary_key=True)  # ID позиции каталога
+    note = db.Column(db.String(200))  # Причина/комментарий ("до 18:00", "нет лосося")
+    stopped_at = db.Column(db.DateTime, default=datetime.utcnow)  # Когда поставили на стоп
+    stopped_by = db.Column(db.String(200))  # Кто поставил (username)
+
+    def to_dict(self):
+        return {
+            'id': self.item_id,
+            'note': self.note,
+            'stopped_at': self.stopped_at.isoformat() if self.stopped_at else None,
+            'stopped_by': self.stopped_by,
+        }
+
+
+class Counter(db.Model):
+    """
+    Счётчики, которые дорого считать через COUNT(*) на каждый запрос
+    (например, "непрочитанных сообщений"). Меняются в той же транзакции, что и данные.
+    """
+
+    __tablename__ = 'counters'
+
+    name = db.Column(db.String(100), primary_key=True)  # Имя счётчика, например 'feedback_unread'
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+
 class User(db.Model, UserMixin):
     """
     Модель для пользователя системы.
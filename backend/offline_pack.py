@@ -0,0 +1,126 @@
+"""
+Офлайн-пакет: один ZIP с данными меню, картинками и озвучкой.
+
+Зачем нужно:
+- чтобы телефон нового официанта заработал офлайн, service worker делал сотни отдельных запросов;
+- на слабом Wi-Fi это долго, а оборванная загрузка начиналась сначала.
+
+Как устроено:
+- архив пишется ПОТОКОМ (streaming): клиент начинает получать байты сразу,
+  целиком архив ни в памяти, ни во временном файле не собирается;
+- параллельно поток "отводится" (tee) в файл кэша — следующий запрос той же версии
+  отдаётся готовым файлом, с поддержкой Range (докачка после обрыва);
+- архив детерминированный: одинаковые данные = байт-в-байт одинаковый ZIP
+  (фиксированные даты и атрибуты). Поэтому докачка Range с пересобранного файла корректна.
+
+Тех-термины:
+- **ZIP_STORED** — файл кладётся без сжатия. Картинки/MP3 уже сжаты, повторное сжатие только тратит CPU.
+- **Data descriptor** — при записи в поток zipfile не может "вернуться назад" и дописать размер/CRC
+  в заголовок файла, поэтому пишет их после данных. Все распаковщики это понимают.
+"""
+
+import os
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator
+
+# Дата всех файлов в архиве: минимально допустимая в ZIP (важно для детерминированности)
+FIXED_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+CHUNK_SIZE = 256 * 1024
+# Сколько готовых пакетов храним в кэше (старые версии каталога удаляются)
+DEFAULT_KEEP_PACKS = 10
+
+
+class _StreamSink:
+    """
+    "Файл" только для записи: копит байты до следующего drain() и (если задан) пишет копию в tee.
+    Нет tell()/seek() — zipfile поймёт, что поток непрокручиваемый, и будет писать data descriptor.
+    """
+
+    def __init__(self, tee=None):
+        self._chunks: list[bytes] = []
+        self._tee = tee
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        if self._tee is not None:
+            self._tee.write(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+
+def _zip_info(name: str, compress_type: int) -> zipfile.ZipInfo:
+    info = zipfile.ZipInfo(name, date_time=FIXED_DATE_TIME)
+    info.compress_type = compress_type
+    info.create_system = 3            # "Unix" — одинаково на Linux и Windows
+    info.external_attr = 0o644 << 16  # права rw-r--r--
+    return info
+
+
+def stream_zip(members: Iterable[tuple[str, bytes | Path]], tee_path: Path | None = None) -> Iterator[bytes]:
+    """
+    Генератор байтов ZIP-архива.
+
+    members — пары (имя в архиве, содержимое): bytes (JSON и т.п., сжимаем deflate)
+    или Path (картинки/аудио, кладём без сжатия). Итерируется лениво, по мере отдачи.
+    tee_path — куда параллельно сохранить архив. Файл появляется только если архив
+    дописан до конца; при обрыве соединения временный файл удаляется.
+    """
+    tee = None
+    tmp = None
+    if tee_path is not None:
+        tee_path = Path(tee_path)
+        tee_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = tee_path.with_name(f".{tee_path.name}.{os.getpid()}.{id(members)}.tmp")
+        tee = open(tmp, "wb")
+    sink = _StreamSink(tee)
+    completed = False
+    try:
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as zf:
+            for name, payload in members:
+                if isinstance(payload, (bytes, bytearray)):
+                    zf.writestr(_zip_info(name, zipfile.ZIP_DEFLATED), bytes(payload))
+                else:
+                    with open(payload, "rb") as src, zf.open(_zip_info(name, zipfile.ZIP_STORED), "w") as dst:
+                        for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                            dst.write(chunk)
+                            if len(chunk) == CHUNK_SIZE:
+                                yield sink.drain()
+                data = sink.drain()
+                if data:
+                    yield data
+        data = sink.drain()
+        if data:
+            yield data
+        completed = True
+    finally:
+        if tee is not None:
+            tee.close()
+            if completed:
+                os.replace(tmp, tee_path)
+            else:
+                try:
+                    tmp.unlink()
+                except OSError:
+                    pass
+
+
+def prune_packs(packs_dir: Path, keep: int = DEFAULT_KEEP_PACKS):
+    """Удаляет старые пакеты, оставляя keep самых свежих."""
+    try:
+        packs = sorted(Path(packs_dir).glob("pack-*.zip"), key=lambda p: p.stat().st_mtime)
+    except OSError:
+        return
+    for path in packs[:-keep] if keep > 0 else packs:
+        try:
+            path.unlink()
+        except OSError:
+            pass
@@ -0,0 +1,309 @@
+"""
+Пакетная оптимизация картинок в папке images/ (пережатие + удаление метаданных).
+
+Что делает:
+1. Обходит images/ (включая wine/, spravochnik/, arts/)
+2. Каждую картинку пережимает в том же формате, без EXIF/XMP (метаданные фотоаппарата и т.п.)
+3. Сохраняет результат ТОЛЬКО если он меньше исходника хотя бы на --min-saving процентов
+4. Пишет отчёт: сколько байт сэкономили по каждой папке
+
+Исходники в images/ НЕ меняются (они лежат в git: правка на месте = "грязное" дерево,
+и git pull при деплое падает). Пережатая копия кладётся в папку кэша images-optimized/
+под именем с хешем исходника: wine/a.webp -> wine/a.<хеш исходника>.webp.
+Сервер отдаёт копию вместо исходника, только пока хеш совпадает: исходник обновили — копия
+просто перестаёт находиться (и удаляется при следующем запуске).
+
+Работает на всех ядрах (ProcessPoolExecutor). Повторный запуск быстрый:
+в файле состояния хранится хеш каждого уже обработанного исходника, неизменённые файлы пропускаются.
+
+Запуск (из папки backend):
+  python optimize_images.py
+  python optimize_images.py --dry-run            (только посчитать, ничего не менять)
+  python optimize_images.py --quality 78 --min-saving 10
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from static_manifest import HASH_LENGTH
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_IMAGES_DIR = ROOT_DIR / "images"
+STATE_FILE_NAME = "image-optimizer-state.json"
+REPORT_FILE_NAME = "image-optimizer-report.json"
+# Папка пережатых копий внутри папки кэша
+OPTIMIZED_DIR_NAME = "images-optimized"
+
+SUPPORTED_SUFFIXES = {".webp": "WEBP", ".jpg": "JPEG", ".jpeg": "JPEG", ".png": "PNG"}
+
+
+def default_cache_dir() -> Path:
+    """Та же логика, что и в app.py: SABOR_CACHE_DIR или backend/cache."""
+    raw = (os.getenv("SABOR_CACHE_DIR") or "").strip()
+    p = Path(raw) if raw else ROOT_DIR / "backend" / "cache"
+    return p if p.is_absolute() else (ROOT_DIR / p).resolve()
+
+
+def _sha1(path: Path) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def optimized_rel(rel: str, source_etag: str) -> str:
+    """
+    Путь пережатой копии внутри images-optimized/: "wine/a.webp" + хеш -> "wine/a.<хеш>.webp".
+    source_etag — хеш исходника в виде ETag манифеста статики (первые HASH_LENGTH символов sha1).
+    """
+    head, dot, suffix = rel.rpartition(".")
+    return f"{head}.{source_etag[:HASH_LENGTH]}.{suffix}" if dot else f"{rel}.{source_etag[:HASH_LENGTH]}"
+
+
+def _save_options(fmt: str, quality: int) -> dict:
+    if fmt == "WEBP":
+        return {"quality": quality, "method": 6}
+    if fmt == "JPEG":
+        return {"quality": quality, "optimize": True, "progressive": True}
+    return {"optimize": True}
+
+
+def optimize_one(path_str: str, out_str: str, source_hash: str, quality: int, min_saving: float, dry_run: bool) -> dict:
+    """
+    Обрабатывает один файл (выполняется в отдельном процессе). Исходник path_str не меняется:
+    пережатая копия пишется в out_str.
+    Возвращает словарь с размерами до/после; hash — хеш исходника (для файла состояния).
+    """
+    path = Path(path_str)
+    out = Path(out_str)
+    fmt = SUPPORTED_SUFFIXES[path.suffix.lower()]
+    before = path.stat().st_size
+    tmp = out.with_name(f".{out.name}.{os.getpid()}.tmp")
+    try:
+        out.parent.mkdir(parents=True, exist_ok=True)
+        with Image.open(path) as im:
+            # Анимированные картинки не трогаем — Pillow сохранит только первый кадр
+            if getattr(im, "is_animated", False):
+                return {"path": path_str, "before": before, "after": before, "status": "skipped-animated", "hash": source_hash}
+            im.load()
+            icc = im.info.get("icc_profile")
+            # Новый объект без im.info -> EXIF/XMP/комментарии не попадут в файл.
+            # ICC-профиль оставляем: без него могут "поплыть" цвета.
+            clean = im.copy()
+            clean.info = {}
+            opts = _save_options(fmt, quality)
+            if icc:
+                opts["icc_profile"] = icc
+            if fmt == "JPEG" and clean.mode not in ("RGB", "L", "CMYK"):
+                clean = clean.convert("RGB")
+            clean.save(tmp, format=fmt, **opts)
+        after = tmp.stat().st_size
+        saving = (before - after) / before * 100 if before else 0.0
+        if after < before and saving >= min_saving:
+            if dry_run:
+                return {"path": path_str, "before": before, "after": after, "status": "would-optimize", "hash": None}
+            os.replace(tmp, out)
+            return {"path": path_str, "before": before, "after": after, "status": "optimized", "hash": source_hash}
+        return {"path": path_str, "before": before, "after": before, "status": "kept", "hash": source_hash}
+    except Exception as e:
+        return {"path": path_str, "before": before, "after": before, "status": "error", "error": str(e), "hash": None}
+    finally:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+
+
+def _load_state(state_path: Path) -> dict:
+    try:
+        data = json.loads(state_path.read_text(encoding="utf-8"))
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(path: Path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    tmp.replace(path)
+
+
+def _remove_stale_copies(out_dir: Path, keep: set[str]) -> int:
+    """Удалить копии устаревших (изменённых/удалённых) исходников. Возвращает число удалённых файлов."""
+    removed = 0
+    if not out_dir.is_dir():
+        return removed
+    for path in out_dir.rglob("*"):
+        if path.is_file() and path.relative_to(out_dir).as_posix() not in keep:
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+def optimize_images(
+    images_dir: Path = DEFAULT_IMAGES_DIR,
+    cache_dir: Path | None = None,
+    quality: int = 80,
+    min_saving: float = 5.0,
+    workers: int | None = None,
+    dry_run: bool = False,
+    progress=None,
+    pool=None,
+) -> dict:
+    """
+    Оптимизирует все картинки в images_dir: копии — в cache_dir/images-optimized, исходники не меняются.
+    Возвращает отчёт (он же пишется в cache_dir).
+    progress(done, total) — необязательный колбэк для показа прогресса.
+    pool — готовый пул процессов (например, общий пул фоновых задач, см. jobs.py);
+    без него создаётся свой пул на все ядра (запуск из консоли).
+    """
+    if Image is None:
+        raise RuntimeError("Pillow не установлен: pip install Pillow")
+
+    images_dir = Path(images_dir)
+    cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+    out_dir = cache_dir / OPTIMIZED_DIR_NAME
+    state_path = cache_dir / STATE_FILE_NAME
+    state = _load_state(state_path)
+    started = time.time()
+
+    # 1) Собираем кандидатов и отбрасываем те, что уже обработаны (хеш исходника совпадает и копия на месте).
+    # state[rel] = {"hash": хеш исходника, "optimized": есть ли копия}
+    candidates = []
+    outputs: dict[str, str] = {}  # rel исходника -> rel копии (для всех текущих исходников)
+    hashes: dict[str, str] = {}
+    skipped = 0
+    for path in sorted(images_dir.rglob("*")):
+        if not path.is_file() or path.suffix.lower() not in SUPPORTED_SUFFIXES:
+            continue
+        if any(part.startswith(".") for part in path.relative_to(images_dir).parts):
+            continue
+        rel = path.relative_to(images_dir).as_posix()
+        source_hash = _sha1(path)
+        hashes[rel] = source_hash
+        outputs[rel] = optimized_rel(rel, source_hash)
+        done = state.get(rel)
+        if (isinstance(done, dict) and done.get("hash") == source_hash
+                and (not done.get("optimized") or (out_dir / outputs[rel]).is_file())):
+            skipped += 1
+            continue
+        candidates.append(path)
+
+    # 2) Пережимаем параллельно на всех ядрах.
+    # spawn — одинаково работает на Linux/Windows и не копирует потоки/соединения родителя.
+    results = []
+    total = len(candidates)
+    if candidates:
+        def _run(executor):
+            futures = []
+            for p in candidates:
+                rel = p.relative_to(images_dir).as_posix()
+                futures.append(executor.submit(
+                    optimize_one, str(p), str(out_dir / outputs[rel]), hashes[rel], quality, min_saving, dry_run,
+                ))
+            for done, fut in enumerate(as_completed(futures), 1):
+                results.append(fut.result())
+                if progress:
+                    progress(done, total)
+
+        if pool is not None:
+            _run(pool)
+        else:
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=ctx) as own_pool:
+                _run(own_pool)
+
+    # 3) Отчёт по папкам + обновлённое состояние
+    by_dir: dict[str, dict] = {}
+    for r in results:
+        rel = Path(r["path"]).relative_to(images_dir).as_posix()
+        folder = rel.rsplit("/", 1)[0] if "/" in rel else "."
+        row = by_dir.setdefault(folder, {"files": 0, "optimized": 0, "errors": 0, "bytes_before": 0, "bytes_after": 0})
+        row["files"] += 1
+        row["bytes_before"] += r["before"]
+        row["bytes_after"] += r["after"]
+        if r["status"] in ("optimized", "would-optimize"):
+            row["optimized"] += 1
+        if r["status"] == "error":
+            row["errors"] += 1
+        if r.get("hash"):
+            state[rel] = {"hash": r["hash"], "optimized": r["status"] == "optimized"}
+    for row in by_dir.values():
+        row["bytes_saved"] = row["bytes_before"] - row["bytes_after"]
+
+    report = {
+        "finished_at": time.time(),
+        "duration_s": round(time.time() - started, 2),
+        "dry_run": dry_run,
+        "quality": quality,
+        "min_saving_percent": min_saving,
+        "processed": total,
+        "skipped_unchanged": skipped,
+        "bytes_saved": sum(row["bytes_saved"] for row in by_dir.values()),
+        "output_dir": str(out_dir),
+        "by_dir": dict(sorted(by_dir.items())),
+        "errors": [{"path": r["path"], "error": r.get("error")} for r in results if r["status"] == "error"],
+    }
+    if not dry_run:
+        # Исходники, которых больше нет, — из состояния вон
+        state = {rel: val for rel, val in state.items() if rel in hashes}
+        _write_json(state_path, state)
+        report["removed_stale"] = _remove_stale_copies(out_dir, {
+            outputs[rel] for rel, val in state.items() if isinstance(val, dict) and val.get("optimized")
+        })
+    _write_json(cache_dir / REPORT_FILE_NAME, report)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пережать картинки из images/ в кэш (параллельно, с отчётом)")
+    parser.add_argument("--images-dir", default=str(DEFAULT_IMAGES_DIR))
+    parser.add_argument("--cache-dir", default=None, help="куда писать копии, состояние и отчёт (по умолчанию SABOR_CACHE_DIR или backend/cache)")
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--min-saving", type=float, default=5.0, help="минимальная экономия в %%, иначе файл не меняем")
+    parser.add_argument("--workers", type=int, default=None, help="число процессов (по умолчанию — все ядра)")
+    parser.add_argument("--dry-run", action="store_true", help="ничего не менять, только посчитать")
+    args = parser.parse_args()
+
+    def _progress(done, total):
+        if done % 20 == 0 or done == total:
+            print(f"   Обработано: {done}/{total}")
+
+    print(f"🖼️  Оптимизация картинок в {args.images_dir} ...")
+    report = optimize_images(
+        Path(args.images_dir),
+        Path(args.cache_dir) if args.cache_dir else None,
+        quality=args.quality,
+        min_saving=args.min_saving,
+        workers=args.workers,
+        dry_run=args.dry_run,
+        progress=_progress,
+    )
+    print(f"\n✅ Готово за {report['duration_s']} с. Обработано: {report['processed']}, "
+          f"без изменений (пропущено): {report['skipped_unchanged']}")
+    for folder, row in report["by_dir"].items():
+        print(f"   {folder:<14} файлов: {row['files']:>4}  оптимизировано: {row['optimized']:>4}  "
+              f"сэкономлено: {row['bytes_saved'] / 1024:.1f} КБ")
+    print(f"\n📊 Всего сэкономлено: {report['bytes_saved'] / 1024 / 1024:.2f} МБ")
+    for err in report["errors"]:
+        print(f"❌ {err['path']}: {err['error']}")
+
+
+if __name__ == "__main__":
+    main()
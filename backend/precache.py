@@ -0,0 +1,169 @@
+"""
+Манифест предзагрузки (precache) для service worker — генерируется с диска, а не руками.
+
+Как было:
+- precache-files.json — список из ~440 URL, который правили вручную (часть файлов давно удалена);
+- при каждом релизе (PRECACHE = 'precache-vN') service worker заново качал ВСЁ — десятки МБ
+  на телефон каждого официанта.
+
+Как стало:
+- манифест = {url: {"hash": ..., "size": ...}} по реальным файлам (берём из статического манифеста,
+  хеши там уже посчитаны);
+- у манифеста есть свой хеш; старые версии сохраняются на диске (история);
+- клиент присылает хеш своего манифеста и получает только разницу:
+  added (новые), changed (изменились), removed (удалены).
+
+Тех-термин: **дельта** (diff) — список отличий между двумя версиями, а не вся версия целиком.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+
+from catalog import dumps_bytes, short_hash
+
+# Какие корни статического манифеста попадают в предзагрузку и под каким URL
+DEFAULT_ROOT_PREFIXES = {
+    "frontend": "/",
+    "images": "/images/",
+    "audio": "/audio/",
+    "menus": "/menus/",
+    "trainer": "/trainer/",
+    "sprites": "/sprites/",
+}
+
+# Что из сборки фронтенда не нужно телефону офлайн
+_SKIP_SUFFIXES = (".map", ".LICENSE.txt")
+_SKIP_FRONTEND_PREFIXES = ("images/",)  # картинки отдаёт корень "images" (не дублируем)
+
+# Сколько старых версий манифеста храним (для дельт)
+DEFAULT_HISTORY_LIMIT = 30
+
+
+class PrecacheIndex:
+    """
+    Текущий манифест предзагрузки + история версий на диске.
+
+    Пересобирается, только если поменялись файлы хотя бы в одном корне
+    (StaticManifest.root_version), поэтому get_current() дешёвый.
+    """
+
+    def __init__(self, static_manifest, history_dir: Path,
+                 root_prefixes: dict[str, str] | None = None,
+                 history_limit: int = DEFAULT_HISTORY_LIMIT):
+        self.static_manifest = static_manifest
+        self.history_dir = Path(history_dir)
+        self.root_prefixes = dict(root_prefixes or DEFAULT_ROOT_PREFIXES)
+        self.history_limit = history_limit
+        self._current: dict | None = None
+        self._current_key = None
+        self._lock = threading.Lock()
+
+    # ---------- сборка ----------
+
+    def _collect_files(self) -> dict[str, dict]:
+        files: dict[str, dict] = {}
+        for root, prefix in self.root_prefixes.items():
+            for rel, entry in self.static_manifest.entries(root).items():
+                if rel.endswith(_SKIP_SUFFIXES):
+                    continue
+                if root == "frontend" and rel.startswith(_SKIP_FRONTEND_PREFIXES):
+                    continue
+                url = prefix + rel
+                files.setdefault(url, {"hash": entry.etag, "size": entry.size})
+        return dict(sorted(files.items()))
+
+    def get_current(self) -> dict:
+        """{"hash", "count", "total_bytes", "files": {url: {hash, size}}}"""
+        key = tuple(self.static_manifest.root_version(r) for r in self.root_prefixes)
+        current = self._current
+        if current is not None and self._current_key == key:
+            return current
+        with self._lock:
+            if self._current is not None and self._current_key == key:
+                return self._current
+            files = self._collect_files()
+            manifest_hash = short_hash(
+                "|".join(f"{u}:{m['hash']}:{m['size']}" for u, m in files.items()).encode("utf-8")
+            )
+            current = {
+                "hash": manifest_hash,
+                "count": len(files),
+                "total_bytes": sum(m["size"] for m in files.values()),
+                "files": files,
+            }
+            self._save_history(current)
+            self._current, self._current_key = current, key
+            return current
+
+    # ---------- история ----------
+
+    def _history_path(self, manifest_hash: str) -> Path:
+        return self.history_dir / f"manifest-{manifest_hash}.json"
+
+    def _save_history(self, manifest: dict):
+        path = self._history_path(manifest["hash"])
+        try:
+            if path.exists():
+                os.utime(path, None)  # "свежая" версия не должна попасть под чистку
+                return
+            self.history_dir.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            tmp.write_bytes(dumps_bytes({"hash": manifest["hash"], "files": manifest["files"]}))
+            os.replace(tmp, path)
+            self._prune_history()
+        except OSError:
+            pass  # история — только оптимизация: без неё клиент получит полный манифест
+
+    def _prune_history(self):
+        old = sorted(self.history_dir.glob("manifest-*.json"), key=lambda p: p.stat().st_mtime)
+        for path in old[:-self.history_limit]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def load_version(self, manifest_hash: str) -> dict[str, dict] | None:
+        """Файлы старой версии манифеста (или None, если такой версии нет в истории)."""
+        if not manifest_hash or not manifest_hash.isalnum():
+            return None
+        current = self.get_current()
+        if manifest_hash == current["hash"]:
+            return current["files"]
+        try:
+            data = json.loads(self._history_path(manifest_hash).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        files = data.get("files") if isinstance(data, dict) else None
+        return files if isinstance(files, dict) else None
+
+    # ---------- дельта ----------
+
+    def diff(self, since_hash: str | None) -> dict:
+        """
+        Разница между версией клиента (since_hash) и текущей.
+        Если версия клиента неизвестна (нет в истории) — full=True и все файлы в added.
+        """
+        current = self.get_current()
+        old_files = self.load_version(since_hash) if since_hash else None
+        new_files = current["files"]
+        if old_files is None:
+            added, changed, removed = dict(new_files), {}, []
+        else:
+            added = {u: m for u, m in new_files.items() if u not in old_files}
+            changed = {
+                u: m for u, m in new_files.items()
+                if u in old_files and old_files[u].get("hash") != m["hash"]
+            }
+            removed = sorted(u for u in old_files if u not in new_files)
+        return {
+            "hash": current["hash"],
+            "since": since_hash or None,
+            "full": old_files is None,
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+            "download_bytes": sum(m["size"] for m in added.values()) + sum(m["size"] for m in changed.values()),
+            "total_bytes": current["total_bytes"],
+        }
@@ -0,0 +1,78 @@
+"""
+"Быстрый путь" для публичных GET-запросов: без сессии и без cookies.
+
+Проблема:
+- SESSION_REFRESH_EACH_REQUEST и REMEMBER_COOKIE_REFRESH_EACH_REQUEST включены (чтобы не выкидывало);
+- из-за этого Flask/Flask-Login трогают сессию на КАЖДОМ запросе: ответ меню получает Set-Cookie
+  и заголовок Vary: Cookie;
+- ответ с Set-Cookie nginx (и любой общий кэш) не кэширует — иначе раздал бы чужую cookie.
+
+Решение:
+- для публичных GET/HEAD (каталог, вина, бар, статика) сессия не читается из cookie вовсе:
+  запрос получает пустую "одноразовую" сессию, а при сохранении ничего не пишется;
+- такие ответы получают явный Cache-Control с public и s-maxage — обратный прокси
+  может отдавать их сам, не дёргая gunicorn.
+
+Тех-термины:
+- **SessionInterface** — объект Flask, который читает сессию из cookie в начале запроса
+  и записывает её в конце. Подменяем его своим наследником.
+- **s-maxage** — сколько секунд ответ может храниться в ОБЩЕМ кэше (nginx, CDN);
+  браузеру это не касается (у него max-age).
+"""
+
+from flask.sessions import SecureCookieSession, SecureCookieSessionInterface
+
+# Метка в environ запроса: запрос идёт по публичному пути
+ENVIRON_KEY = "sabor.public_read"
+
+_READ_METHODS = ("GET", "HEAD")
+
+
+class PublicSession(SecureCookieSession):
+    """Пустая сессия публичного запроса: её можно читать/менять, но она никуда не сохраняется."""
+
+    is_public_read = True
+
+
+class PublicReadSessionInterface(SecureCookieSessionInterface):
+    """
+    Обычные cookie-сессии Flask + исключение для публичных GET.
+
+    is_public(path) -> bool решает, какой путь публичный (задаётся в app.py).
+    """
+
+    def __init__(self, is_public):
+        self.is_public = is_public
+
+    def open_session(self, app, request):
+        if request.method in _READ_METHODS and self.is_public(request.path):
+            request.environ[ENVIRON_KEY] = True
+            return PublicSession()
+        return super().open_session(app, request)
+
+    def save_session(self, app, session, response):
+        if getattr(session, "is_public_read", False):
+            return  # никаких Set-Cookie и Vary: Cookie
+        return super().save_session(app, session, response)
+
+
+def public_cache_control(current: str | None, status: int, shared_max_age: int) -> str:
+    """
+    Cache-Control для публичного ответа:
+    - ошибки не кэшируем (no-store);
+    - no-store/private — оставляем как решил обработчик (например, случайная колода тренажёра);
+    - "no-cache"/нет заголовка — браузер всегда перепроверяет (дёшево: ETag -> 304),
+      а общий кэш может отдавать ответ shared_max_age секунд;
+    - всё остальное (max-age, immutable у статики) — как есть, но с явным public.
+    """
+    if status >= 400:
+        return "no-store"
+    value = (current or "").strip()
+    lowered = value.lower()
+    if "no-store" in lowered or "private" in lowered:
+        return value
+    if not value or lowered == "no-cache":
+        return f"public, max-age=0, s-maxage={shared_max_age}"
+    if "public" not in lowered:
+        return f"public, {value}"
+    return value
@@ -0,0 +1,234 @@
+"""
+Ограничение частоты запросов (rate limiting) по алгоритму "ведро с токенами".
+
+Зачем нужно:
+- вход (/api/admin/login) проверяет пароль через scrypt — это специально МЕДЛЕННО;
+  скрипт, перебирающий пароли, займёт все sync-воркеры gunicorn;
+- обратная связь (/api/feedback) пишет строку в SQLite на каждый запрос — спам блокирует запись.
+
+Как работает:
+- у каждого ключа (IP, логин) есть "ведро" на capacity токенов; запрос забирает токен;
+- токены восстанавливаются равномерно: capacity штук за period секунд;
+- пустое ведро -> ответ 429 и заголовок Retry-After (через сколько секунд появится токен).
+
+Где хранятся вёдра:
+- MemoryStore — в памяти процесса (по умолчанию). У каждого gunicorn-воркера свои вёдра,
+  то есть реальный лимит = лимит * число воркеров;
+- SQLiteStore — общий файл SQLite: все воркеры видят одни и те же вёдра (RATE_LIMIT_STORE=sqlite).
+
+Тех-термин: **token bucket** — разрешает короткий "всплеск" (до capacity запросов подряд),
+но в среднем не больше capacity/period запросов в секунду.
+"""
+
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass(frozen=True)
+class Rule:
+    """capacity запросов за period секунд."""
+
+    name: str
+    capacity: float
+    period: float
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.capacity / self.period if self.period > 0 else float("inf")
+
+
+def parse_rule(name: str, spec: str | None, default: str) -> Rule:
+    """
+    "10/60" -> Rule(name, capacity=10, period=60). Ошибка в настройке -> значение по умолчанию.
+    """
+    for value in (spec, default):
+        try:
+            capacity, period = str(value).split("/", 1)
+            rule = Rule(name, float(capacity), float(period))
+            if rule.capacity > 0 and rule.period > 0:
+                return rule
+        except (TypeError, ValueError):
+            continue
+    raise ValueError(f"bad rate limit rule for {name}: {default!r}")
+
+
+def _take(tokens: float, updated: float, now: float, rule: Rule, cost: float) -> tuple[float, float, float]:
+    """
+    Одна попытка забрать cost токенов.
+    Возвращает (новое число токенов, время обновления, сколько секунд ждать; 0 = разрешено).
+    """
+    tokens = min(rule.capacity, tokens + max(0.0, now - updated) * rule.refill_per_second)
+    if tokens >= cost:
+        return tokens - cost, now, 0.0
+    return tokens, now, (cost - tokens) / rule.refill_per_second
+
+
+class MemoryStore:
+    """Вёдра в памяти процесса (LRU: самые старые ключи выкидываются при переполнении)."""
+
+    name = "memory"
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rule: Rule, cost: float, now: float) -> float:
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (rule.capacity, now))
+            tokens, updated, wait = _take(tokens, updated, now, rule, cost)
+            self._buckets[key] = (tokens, updated)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def reset(self, key: str | None = None):
+        with self._lock:
+            if key is None:
+                self._buckets.clear()
+            else:
+                self._buckets.pop(key, None)
+
+
+class SQLiteStore:
+    """
+    Вёдра в общем файле SQLite — одинаковые для всех воркеров.
+    Каждое списание — одна короткая транзакция BEGIN IMMEDIATE (чтение + запись под блокировкой).
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: Path, timeout: float = 2.0):
+        self.path = Path(path)
+        self.timeout = timeout
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                " key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, rule: Rule, cost: float, now: float) -> float:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (rule.capacity, now)
+            tokens, updated, wait = _take(tokens, updated, now, rule, cost)
+            conn.execute(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, updated),
+            )
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def reset(self, key: str | None = None):
+        conn = self._connect()
+        if key is None:
+            conn.execute("DELETE FROM buckets")
+        else:
+            conn.execute("DELETE FROM buckets WHERE key = ?", (key,))
+
+    def prune(self, older_than: float):
+        """Удалить вёдра, которые давно не трогали (они всё равно уже полные)."""
+        self._connect().execute("DELETE FROM buckets WHERE updated < ?", (older_than,))
+
+
+class RateLimiter:
+    """
+    Набор правил + хранилище + счётчики.
+
+    hit("login_ip", "1.2.3.4") -> 0.0 (можно) или секунды до следующей попытки.
+    Если общее хранилище недоступно (SQLite занят/сломан) — считаем в памяти процесса:
+    лимит чуть мягче, но вход и обратная связь продолжают работать.
+    """
+
+    # Как часто чистить старые вёдра в SQLite
+    PRUNE_EVERY_SECONDS = 3600
+
+    def __init__(self, rules: list[Rule], store=None, enabled: bool = True, logger=None):
+        self.rules = {r.name: r for r in rules}
+        self.store = store or MemoryStore()
+        self.fallback = MemoryStore() if not isinstance(self.store, MemoryStore) else self.store
+        self.enabled = enabled
+        self.logger = logger
+        self._counters = {name: {"allowed": 0, "limited": 0} for name in self.rules}
+        self._store_errors = 0
+        self._last_prune = time.time()
+        self._lock = threading.Lock()
+
+    def hit(self, rule_name: str, key: str, cost: float = 1.0) -> float:
+        if not self.enabled:
+            return 0.0
+        rule = self.rules[rule_name]
+        bucket_key = f"{rule_name}:{key}"
+        now = time.time()
+        try:
+            wait = self.store.take(bucket_key, rule, cost, now)
+        except Exception as e:
+            with self._lock:
+                self._store_errors += 1
+            if self.logger:
+                self.logger.warning(f"rate limit: хранилище {self.store.name} недоступно ({e}), считаем в памяти")
+            wait = self.fallback.take(bucket_key, rule, cost, now)
+        with self._lock:
+            self._counters[rule_name]["limited" if wait > 0 else "allowed"] += 1
+        self._maybe_prune(now)
+        return wait
+
+    def _maybe_prune(self, now: float):
+        if not hasattr(self.store, "prune") or now - self._last_prune < self.PRUNE_EVERY_SECONDS:
+            return
+        self._last_prune = now
+        oldest = max(r.period for r in self.rules.values())
+        try:
+            self.store.prune(now - oldest)
+        except Exception:
+            pass
+
+    def check(self, *hits: tuple[str, str]) -> int:
+        """
+        Несколько вёдер сразу (например, IP и логин). 0 — можно; иначе Retry-After в секундах.
+        Останавливаемся на первом пустом ведре, чтобы отказ не списывал токены с остальных.
+        """
+        for rule_name, key in hits:
+            if not key:
+                continue
+            wait = self.hit(rule_name, key)
+            if wait > 0:
+                return max(1, math.ceil(wait))
+        return 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = {name: dict(c) for name, c in self._counters.items()}
+            errors = self._store_errors
+        return {
+            "enabled": self.enabled,
+            "store": self.store.name,
+            "store_errors": errors,
+            "rules": {
+                name: {"capacity": r.capacity, "period_seconds": r.period, **counters[name]}
+                for name, r in self.rules.items()
+            },
+        }
@@ -0,0 +1,221 @@
+"""
+Готовые варианты текстовых полей позиции: безопасный HTML и простой текст.
+
+Зачем нужно:
+- в description/contains/features/reference_info лежит "сырой" текст из Notion/админки:
+  текстовые "\\n", <ol type="1">, обёртки <div style=...>, &quot; внутри атрибутов;
+- каждый телефон сам чистил переносы (normalizeNewlines) и вставлял HTML как есть,
+  а поиск на каждом устройстве вырезал теги через DOM.
+
+Теперь сервер один раз готовит оба варианта:
+- html — только разрешённые теги (списки, абзацы, жирный/курсив, переносы), без атрибутов
+  (кроме type у <ol>), без скриптов и стилей; переносы строк уже нормализованы;
+- text — простой текст для поиска/шаринга: пункты списков с номерами, без тегов и лишних пробелов.
+
+Результат запоминается по хешу содержимого, поэтому пересборка каталога после правки
+одного блюда заново обрабатывает только его тексты.
+
+Тех-термин: **санитизация** (sanitize) — удаление из HTML всего, что не входит в белый список
+(скрипты, обработчики onclick, стили и т.п.). Это защита от **XSS**.
+"""
+
+import hashlib
+import html
+import re
+import threading
+from collections import OrderedDict
+from html.parser import HTMLParser
+
+# Представления, которые умеет отдавать API (raw — как в базе, без обработки)
+FORMATS = ("raw", "html", "text")
+
+# Текстовые поля позиции; английские версии лежат в i18n.en["<поле>-en"]
+RICH_FIELDS = ("description", "contains", "features", "reference_info")
+
+# Белый список тегов. Всё остальное выкидываем, оставляя содержимое
+_ALLOWED_TAGS = {"p", "br", "ol", "ul", "li", "strong", "b", "em", "i", "u", "hr"}
+_VOID_TAGS = {"br", "hr"}
+_BLOCK_TAGS = {"p", "ol", "ul", "li", "hr", "div"}
+# Теги, содержимое которых тоже выкидываем
+_DROP_CONTENT_TAGS = {"script", "style", "iframe", "object", "embed", "template", "noscript"}
+# Допустимые значения <ol type="...">
+_OL_TYPES = {"1", "a", "A", "i", "I"}
+
+_SPACES_RE = re.compile(r"[ \t\f\v\u00a0]+")
+
+MEMO_SIZE = 8192
+_memo: OrderedDict = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def _normalize_newlines(text: str) -> str:
+    """Текстовые "\\n" и \\r\\n -> настоящий перенос (как делал normalizeNewlines на клиенте)."""
+    return text.replace("\r\n", "\n").replace("\\n", "\n")
+
+
+class _Renderer(HTMLParser):
+    """
+    Один проход по HTML: сразу собирает и безопасный HTML, и простой текст.
+    Незакрытые теги закрываются в конце, "лишние" закрывающие — игнорируются.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html_parts: list[str] = []
+        self.text_parts: list[str] = []
+        self.stack: list[str] = []      # открытые разрешённые теги
+        self.counters: list[int] = []   # номера пунктов для вложенных <ol>/<ul> (-1 = маркированный)
+        self.drop_depth = 0
+
+    # ---------- HTML ----------
+
+    def _emit_text(self, data: str):
+        parent = self.stack[-1] if self.stack else None
+        if parent in ("ol", "ul") and not data.strip():
+            return  # переносы между <li> с whitespace-pre-line дают пустые строки
+        self.html_parts.append(html.escape(data, quote=False))
+        self.text_parts.append(data)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _DROP_CONTENT_TAGS:
+            self.drop_depth += 1
+            return
+        if self.drop_depth:
+            return
+        if tag in _BLOCK_TAGS:
+            self.text_parts.append("\n")
+        if tag == "br":
+            self.text_parts.append("\n")
+        if tag not in _ALLOWED_TAGS:
+            return
+        # Новый <li> закрывает предыдущий (<li>a<li>b), новый <p> — предыдущий <p>
+        if tag == "li":
+            for open_tag in reversed(self.stack):
+                if open_tag in ("ol", "ul"):
+                    break  # вложенный список внутри <li> — это не "следующий пункт"
+                if open_tag == "li":
+                    self.handle_endtag("li")
+                    break
+        elif tag == "p" and self.stack and self.stack[-1] == "p":
+            self.handle_endtag("p")
+
+        if tag == "ol":
+            ol_type = (dict(attrs).get("type") or "1").strip().strip("\"'")
+            ol_type = ol_type if ol_type in _OL_TYPES else "1"
+            self.html_parts.append(f'<ol type="{ol_type}">')
+            self.counters.append(0)
+        elif tag == "ul":
+            self.html_parts.append("<ul>")
+            self.counters.append(-1)
+        else:
+            self.html_parts.append(f"<{tag}>")
+        if tag == "li" and self.counters:
+            if self.counters[-1] >= 0:
+                self.counters[-1] += 1
+                self.text_parts.append(f"{self.counters[-1]}. ")
+            else:
+                self.text_parts.append("• ")
+        if tag not in _VOID_TAGS:
+            self.stack.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS and self.stack and self.stack[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in _DROP_CONTENT_TAGS:
+            self.drop_depth = max(0, self.drop_depth - 1)
+            return
+        if self.drop_depth:
+            return
+        if tag in _BLOCK_TAGS:
+            self.text_parts.append("\n")
+        if tag not in self.stack:
+            return
+        # Закрываем всё, что было открыто внутри (например, <li> без </li>)
+        while self.stack:
+            open_tag = self.stack.pop()
+            self.html_parts.append(f"</{open_tag}>")
+            if open_tag in ("ol", "ul") and self.counters:
+                self.counters.pop()
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.drop_depth and data:
+            self._emit_text(data)
+
+    def close(self):
+        super().close()
+        while self.stack:
+            self.html_parts.append(f"</{self.stack.pop()}>")
+
+
+_BLOCK_OPEN_RE = re.compile(r"\n\s*(<(?:ol|ul|p|hr)\b)")
+_BLOCK_CLOSE_RE = re.compile(r"(</(?:ol|ul|p)>|<hr>)\s*\n")
+_LI_EDGE_RE = re.compile(r"<li>\s+|\s+</li>")
+
+
+def _finish_html(fragment: str) -> str:
+    """Переносы как у клиента: без пустых строк и без переносов вокруг блочных тегов."""
+    fragment = re.sub(r"\n{2,}", "\n", fragment)
+    fragment = _BLOCK_OPEN_RE.sub(r"\1", fragment)
+    fragment = _BLOCK_CLOSE_RE.sub(r"\1", fragment)
+    fragment = _LI_EDGE_RE.sub(lambda m: "<li>" if m.group(0).startswith("<li>") else "</li>", fragment)
+    return fragment.strip()
+
+
+def _finish_text(text: str) -> str:
+    """Одна мысль — одна строка: схлопываем пробелы, убираем пустые строки."""
+    lines = (_SPACES_RE.sub(" ", line).strip() for line in text.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def _render(text: str) -> tuple[str, str]:
+    parser = _Renderer()
+    parser.feed(_normalize_newlines(text))
+    parser.close()
+    return _finish_html("".join(parser.html_parts)), _finish_text("".join(parser.text_parts))
+
+
+def render(text) -> tuple[str, str] | None:
+    """(безопасный HTML, простой текст) для строки; None — если это не строка."""
+    if not isinstance(text, str):
+        return None
+    key = hashlib.sha1(text.encode("utf-8")).digest()
+    with _memo_lock:
+        cached = _memo.get(key)
+        if cached is not None:
+            _memo.move_to_end(key)
+            return cached
+    result = _render(text)
+    with _memo_lock:
+        _memo[key] = result
+        if len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+    return result
+
+
+def render_item(item: dict, fmt: str) -> dict:
+    """
+    Копия позиции, в которой текстовые поля (и их английские версии) заменены
+    на выбранное представление: fmt = "html" или "text". Исходный dict не меняется.
+    """
+    if fmt not in ("html", "text"):
+        return item
+    idx = 0 if fmt == "html" else 1
+    out = dict(item)
+    for field in RICH_FIELDS:
+        rendered = render(item.get(field))
+        if rendered is not None:
+            out[field] = rendered[idx]
+    en = (item.get("i18n") or {}).get("en")
+    if isinstance(en, dict):
+        en_out = dict(en)
+        for field in RICH_FIELDS:
+            rendered = render(en.get(f"{field}-en"))
+            if rendered is not None:
+                en_out[f"{field}-en"] = rendered[idx]
+        out["i18n"] = {**item["i18n"], "en": en_out}
+    return out
@@ -0,0 +1,200 @@
+"""
+Сборка спрайта из иконок разделов (icons/*.png) — одна картинка вместо десятков мелких.
+
+Тех-термин: **спрайт** (sprite sheet) — большая картинка, в которой "плиткой" лежат все иконки.
+Клиент грузит её один раз и показывает нужный кусок по координатам (CSS background-position).
+
+Что получается в папке вывода:
+- icons-<хеш>.png     — спрайт (1x)
+- icons-<хеш>@2x.png  — спрайт для экранов с высокой плотностью (2x)
+- sprite.json         — карта координат: {"icons": {"fishbowl-icon.png": {"x": .., "y": .., "w": .., "h": ..}}}
+
+Пересборка только если изменилась хотя бы одна иконка: сначала сверяем размер/mtime файлов,
+и только если они поменялись — хеш содержимого.
+
+Запуск (из папки backend):
+  python sprites.py
+  python sprites.py --force
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+from pathlib import Path
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_ICONS_DIR = ROOT_DIR / "icons"
+MAP_FILE_NAME = "sprite.json"
+
+# Размер одной клетки спрайта (1x), в пикселях. В 2x-спрайте клетки вдвое больше.
+DEFAULT_CELL = 48
+ICON_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp"}
+# Иконки приложения (PWA) — не иконки разделов, в спрайт не кладём
+EXCLUDED_PREFIXES = ("sabor-icon",)
+
+
+def default_out_dir() -> Path:
+    """Та же логика, что и в app.py: SABOR_CACHE_DIR/sprites или backend/cache/sprites."""
+    raw = (os.getenv("SABOR_CACHE_DIR") or "").strip()
+    p = Path(raw) if raw else ROOT_DIR / "backend" / "cache"
+    p = p if p.is_absolute() else (ROOT_DIR / p).resolve()
+    return p / "sprites"
+
+
+def list_icons(icons_dir: Path) -> list[Path]:
+    if not icons_dir.is_dir():
+        return []
+    return sorted(
+        p for p in icons_dir.iterdir()
+        if p.is_file()
+        and p.suffix.lower() in ICON_SUFFIXES
+        and not p.name.startswith(".")
+        and not p.name.startswith(EXCLUDED_PREFIXES)
+    )
+
+
+def _stat_signature(icons: list[Path], cell: int) -> str:
+    """Дешёвый "отпечаток" по имени/размеру/mtime — чтобы не читать мегабайты иконок на каждом старте."""
+    h = hashlib.sha1(f"cell={cell}".encode("utf-8"))
+    for p in icons:
+        st = p.stat()
+        h.update(f"{p.name}:{st.st_size}:{st.st_mtime_ns};".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def _sources_hash(icons: list[Path], cell: int) -> str:
+    h = hashlib.sha1(f"cell={cell}".encode("utf-8"))
+    for p in icons:
+        h.update(p.name.encode("utf-8"))
+        h.update(p.read_bytes())
+    return h.hexdigest()[:16]
+
+
+def load_sprite_map(out_dir: Path) -> dict | None:
+    try:
+        data = json.loads((Path(out_dir) / MAP_FILE_NAME).read_text(encoding="utf-8"))
+        return data if isinstance(data, dict) else None
+    except (OSError, ValueError):
+        return None
+
+
+def _write_map(out_dir: Path, sprite_map: dict):
+    tmp = out_dir / f".{MAP_FILE_NAME}.{os.getpid()}.tmp"
+    tmp.write_text(json.dumps(sprite_map, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp, out_dir / MAP_FILE_NAME)
+
+
+def _render_sheet(icons: list[Path], cell: int, columns: int, rows: int):
+    sheet = Image.new("RGBA", (columns * cell, rows * cell), (0, 0, 0, 0))
+    for idx, path in enumerate(icons):
+        with Image.open(path) as im:
+            icon = im.convert("RGBA")
+            icon.thumbnail((cell, cell), Image.LANCZOS)
+        # Центрируем иконку в клетке (пропорции сохраняются)
+        x = (idx % columns) * cell + (cell - icon.width) // 2
+        y = (idx // columns) * cell + (cell - icon.height) // 2
+        sheet.paste(icon, (x, y), icon)
+    return sheet
+
+
+def build_icon_sprite(icons_dir: Path = DEFAULT_ICONS_DIR, out_dir: Path | None = None,
+                      cell: int = DEFAULT_CELL, force: bool = False) -> dict | None:
+    """
+    Собирает спрайт (если иконки изменились) и возвращает карту координат.
+    None — если Pillow нет или иконок нет.
+    """
+    if Image is None:
+        return None
+    icons_dir = Path(icons_dir)
+    out_dir = Path(out_dir) if out_dir else default_out_dir()
+    icons = list_icons(icons_dir)
+    if not icons:
+        return None
+
+    current = load_sprite_map(out_dir)
+    files_ok = bool(
+        current
+        and (out_dir / current.get("image", "")).is_file()
+        and (out_dir / current.get("image2x", "")).is_file()
+    )
+    stat_sig = _stat_signature(icons, cell)
+    if not force and files_ok and current.get("stat_signature") == stat_sig:
+        return current
+    # mtime поменялся (например, после git checkout) — сверяем уже по содержимому
+    source_hash = _sources_hash(icons, cell)
+    if not force and files_ok and current.get("version") == source_hash:
+        current["stat_signature"] = stat_sig
+        _write_map(out_dir, current)
+        return current
+
+    columns = max(1, math.ceil(math.sqrt(len(icons))))
+    rows = math.ceil(len(icons) / columns)
+    image_name = f"icons-{source_hash}.png"
+    image2x_name = f"icons-{source_hash}@2x.png"
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for name, scale in ((image_name, 1), (image2x_name, 2)):
+        sheet = _render_sheet(icons, cell * scale, columns, rows)
+        tmp = out_dir / f".{name}.{os.getpid()}.tmp"
+        sheet.save(tmp, format="PNG", optimize=True)
+        os.replace(tmp, out_dir / name)
+
+    sprite_map = {
+        "version": source_hash,
+        "stat_signature": stat_sig,
+        "image": image_name,
+        "image2x": image2x_name,
+        "cell": cell,
+        "width": columns * cell,
+        "height": rows * cell,
+        "icons": {
+            p.name: {"x": (i % columns) * cell, "y": (i // columns) * cell, "w": cell, "h": cell}
+            for i, p in enumerate(icons)
+        },
+    }
+    _write_map(out_dir, sprite_map)
+
+    # Предыдущее поколение не трогаем: другие воркеры ещё могут отдавать его по старой карте,
+    # пока не перечитали sprite.json. Удаляем только то, что старше него.
+    keep = {image_name, image2x_name}
+    if current:
+        keep.update(str(current.get(key) or "") for key in ("image", "image2x"))
+    for old in out_dir.glob("icons-*.png"):
+        if old.name not in keep:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+    return sprite_map
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Собрать спрайт из иконок разделов")
+    parser.add_argument("--icons-dir", default=str(DEFAULT_ICONS_DIR))
+    parser.add_argument("--out-dir", default=None, help="куда писать спрайт (по умолчанию SABOR_CACHE_DIR/sprites)")
+    parser.add_argument("--cell", type=int, default=DEFAULT_CELL, help="размер клетки 1x, px")
+    parser.add_argument("--force", action="store_true", help="пересобрать, даже если иконки не менялись")
+    args = parser.parse_args()
+
+    sprite_map = build_icon_sprite(
+        Path(args.icons_dir),
+        Path(args.out_dir) if args.out_dir else None,
+        cell=args.cell,
+        force=args.force,
+    )
+    if not sprite_map:
+        print("❌ Спрайт не собран: нет иконок или не установлен Pillow")
+        return
+    print(f"✅ Спрайт {sprite_map['image']} ({sprite_map['width']}x{sprite_map['height']}), "
+          f"иконок: {len(sprite_map['icons'])}")
+
+
+if __name__ == "__main__":
+    main()
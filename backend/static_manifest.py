@@ -0,0 +1,261 @@
+"""
+Манифест статических файлов (картинки, аудио, меню, тренажёр, сборка React).
+
+Зачем нужно:
+- раньше каждый запрос к /images/..., /audio/... делал несколько exists()/is_file() на диске,
+  иногда в двух папках подряд;
+- браузер не получал нормальных заголовков кэширования.
+
+Теперь при старте мы один раз обходим папки и запоминаем для каждого файла:
+размер, время изменения (mtime), хеш содержимого и MIME-тип.
+Поиск файла = обращение к словарю в памяти.
+
+Повторный обход папок (раз в refresh_interval секунд) идёт в фоновом потоке — запрос его не ждёт.
+Хеши пишутся в общий файл кэша: новый воркер не читает заново все картинки и MP3,
+а берёт хеш готовым, если размер и mtime файла не поменялись.
+
+Тех-термины:
+- **ETag**: "отпечаток" файла. Браузер присылает его обратно (If-None-Match),
+  и если файл не менялся — сервер отвечает 304 без тела.
+- **Fingerprinted URL**: ссылка с хешем файла (например `/images/a.webp?v=3f2a...`).
+  Такой URL никогда не меняет содержимое, поэтому его можно кэшировать "навсегда" (immutable).
+"""
+
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+# Сколько символов sha1 берём в ETag / ?v=...
+HASH_LENGTH = 20
+# Минимальная длина ?v=..., которую принимаем как "отпечаток" (короче — слишком легко угадать случайно)
+MIN_FINGERPRINT_LENGTH = 8
+
+
+class StaticEntry(NamedTuple):
+    root: str        # имя корня ("images", "audio", ...)
+    path: Path       # абсолютный путь к файлу
+    rel: str         # путь относительно корня (через "/")
+    size: int
+    mtime_ns: int
+    etag: str        # хеш содержимого (sha1, укороченный)
+    mime: str | None
+
+
+def _file_hash(path: Path) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()[:HASH_LENGTH]
+
+
+class StaticManifest:
+    """
+    Манифест нескольких "корней" (roots): {"images": Path(...), "audio": Path(...), ...}.
+
+    Обновление: не чаще, чем раз в refresh_interval секунд — lookup() замечает, что пора,
+    и запускает пересканирование в фоновом потоке (сам отвечает по текущим данным).
+    Повторно хешируются только файлы, у которых поменялся размер или mtime.
+    hash_cache_path — общий для воркеров JSON {корень: {rel: [size, mtime_ns, etag]}}.
+    """
+
+    def __init__(self, roots: dict[str, Path], refresh_interval: float = 10.0,
+                 hash_cache_path: Path | None = None):
+        self.roots = dict(roots)
+        self.refresh_interval = refresh_interval
+        self.hash_cache_path = Path(hash_cache_path) if hash_cache_path else None
+        self._entries: dict[str, dict[str, StaticEntry]] = {name: {} for name in self.roots}
+        # Счётчик изменений по корню: растёт, только если набор файлов/хешей реально поменялся
+        self._versions: dict[str, int] = {name: 0 for name in self.roots}
+        self._known_hashes: dict[str, dict] | None = None
+        self._last_scan = 0.0
+        self._lock = threading.Lock()
+        self._scan_thread: threading.Thread | None = None
+        self._scan_thread_lock = threading.Lock()
+
+    # ---------- сканирование ----------
+
+    def _load_known_hashes(self) -> dict[str, dict]:
+        """Хеши из общего файла кэша (читается один раз на процесс)."""
+        if self._known_hashes is None:
+            data = {}
+            if self.hash_cache_path is not None:
+                try:
+                    data = json.loads(self.hash_cache_path.read_text(encoding="utf-8"))
+                except (OSError, ValueError):
+                    data = {}
+            self._known_hashes = data if isinstance(data, dict) else {}
+        return self._known_hashes
+
+    def _save_known_hashes(self):
+        """Записать хеши текущих файлов (удалённые файлы из кэша уходят сами)."""
+        data = {
+            name: {rel: [e.size, e.mtime_ns, e.etag] for rel, e in entries.items()}
+            for name, entries in self._entries.items()
+        }
+        if data == self._known_hashes or self.hash_cache_path is None:
+            return
+        self._known_hashes = data
+        try:
+            self.hash_cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.hash_cache_path.with_name(f"{self.hash_cache_path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.hash_cache_path)
+        except OSError:
+            pass
+
+    def _scan_root(self, name: str) -> dict[str, StaticEntry]:
+        root = self.roots[name]
+        old = self._entries.get(name, {})
+        known = self._load_known_hashes().get(name) or {}
+        new: dict[str, StaticEntry] = {}
+        if not root.is_dir():
+            return new
+        for dirpath, dirnames, filenames in os.walk(root):
+            # Скрытые папки/файлы (.cache, .optimized.json и т.п.) не отдаём
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for fname in filenames:
+                if fname.startswith("."):
+                    continue
+                path = Path(dirpath) / fname
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                rel = path.relative_to(root).as_posix()
+                prev = old.get(rel)
+                if prev and prev.size == st.st_size and prev.mtime_ns == st.st_mtime_ns:
+                    new[rel] = prev
+                    continue
+                cached = known.get(rel)
+                if isinstance(cached, list) and len(cached) == 3 and cached[:2] == [st.st_size, st.st_mtime_ns]:
+                    # Хеш уже посчитал другой воркер (или прошлый запуск) — файл не читаем
+                    mime, _ = mimetypes.guess_type(path.name)
+                    new[rel] = StaticEntry(name, path, rel, st.st_size, st.st_mtime_ns, cached[2], mime)
+                    continue
+                entry = self._make_entry(name, path, rel, st)
+                if entry:
+                    new[rel] = entry
+        return new
+
+    @staticmethod
+    def _make_entry(root_name: str, path: Path, rel: str, st: os.stat_result) -> StaticEntry | None:
+        try:
+            etag = _file_hash(path)
+        except OSError:
+            return None
+        mime, _ = mimetypes.guess_type(path.name)
+        return StaticEntry(root_name, path, rel, st.st_size, st.st_mtime_ns, etag, mime)
+
+    def refresh(self, force: bool = False):
+        """
+        Пересканировать папки прямо сейчас (если пора или force=True).
+        Из обработчиков запросов не вызывать: там — refresh_soon() (фоновый поток).
+        """
+        now = time.monotonic()
+        if not force and now - self._last_scan < self.refresh_interval:
+            return
+        # Если сканирование уже идёт в другом потоке — не ждём, работаем со старыми данными
+        if not self._lock.acquire(blocking=force):
+            return
+        try:
+            if not force and time.monotonic() - self._last_scan < self.refresh_interval:
+                return
+            for name in self.roots:
+                entries = self._scan_root(name)
+                if entries != self._entries[name]:
+                    self._versions[name] += 1
+                self._entries[name] = entries
+            self._last_scan = time.monotonic()
+            self._save_known_hashes()
+        finally:
+            self._lock.release()
+
+    def refresh_soon(self):
+        """Пересканировать в фоновом потоке (не ждём); если сканирование уже идёт — ничего не делаем."""
+        with self._scan_thread_lock:
+            # После fork чужой поток в дочернем процессе считается завершённым — запустим свой
+            if self._scan_thread is not None and self._scan_thread.is_alive():
+                return
+            self._scan_thread = threading.Thread(target=self._background_refresh, name="static-manifest", daemon=True)
+            self._scan_thread.start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh(force=True)
+        except Exception:
+            # Не получилось — попробуем при следующем lookup(), манифест остаётся прежним
+            pass
+
+    def _maybe_refresh(self):
+        if time.monotonic() - self._last_scan >= self.refresh_interval:
+            self.refresh_soon()
+
+    def forget(self, entry: StaticEntry):
+        """Файл из манифеста пропал с диска: убрать запись сразу и пересканировать в фоне."""
+        entries = self._entries.get(entry.root)
+        if entries is not None and entries.get(entry.rel) is entry:
+            entries.pop(entry.rel, None)
+            self._versions[entry.root] += 1
+        self.refresh_soon()
+
+    # ---------- поиск ----------
+
+    def lookup(self, root_name: str, rel: str) -> StaticEntry | None:
+        """
+        Возвращает запись о файле или None.
+        rel — путь из URL (например "wine/abc.webp"). Пути с ".." сюда не попадут:
+        в манифесте есть только реально найденные файлы внутри корня.
+        """
+        self._maybe_refresh()
+        entries = self._entries.get(root_name)
+        if entries is None:
+            return None
+        rel = str(rel or "").replace("\\", "/").lstrip("/")
+        entry = entries.get(rel)
+        if entry is not None:
+            return entry
+        # Промах: возможно, файл только что загрузили, а пересканирования ещё не было.
+        # Проверяем один конкретный путь (дёшево) и добавляем в манифест.
+        return self._lookup_on_disk(root_name, rel)
+
+    def _lookup_on_disk(self, root_name: str, rel: str) -> StaticEntry | None:
+        if not rel or any(part in ("", ".", "..") or part.startswith(".") for part in rel.split("/")):
+            return None
+        root = self.roots[root_name]
+        path = root / rel
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        if not path.is_file():
+            return None
+        entry = self._make_entry(root_name, path, rel, st)
+        if entry:
+            self._entries[root_name][rel] = entry
+            self._versions[root_name] += 1
+        return entry
+
+    def entries(self, root_name: str) -> dict[str, StaticEntry]:
+        """Все записи корня (для генерации манифестов/отчётов). Не изменяйте результат."""
+        self._maybe_refresh()
+        return self._entries.get(root_name, {})
+
+    def root_version(self, root_name: str) -> int:
+        """
+        Дешёвый "номер версии" корня: меняется, когда файлы добавили/удалили/изменили.
+        Удобно включать в отпечатки кэшей, которые зависят от содержимого папки.
+        """
+        self._maybe_refresh()
+        return self._versions.get(root_name, 0)
+
+    @staticmethod
+    def is_fingerprint_match(entry: StaticEntry, version: str | None) -> bool:
+        """True, если ?v=... совпадает с хешем файла (значит, URL "неизменяемый")."""
+        v = str(version or "").strip()
+        return len(v) >= MIN_FINGERPRINT_LENGTH and entry.etag.startswith(v)
@@ -0,0 +1,202 @@
+"""
+Карточки тренажёра меню — из каталога, а не из отдельного trainer/cards.json.
+
+Зачем нужно:
+- тренажёр грузил cards.json (622 КБ, ручная копия данных меню) + весь menu-database.json;
+- данные расходились: правка блюда в админке не попадала в тренажёр.
+
+Теперь карточки строятся из снимка каталога (название, состав, аллергены, i18n),
+а сервер отдаёт только колоду на одну сессию (?n=20).
+
+Тех-термины:
+- **Дистракторы** (distractors) — неправильные варианты ответа в тесте. Берём "похожие":
+  названия из того же раздела/меню, аллергены, которых в блюде нет.
+- **seed** — число, от которого зависит перемешивание. Одинаковый seed = одинаковый порядок,
+  поэтому колоду можно листать страницами (?offset=) и не получить повторов.
+"""
+
+import random
+import re
+
+from catalog import short_hash
+
+# Сколько вариантов ответа в вопросе (1 правильный + дистракторы)
+CHOICES_COUNT = 4
+# Ширина картинки для карточки (из srcset каталога)
+CARD_IMAGE_WIDTH = 480
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_LI_RE = re.compile(r"<li[^>]*>(.*?)</li>", re.IGNORECASE | re.DOTALL)
+_MD_ITEM_RE = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s+(.+)$")
+
+
+def _clean(value) -> str:
+    """menu/section без пробелов по краям (в данных встречается " 🥘 Горячие блюда") — как в /api/dishes."""
+    return str(value or "").strip()
+
+
+def _plain(text) -> str:
+    """HTML/markdown -> простой текст в одну строку."""
+    text = _TAG_RE.sub(" ", str(text or "")).replace("**", "")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def extract_ingredients(item: dict) -> list[str]:
+    """
+    Список ингредиентов для вопроса "что входит в блюдо":
+    cardIngredients ("а / б / в"), иначе пункты списка из contains (<li> или "1. ...").
+    """
+    raw = item.get("cardIngredients")
+    if isinstance(raw, list):
+        parts = [_plain(x) for x in raw]
+    elif raw:
+        parts = [_plain(x) for x in str(raw).split("/")]
+    else:
+        contains = str(item.get("contains") or "")
+        parts = [_plain(x) for x in _LI_RE.findall(contains)]
+        if not parts:
+            for line in contains.splitlines():
+                m = _MD_ITEM_RE.match(line)
+                if m:
+                    parts.append(_plain(m.group(1)))
+    out = []
+    for part in parts:
+        part = part.strip(" .,;")
+        if part and part not in out:
+            out.append(part)
+    return out
+
+
+def _card_image(item: dict) -> dict | None:
+    """Картинка карточки: уменьшенная копия из srcset (если есть), иначе оригинал."""
+    image = item.get("image")
+    if not isinstance(image, dict) or not image.get("src"):
+        return None
+    src = image["src"]
+    for candidate in str(image.get("srcset") or "").split(","):
+        parts = candidate.strip().rsplit(" ", 1)
+        if len(parts) == 2 and parts[1].endswith("w") and parts[1][:-1].isdigit():
+            src = parts[0]
+            if int(parts[1][:-1]) >= CARD_IMAGE_WIDTH:
+                break
+    out = {"src": src, "alt": image.get("alt") or item.get("title") or ""}
+    for key in ("width", "height", "placeholder"):
+        if image.get(key):
+            out[key] = image[key]
+    return out
+
+
+def _en(item: dict) -> dict:
+    """Английские поля: в данных они бывают как "title-en", так и просто "title"."""
+    block = (item.get("i18n") or {}).get("en")
+    if not isinstance(block, dict):
+        return {}
+    out = {}
+    for key in ("title", "description", "contains"):
+        val = block.get(f"{key}-en") or block.get(key)
+        if val:
+            out[key] = val
+    return out
+
+
+def build_card(item: dict) -> dict:
+    """Карточка тренажёра из позиции каталога (формат совместим с normalizeCards в menu-trainer.html)."""
+    card = {
+        "id": str(item.get("id")),
+        "menu": _clean(item.get("menu")),
+        "section": _clean(item.get("section")),
+        "type": "dish",
+        "title": str(item.get("title") or "").strip(),
+        "description": item.get("description") or "",
+        "contains": item.get("contains") or "",
+        "allergens": [a for a in (item.get("allergens") or []) if a],
+        "tags": [t for t in (item.get("tags") or []) if t],
+        "ingredients": extract_ingredients(item),
+    }
+    image = _card_image(item)
+    if image:
+        card["image"] = image
+    en = _en(item)
+    if en:
+        card["i18n"] = {"en": en}
+    audio = (item.get("audio") or {}).get("en")
+    if audio:
+        card["audio"] = audio["url"]
+    return card
+
+
+def _pick(rng: random.Random, pool: list, exclude, count: int) -> list:
+    candidates = [x for x in pool if x not in exclude]
+    rng.shuffle(candidates)
+    return candidates[:count]
+
+
+def _title_choices(card: dict, rng: random.Random, by_section: dict, by_menu: dict, all_titles: list) -> list[str]:
+    """Вариант "угадай блюдо": правильное название + похожие (тот же раздел, потом меню, потом любые)."""
+    need = CHOICES_COUNT - 1
+    exclude = {card["title"]}
+    wrong = []
+    for pool in (by_section.get((card["menu"], card["section"]), []), by_menu.get(card["menu"], []), all_titles):
+        wrong += _pick(rng, pool, exclude | set(wrong), need - len(wrong))
+        if len(wrong) >= need:
+            break
+    choices = wrong + [card["title"]]
+    rng.shuffle(choices)
+    return choices
+
+
+def _allergen_question(card: dict, rng: random.Random, all_allergens: list) -> dict | None:
+    """Вариант "какой аллерген есть в блюде": один правильный, остальные — аллергены, которых в блюде нет."""
+    if not card["allergens"]:
+        return None
+    answer = rng.choice(card["allergens"])
+    wrong = _pick(rng, all_allergens, set(card["allergens"]), CHOICES_COUNT - 1)
+    if not wrong:
+        return None
+    options = wrong + [answer]
+    rng.shuffle(options)
+    return {"options": options, "answer": answer}
+
+
+def build_cards(items: list[dict], catalog_version: str) -> list[dict]:
+    """
+    Все карточки версии каталога (позиции "в архиве" пропускаем) + заранее посчитанные варианты ответов.
+    Дистракторы детерминированы: зависят от id карточки и версии каталога.
+    """
+    cards = [
+        build_card(it) for it in items
+        if str(it.get("title") or "").strip()
+        and str(it.get("status") or "").strip().lower() != "в архиве"
+    ]
+    by_section: dict[tuple, list] = {}
+    by_menu: dict[str, list] = {}
+    for c in cards:
+        by_section.setdefault((c["menu"], c["section"]), []).append(c["title"])
+        by_menu.setdefault(c["menu"], []).append(c["title"])
+    all_titles = sorted({c["title"] for c in cards})
+    all_allergens = sorted({a for c in cards for a in c["allergens"]})
+
+    for c in cards:
+        rng = random.Random(short_hash(f"{catalog_version}:{c['id']}".encode("utf-8")))
+        choices = {"title": _title_choices(c, rng, by_section, by_menu, all_titles)}
+        allergen = _allergen_question(c, rng, all_allergens)
+        if allergen:
+            choices["allergen"] = allergen
+        c["choices"] = choices
+    return cards
+
+
+def sample_deck(cards: list[dict], seed: int, offset: int, n: int,
+                menus=(), sections=()) -> tuple[int, list[dict]]:
+    """
+    Колода на сессию: фильтр по меню/разделам, перемешивание по seed, страница [offset:offset+n].
+    Возвращает (сколько всего карточек под фильтром, карточки страницы).
+    """
+    menus = {_clean(m) for m in menus} - {""}
+    sections = {_clean(s) for s in sections} - {""}
+    pool = [
+        c for c in cards
+        if (not menus or c["menu"] in menus) and (not sections or c["section"] in sections)
+    ]
+    random.Random(seed).shuffle(pool)
+    return len(pool), pool[offset:offset + n]
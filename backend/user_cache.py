@@ -0,0 +1,145 @@
+"""
+Кэш пользователей для Flask-Login: кто залогинен и какая у него роль — без запроса в БД на каждый вызов.
+
+Как было:
+- load_user делал User.query.get на КАЖДЫЙ запрос с cookie входа;
+- потом _require_admin / get_users / create_user / ... / check_auth ещё раз спрашивали БД
+  про того же пользователя — 2-3 запроса к SQLite на одну страницу админки.
+
+Как стало:
+- в кэше лежит лёгкий CachedUser (id, имя, логин, роль — без хеша пароля);
+- запись живёт ttl секунд (по умолчанию 30) и сбрасывается сразу при изменении/удалении
+  пользователя в этом процессе; в других gunicorn-воркерах — не позже, чем через ttl;
+- **версия учётных данных** (credential version) — короткий хеш от хеша пароля. Она входит
+  в id для Flask-Login ("<id>:<версия>"), а значит и в сессию, и в remember-cookie:
+  после смены пароля старые сессии и cookie "запомнить меня" перестают подходить
+  и пользователю нужно войти заново.
+
+Тех-термины:
+- **TTL** (time to live) — сколько секунд запись считается свежей.
+- **LRU** — при переполнении выкидываем запись, к которой дольше всего не обращались.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask_login import UserMixin
+
+ADMIN_ROLE = "администратор"
+DEFAULT_TTL_SECONDS = 30
+DEFAULT_MAX_SIZE = 256
+
+
+def credential_version(password_hash: str) -> str:
+    """Короткий отпечаток хеша пароля (сам хеш в сессию не кладём)."""
+    return hashlib.sha1(str(password_hash or "").encode("utf-8")).hexdigest()[:12]
+
+
+def split_login_id(login_id) -> tuple[int, str | None]:
+    """
+    "<id>:<версия>" -> (id, версия); старый формат "<id>" -> (id, None).
+    Некорректный id -> ValueError.
+    """
+    raw_id, _, version = str(login_id).partition(":")
+    return int(raw_id), (version or None)
+
+
+class CachedUser(UserMixin):
+    """Снимок пользователя из БД. Только для чтения: менять данные — через модель User."""
+
+    def __init__(self, user_id: int, name: str, username: str, role: str,
+                 created_at: str | None, updated_at: str | None, cred_version: str):
+        self.id = user_id
+        self.name = name
+        self.username = username
+        self.role = role
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.cred_version = cred_version
+
+    @classmethod
+    def from_model(cls, user) -> "CachedUser":
+        return cls(
+            user_id=user.id,
+            name=user.name,
+            username=user.username,
+            role=user.role,
+            created_at=user.created_at.isoformat() if user.created_at else None,
+            updated_at=user.updated_at.isoformat() if user.updated_at else None,
+            cred_version=credential_version(user.password_hash),
+        )
+
+    def get_id(self):
+        """Id для Flask-Login (сессия и remember-cookie): вместе с версией учётных данных."""
+        return f"{self.id}:{self.cred_version}"
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == ADMIN_ROLE
+
+    def to_dict(self):
+        """Тот же формат, что и User.to_dict()."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "username": self.username,
+            "role": self.role,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+    def __repr__(self):
+        return f"<CachedUser {self.id}: {self.username} ({self.role})>"
+
+
+class UserCache:
+    """
+    LRU + TTL кэш CachedUser по id пользователя.
+    loader(user_id) -> модель User или None (вызывается только при промахе).
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL_SECONDS, max_size: int = DEFAULT_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._items: OrderedDict = OrderedDict()  # user_id -> (CachedUser | None, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, loader) -> CachedUser | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._items.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._items.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        model = loader(user_id)
+        cached = CachedUser.from_model(model) if model is not None else None
+        # "Нет такого пользователя" тоже запоминаем: иначе старая cookie удалённого
+        # пользователя будет ходить в БД на каждый запрос
+        self.put(user_id, cached)
+        return cached
+
+    def put(self, user_id: int, cached: CachedUser | None):
+        with self._lock:
+            self._items[user_id] = (cached, time.monotonic() + self.ttl)
+            self._items.move_to_end(user_id)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def invalidate(self, user_id: int | None = None):
+        """Сбросить одного пользователя (или всех, если user_id не указан)."""
+        with self._lock:
+            if user_id is None:
+                self._items.clear()
+            else:
+                self._items.pop(user_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._items), "hits": self.hits, "misses": self.misses, "ttl": self.ttl}
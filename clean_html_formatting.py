@@ -3,16 +3,35 @@
 Удаляет лишние атрибуты (class, id, start, type) из всех HTML-тегов
 Объединяет несколько <ol> в один и форматирует красиво
 Удаляет пустые теги <p>
+
+Сейчас то же самое делает backend/html_normalizer.py — один проход, и вызывается
+при каждом сохранении из админки/импорте. Скрипт нужен только для разовой чистки файла.
+Старая версия на регулярных выражениях оставлена (clean_html_content_regex) — только для
+сравнения скорости в backend/bench_html_normalizer.py: она теряет текст (абзацы склеивает,
+текст между списками выкидывает), нормализатор — нет.
 """
 
 import json
 import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "backend"))
+from html_normalizer import HtmlNormalizeError, normalize_html, normalize_item_html  # noqa: E402
 
 
 def clean_html_content(html_text):
     """
     Очищает HTML-разметку: убирает атрибуты из всех тегов, объединяет списки, форматирует
     """
+    return normalize_html(html_text)
+
+
+def clean_html_content_regex(html_text):
+    """
+    Старая реализация (20+ проходов re.sub). Теряет текст на границах абзацев и между списками —
+    не использовать для записи, только для сравнения скорости.
+    """
     if not html_text or not isinstance(html_text, str):
         return html_text
     
@@ -85,7 +104,7 @@ def clean_html_content(html_text):
                 text_after = ''
                 last_ol_end = html_text.rfind('</ol>')
                 if last_ol_end >= 0:
-                    text_after = html_text[last_ol_end + 6:].strip()  # 6 = длина '</ol>'
+                    text_after = html_text[last_ol_end + len('</ol>'):].strip()
                     
                     # Убираем оставшиеся теги <p> из text_after, если они есть
                     text_after = re.sub(r'<p>\s*</p>', '', text_after)
@@ -147,36 +166,18 @@ def process_json_file(file_path):
     
     print(f"Найдено записей: {len(data)}")
     processed_count = 0
+    skipped_count = 0
     
     # Обрабатываем каждую запись
     for idx, item in enumerate(data, 1):
-        changed = False
-        
-        # Обрабатываем поле contains
-        if 'contains' in item and item['contains']:
-            old_value = item['contains']
-            new_value = clean_html_content(old_value)
-            if old_value != new_value:
-                item['contains'] = new_value
-                changed = True
-        
-        # Обрабатываем поле features (тоже может содержать HTML с атрибутами)
-        if 'features' in item and item['features']:
-            old_value = item['features']
-            new_value = clean_html_content(old_value)
-            if old_value != new_value:
-                item['features'] = new_value
-                changed = True
-        
-        # Обрабатываем поле i18n.en.contains-en
-        if 'i18n' in item and isinstance(item['i18n'], dict):
-            if 'en' in item['i18n'] and isinstance(item['i18n']['en'], dict):
-                if 'contains-en' in item['i18n']['en'] and item['i18n']['en']['contains-en']:
-                    old_value = item['i18n']['en']['contains-en']
-                    new_value = clean_html_content(old_value)
-                    if old_value != new_value:
-                        item['i18n']['en']['contains-en'] = new_value
-                        changed = True
+        # contains, features, i18n.en.contains-en
+        try:
+            changed = normalize_item_html(item)
+        except HtmlNormalizeError as e:
+            # Такую позицию не трогаем: лучше "грязный" HTML, чем потерянный текст
+            print(f"  Пропущено: {e}")
+            skipped_count += 1
+            continue
         
         if changed:
             processed_count += 1
@@ -184,6 +185,8 @@ def process_json_file(file_path):
                 print(f"  Обработано записей: {processed_count}...")
     
     print(f"\nВсего обработано записей: {processed_count}")
+    if skipped_count:
+        print(f"Пропущено (нормализация потеряла бы текст): {skipped_count}")
     
     # Сохраняем результат
     output_path = file_path
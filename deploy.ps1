@@ -134,7 +134,9 @@ Info "Restart service ($ServiceName)"
 if ($SkipUpload) {
   Write-Host "Skipping restart because -SkipUpload is set." -ForegroundColor Yellow
 } else {
-  Run "ssh" ($CommonSshArgs + @($Remote, "systemctl restart $ServiceName"))
+  # reload-or-restart: если в сервисе есть ExecReload=/bin/kill -HUP $MAINPID (см. gunicorn.conf.py),
+  # gunicorn заменит воркеров без обрыва запросов; иначе — обычный restart
+  Run "ssh" ($CommonSshArgs + @($Remote, "systemctl reload-or-restart $ServiceName"))
 }
 
 Info "Quick check (open in browser)"
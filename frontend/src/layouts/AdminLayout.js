@@ -1,7 +1,7 @@
-import React from 'react';
+import React, { useEffect, useState } from 'react';
 import { Outlet, useNavigate, useLocation, Link } from 'react-router-dom';
 import { useAuth } from '../contexts/AuthContext';
-import { logout } from '../services/api';
+import { logout, getFeedbackUnreadCount } from '../services/api';
 
 /**
  * AdminLayout - Единый layout для админ-панели
@@ -19,6 +19,15 @@ function AdminLayout() {
   // Проверяем, является ли пользователь администратором
   const isAdmin = currentUser?.role === 'администратор';
 
+  // Значок непрочитанной обратной связи: дешёвый запрос (один счётчик), обновляем при переходах
+  const [feedbackUnread, setFeedbackUnread] = useState(0);
+  useEffect(() => {
+    if (!currentUser || currentUser.role === 'guest') return;
+    getFeedbackUnreadCount()
+      .then((data) => setFeedbackUnread(data.unread_count || 0))
+      .catch(() => {});
+  }, [currentUser, location.pathname]);
+
   const handleLogout = async () => {
     try {
       await logout();
@@ -199,6 +208,11 @@ function AdminLayout() {
             >
               <span className="material-symbols-outlined text-xl">feedback</span>
               <span className="font-medium">Обратная связь</span>
+              {feedbackUnread > 0 && (
+                <span className="ml-auto bg-red-500 text-white text-[10px] font-bold rounded-full min-w-5 h-5 px-1 flex items-center justify-center">
+                  {feedbackUnread > 99 ? '99+' : feedbackUnread}
+                </span>
+              )}
             </Link>
 
             <Link
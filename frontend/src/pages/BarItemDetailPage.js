@@ -149,7 +149,7 @@ function BarItemDetailPage() {
       try {
         setLoading(true);
         // Барные позиции сейчас хранятся в общей базе, поэтому берём через getDish(id)
-        const data = await getDish(id);
+        const data = await getDish(id, { format: 'html' });
         setItem(data);
 
         // Подсветка из глобального поиска
@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { useParams, Link, useNavigate } from 'react-router-dom';
-import { getDish } from '../services/api';
+import { getDish, subscribeCatalogChanges } from '../services/api';
 import { useAuth } from '../contexts/AuthContext';
 import { getDishImageUrl } from '../utils/imageUtils';
 import './DishDetailPage.css';
@@ -143,7 +143,8 @@ function DishDetailPage() {
   useEffect(() => {
     const loadDish = async () => {
       try {
-        const data = await getDish(id);
+        // format: 'html' — текстовые поля уже очищены сервером (без мусора из Notion и лишних переносов)
+        const data = await getDish(id, { format: 'html' });
         setDish(data);
         setIsFeaturesExpanded(false); // Сбрасываем состояние развернутости при загрузке нового блюда
         
@@ -173,6 +174,18 @@ function DishDetailPage() {
     loadDish();
   }, [id]);
 
+  // Живые правки из админки: если изменили именно это блюдо — перечитываем его
+  useEffect(() => {
+    return subscribeCatalogChanges(async (change) => {
+      if (!change.full && !(change.changed || []).includes(String(id))) return;
+      try {
+        setDish(await getDish(id, { format: 'html' }));
+      } catch (error) {
+        // блюдо удалили — оставляем то, что уже на экране
+      }
+    });
+  }, [id]);
+
   // Функция для поиска и прокрутки к найденному тексту
   useEffect(() => {
     if (!searchQuery || !dish) return;
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
-import { getDishes } from '../services/api';
+import { getDishesByIds } from '../services/api';
 import { useAuth } from '../contexts/AuthContext';
 import { getDishImageUrl } from '../utils/imageUtils';
 
@@ -52,10 +52,14 @@ function FavoritesPage() {
     return `/dish/${it.id}`;
   };
 
+  // Ключ-строка, чтобы перезагружать позиции только когда реально поменялся состав избранного
+  const favoritesKey = favorites.join(',');
+
   useEffect(() => {
     const loadDishes = async () => {
       try {
-        const allDishesData = await getDishes();
+        // Берём только избранные позиции одним запросом, а не весь каталог
+        const allDishesData = await getDishesByIds(favoritesKey ? favoritesKey.split(',') : []);
         
         // Сохраняем все блюда (включая "в архиве") — архивные просто затемняем в UI
         // Термин **архив**: позиция неактивна, но всё ещё доступна для просмотра.
@@ -68,7 +72,7 @@ function FavoritesPage() {
     };
 
     loadDishes();
-  }, []);
+  }, [favoritesKey]);
 
   // Обновляем избранное при изменении localStorage
   useEffect(() => {
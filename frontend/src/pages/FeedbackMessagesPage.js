@@ -34,7 +34,7 @@ function FeedbackMessagesPage() {
     setLoading(true);
     try {
       const data = await getFeedbackMessages();
-      setMessages(data);
+      setMessages(data.items);
     } catch (error) {
       alert('Ошибка загрузки сообщений: ' + error.message);
     } finally {
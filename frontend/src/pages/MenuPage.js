@@ -1,6 +1,6 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useParams, Link, useNavigate } from 'react-router-dom';
-import { getDishes } from '../services/api';
+import { getDishes, getDishesByIds, subscribeCatalogChanges } from '../services/api';
 import { useAuth } from '../contexts/AuthContext';
 import { getDishImageUrl } from '../utils/imageUtils';
 
@@ -104,6 +104,42 @@ function MenuPage() {
     loadDishes();
   }, [menuName]);
 
+  // Живые правки из админки: сервер присылает id изменённых позиций, дозапрашиваем только их
+  const allDishesRef = useRef(allDishes);
+  allDishesRef.current = allDishes;
+  useEffect(() => {
+    const decodedMenuName = decodeURIComponent(menuName);
+    const apply = (items) => {
+      setAllDishes(items);
+      const filtered = items.filter((dish) => dish.menu === decodedMenuName);
+      setDishes(filtered);
+      setSections([...new Set(filtered.map((d) => d.section).filter(Boolean))]);
+    };
+
+    return subscribeCatalogChanges(async (change) => {
+      try {
+        if (change.full) {
+          apply(await getDishes());
+          return;
+        }
+        const fresh = change.changed?.length ? await getDishesByIds(change.changed) : [];
+        const freshById = new Map(fresh.map((it) => [String(it.id), it]));
+        const removed = new Set((change.removed || []).map(String));
+        const next = allDishesRef.current
+          .filter((it) => !removed.has(String(it.id)))
+          .map((it) => {
+            const updated = freshById.get(String(it.id));
+            if (updated) freshById.delete(String(it.id));
+            return updated || it;
+          });
+        // Новые позиции — в конец списка
+        apply([...next, ...freshById.values()]);
+      } catch (error) {
+        console.error('Ошибка обновления блюд:', error);
+      }
+    });
+  }, [menuName]);
+
   // Обновляем избранное при изменении localStorage
   useEffect(() => {
     const handleStorageChange = (e) => {
@@ -521,6 +557,8 @@ function MenuPage() {
               const tags = getDishTags(dish);
               const imageUrl = getDishImageUrl(dish);
               const isArchived = dish.status === 'в архиве';
+              // Стоп-лист: позиция закончилась (сервер добавляет available=false)
+              const isStopped = dish.available === false;
 
               return (
                 <Link
@@ -529,7 +567,7 @@ function MenuPage() {
                   className="group relative rounded-lg overflow-hidden bg-white dark:bg-surface-dark shadow-[0_2px_8px_rgba(0,0,0,0.04)] dark:shadow-none border border-gray-100 dark:border-gray-800 hover:border-primary/30 transition-all"
                 >
                   {/* Затемняем ТОЛЬКО контент карточки, чтобы бейдж "В АРХИВЕ" был читабельным */}
-                  <div className={`flex flex-col h-full ${isArchived ? 'opacity-50 grayscale' : ''}`}>
+                  <div className={`flex flex-col h-full ${isArchived || isStopped ? 'opacity-50 grayscale' : ''}`}>
                     <div className="relative w-full aspect-square overflow-hidden bg-gray-100 dark:bg-gray-800">
                       {imageUrl ? (
                         <div
@@ -585,6 +623,14 @@ function MenuPage() {
                       В АРХИВЕ
                     </div>
                   )}
+                  {!isArchived && isStopped && (
+                    <div
+                      className="absolute top-2 right-2 bg-red-600/90 text-white text-[10px] font-bold px-2 py-1 rounded-md backdrop-blur-sm"
+                      title={dish.stop?.note || undefined}
+                    >
+                      {language === 'EN' ? 'SOLD OUT' : 'СТОП'}
+                    </div>
+                  )}
                 </Link>
               );
             })
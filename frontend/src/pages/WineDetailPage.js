@@ -140,7 +140,8 @@ function WineDetailPage() {
   };
 
   const handleAudioPlay = () => {
-    const audioPath = wine?.i18n?.en?.['audio-en'];
+    // audio.en.url — путь, проверенный сервером (с ?v=хеш); audio-en — как раньше, если сервер старый
+    const audioPath = wine?.audio?.en?.url || wine?.i18n?.en?.['audio-en'];
     if (!audioPath) return;
 
     if (audioPlaying) {
@@ -324,7 +325,7 @@ function WineDetailPage() {
             </span>
           </div>
 
-          {wine?.i18n?.en?.['audio-en'] && (
+          {(wine?.audio?.en || wine?.i18n?.en?.['audio-en']) && (
             <button
               onClick={handleAudioPlay}
               title={language === 'EN' ? 'Pronunciation' : 'Произношение (EN)'}
@@ -73,7 +73,8 @@ function WineItemPage() {
 
   // Воспроизведение аудио
   const handleAudioPlay = () => {
-    const audioPath = wine?.i18n?.en?.['audio-en'];
+    // audio.en.url — путь, проверенный сервером (с ?v=хеш); audio-en — как раньше, если сервер старый
+    const audioPath = wine?.audio?.en?.url || wine?.i18n?.en?.['audio-en'];
     if (!audioPath) return;
 
     if (audioPlaying) {
@@ -335,7 +336,7 @@ function WineItemPage() {
         </section>
 
         {/* Audio Button Section - кнопка аудио между бутылкой и следующим элементом */}
-        {wine.i18n?.en?.['audio-en'] && (
+        {(wine.audio?.en || wine.i18n?.en?.['audio-en']) && (
           <section className="audio-button-section relative px-4 sm:px-6 md:px-8 z-20">
             <div className="flex justify-center md:justify-end">
               <button
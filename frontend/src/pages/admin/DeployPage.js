@@ -1,5 +1,5 @@
 import React, { useEffect, useMemo, useState } from 'react';
-import { importMenuJson, getDeployJob, getDeployStatus, runDeploy } from '../../services/api';
+import { importMenuJson, getDeployJob, getDeployStatus, openDeployStream, runDeploy } from '../../services/api';
 import HelpPopover from '../../components/HelpPopover';
 
 /**
@@ -36,22 +36,53 @@ function DeployPage() {
     load();
   }, []);
 
-  // Поллинг статуса деплоя, если он запущен
+  // Живой лог деплоя: поток событий (SSE) вместо опроса раз в 2 секунды
+  const deployRunning = deployState?.status === 'running';
+  const [following, setFollowing] = useState(false);
   useEffect(() => {
-    if (!deployEnabled) return;
-    if (!deployState || deployState.status !== 'running') return;
+    if (deployRunning) setFollowing(true);
+  }, [deployRunning]);
 
-    const timer = setInterval(async () => {
-      try {
-        const job = await getDeployJob();
-        setDeployState(job);
-      } catch (e) {
-        // если в этот момент сервис перезапускается — запрос может отвалиться, это нормально
+  useEffect(() => {
+    if (!deployEnabled || !following) return;
+
+    const stream = openDeployStream();
+    let closeTimer = null;
+    // Первое подключение отдаёт запуск целиком, поэтому лог собираем заново;
+    // переподключение (Last-Event-ID) — только пропущенное, лог сохраняется
+    let streamRun = null;
+
+    stream.addEventListener('state', (e) => {
+      const next = JSON.parse(e.data);
+      const sameRun = streamRun === next.run_id;
+      streamRun = next.run_id;
+      setDeployState((prev) => ({ ...next, log: sameRun && prev ? prev.log || [] : [] }));
+      clearTimeout(closeTimer);
+      if (next.status === 'done' || next.status === 'error') {
+        // Ещё немного слушаем: после "done" в лог пишется замена воркеров
+        closeTimer = setTimeout(() => setFollowing(false), 15000);
+      }
+    });
+    stream.addEventListener('log', (e) => {
+      const { line } = JSON.parse(e.data);
+      setDeployState((prev) => (prev ? { ...prev, log: [...(prev.log || []), line].slice(-1000) } : prev));
+    });
+    stream.onerror = async () => {
+      // EventSource переподключится сам; если поток недоступен совсем (старый сервер) — разовый запрос состояния
+      if (stream.readyState === EventSource.CLOSED) {
+        try {
+          setDeployState(await getDeployJob());
+        } catch (err) {
+          // если в этот момент сервис перезапускается — запрос может отвалиться, это нормально
+        }
       }
-    }, 2000);
+    };
 
-    return () => clearInterval(timer);
-  }, [deployEnabled, deployState]);
+    return () => {
+      clearTimeout(closeTimer);
+      stream.close();
+    };
+  }, [deployEnabled, following]);
 
   const deployLogText = useMemo(() => {
     const lines = deployState?.log || [];
@@ -1,6 +1,6 @@
 import React, { useMemo, useState, useEffect } from 'react';
 import { useNavigate, Link } from 'react-router-dom';
-import { getDishes, deleteDish } from '../../services/api';
+import { getDishes, deleteDish, setAvailability } from '../../services/api';
 import { useAuth } from '../../contexts/AuthContext';
 import { getDishImageUrl } from '../../utils/imageUtils';
 import HelpPopover from '../../components/HelpPopover';
@@ -46,6 +46,19 @@ function DishesPage({ mode = 'kitchen' }) {
     }
   };
 
+  // Стоп-лист: позиция остаётся в меню, но помечается "нет в наличии" (сам каталог не меняется)
+  const handleToggleAvailable = async (dish) => {
+    const available = dish.available === false;
+    try {
+      await setAvailability([dish.id], available);
+      setDishes((prev) => prev.map((d) => (
+        d.id === dish.id ? { ...d, available, stop: available ? undefined : { note: null } } : d
+      )));
+    } catch (error) {
+      alert('❌ Ошибка стоп-листа: ' + (error.response?.data?.error || error.message));
+    }
+  };
+
   const pageTitle = useMemo(() => {
     if (mode === 'wine') return 'Вино';
     if (mode === 'bar') return 'Бар';
@@ -207,6 +220,20 @@ function DishesPage({ mode = 'kitchen' }) {
                       <span className="material-symbols-outlined text-[18px]">edit</span>
                       Править
                     </button>
+                    <button
+                      onClick={() => handleToggleAvailable(dish)}
+                      className={`inline-flex items-center gap-1 px-3 h-9 rounded-xl transition-colors text-xs font-bold ${
+                        dish.available === false
+                          ? 'bg-red-50 dark:bg-red-900/20 text-red-500 hover:bg-red-100 dark:hover:bg-red-900/30'
+                          : 'bg-gray-50 dark:bg-white/5 text-text-secondary-light hover:bg-gray-100 dark:hover:bg-white/10'
+                      }`}
+                      title={dish.available === false ? 'Вернуть в продажу' : 'Поставить на стоп (нет в наличии)'}
+                    >
+                      <span className="material-symbols-outlined text-[18px]">
+                        {dish.available === false ? 'block' : 'check_circle'}
+                      </span>
+                      {dish.available === false ? 'На стопе' : 'В продаже'}
+                    </button>
                     <button
                       onClick={() => handleDelete(dish.id)}
                       className="inline-flex items-center justify-center size-9 rounded-xl bg-gray-50 dark:bg-white/5 text-red-400 hover:bg-red-50 dark:hover:bg-red-900/20 transition-colors"
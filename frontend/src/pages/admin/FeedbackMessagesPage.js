@@ -1,37 +1,60 @@
-import React, { useState, useEffect } from 'react';
-import { getFeedbackMessages, markFeedbackRead, deleteFeedbackMessage } from '../../services/api';
+import React, { useState, useEffect, useCallback } from 'react';
+import {
+  getFeedbackMessages,
+  markFeedbackRead,
+  deleteFeedbackMessage,
+  markFeedbackReadBulk,
+  deleteFeedbackMessages,
+} from '../../services/api';
 
 /**
  * FeedbackMessagesPage - Страница обратной связи
  * Отображается в центральной области AdminLayout (правая колонка - администрирование)
+ *
+ * Сообщения грузятся страницами (кнопка "Показать ещё"), фильтр применяется на сервере,
+ * число непрочитанных приходит с сервера. Можно выбрать несколько сообщений и
+ * отметить/удалить их одним запросом.
  */
 function FeedbackMessagesPage() {
   const [messages, setMessages] = useState([]);
   const [loading, setLoading] = useState(false);
-  const [filter, setFilter] = useState('all'); // 'all', 'unread', 'read'
+  const [filter, setFilter] = useState('all'); // 'all', 'unread', 'read', 'archived'
+  const [nextCursor, setNextCursor] = useState(null);
+  const [unreadCount, setUnreadCount] = useState(0);
+  const [selected, setSelected] = useState(new Set());
 
-  useEffect(() => {
-    loadMessages();
-  }, []);
-
-  const loadMessages = async () => {
+  const loadMessages = useCallback(async (status, cursor = null) => {
     setLoading(true);
     try {
-      const data = await getFeedbackMessages();
-      setMessages(data);
+      const data = await getFeedbackMessages({ status, cursor });
+      setMessages(prev => (cursor ? [...prev, ...data.items] : data.items));
+      setNextCursor(data.next_cursor);
+      setUnreadCount(data.unread_count);
     } catch (error) {
       alert('Ошибка загрузки сообщений: ' + error.message);
     } finally {
       setLoading(false);
     }
+  }, []);
+
+  useEffect(() => {
+    setSelected(new Set());
+    loadMessages(filter);
+  }, [filter, loadMessages]);
+
+  // Сообщения, которые больше не подходят под текущую вкладку, убираем из списка
+  const applyRead = (ids) => {
+    const idSet = new Set(ids);
+    setMessages(prev => (filter === 'unread'
+      ? prev.filter(msg => !idSet.has(msg.id))
+      : prev.map(msg => (idSet.has(msg.id) ? { ...msg, read: true } : msg))));
   };
 
   const handleMarkRead = async (messageId) => {
     try {
       await markFeedbackRead(messageId);
-      setMessages(messages.map(msg => 
-        msg.id === messageId ? { ...msg, read: true } : msg
-      ));
+      applyRead([messageId]);
+      setUnreadCount(count => Math.max(0, count - 1));
     } catch (error) {
       alert('Ошибка при обновлении сообщения: ' + error.message);
     }
@@ -42,13 +65,56 @@ function FeedbackMessagesPage() {
 
     try {
       await deleteFeedbackMessage(messageId);
+      const removed = messages.find(msg => msg.id === messageId);
       setMessages(messages.filter(msg => msg.id !== messageId));
+      if (removed && !removed.read) setUnreadCount(count => Math.max(0, count - 1));
       alert('✅ Сообщение удалено');
     } catch (error) {
       alert('❌ Ошибка удаления: ' + error.message);
     }
   };
 
+  const toggleSelected = (messageId) => {
+    setSelected(prev => {
+      const next = new Set(prev);
+      if (next.has(messageId)) next.delete(messageId);
+      else next.add(messageId);
+      return next;
+    });
+  };
+
+  const handleBulkRead = async (all = false) => {
+    const ids = all ? null : [...selected];
+    try {
+      const data = await markFeedbackReadBulk(ids);
+      if (all) {
+        if (filter === 'unread') setMessages([]);
+        else setMessages(prev => prev.map(msg => ({ ...msg, read: true })));
+      } else {
+        applyRead(ids);
+      }
+      setUnreadCount(data.unread_count);
+      setSelected(new Set());
+    } catch (error) {
+      alert('Ошибка при обновлении сообщений: ' + error.message);
+    }
+  };
+
+  const handleBulkDelete = async () => {
+    const ids = [...selected];
+    if (!window.confirm(`Удалить выбранные сообщения (${ids.length})?`)) return;
+
+    try {
+      const data = await deleteFeedbackMessages(ids);
+      const idSet = new Set(ids);
+      setMessages(prev => prev.filter(msg => !idSet.has(msg.id)));
+      setUnreadCount(data.unread_count);
+      setSelected(new Set());
+    } catch (error) {
+      alert('❌ Ошибка удаления: ' + error.message);
+    }
+  };
+
   const formatDate = (dateString) => {
     if (!dateString) return 'Дата неизвестна';
     const date = new Date(dateString);
@@ -71,13 +137,7 @@ function FeedbackMessagesPage() {
     return types[type] || types.question;
   };
 
-  const filteredMessages = messages.filter(msg => {
-    if (filter === 'unread') return !msg.read;
-    if (filter === 'read') return msg.read;
-    return true;
-  });
-
-  const unreadCount = messages.filter(msg => !msg.read).length;
+  const isArchive = filter === 'archived';
 
   return (
     <div className="h-full flex flex-col overflow-y-auto p-6">
@@ -100,7 +160,7 @@ function FeedbackMessagesPage() {
               : 'bg-gray-100 dark:bg-white/10 text-text-primary-light dark:text-text-primary-dark hover:bg-gray-200 dark:hover:bg-white/20'
           }`}
         >
-          Все ({messages.length})
+          Все
         </button>
         <button
           onClick={() => setFilter('unread')}
@@ -125,22 +185,66 @@ function FeedbackMessagesPage() {
               : 'bg-gray-100 dark:bg-white/10 text-text-primary-light dark:text-text-primary-dark hover:bg-gray-200 dark:hover:bg-white/20'
           }`}
         >
-          Прочитанные ({messages.filter(msg => msg.read).length})
+          Прочитанные
+        </button>
+        <button
+          onClick={() => setFilter('archived')}
+          className={`px-4 py-2 rounded-lg text-sm font-medium transition-colors ${
+            filter === 'archived'
+              ? 'bg-primary text-white'
+              : 'bg-gray-100 dark:bg-white/10 text-text-primary-light dark:text-text-primary-dark hover:bg-gray-200 dark:hover:bg-white/20'
+          }`}
+        >
+          Архив
         </button>
       </div>
 
+      {/* Массовые действия */}
+      {!isArchive && (
+        <div className="mb-4 flex flex-wrap gap-2 items-center">
+          {selected.size > 0 && (
+            <>
+              <span className="text-sm text-text-secondary-light dark:text-text-secondary-dark">
+                Выбрано: {selected.size}
+              </span>
+              <button
+                onClick={() => handleBulkRead(false)}
+                className="px-3 py-1.5 rounded-lg bg-primary/10 text-primary text-xs font-medium hover:bg-primary/20 transition-colors"
+              >
+                Отметить прочитанными
+              </button>
+              <button
+                onClick={handleBulkDelete}
+                className="px-3 py-1.5 rounded-lg bg-red-50 dark:bg-red-900/20 text-red-500 text-xs font-medium hover:bg-red-100 dark:hover:bg-red-900/30 transition-colors"
+              >
+                Удалить выбранные
+              </button>
+            </>
+          )}
+          {unreadCount > 0 && (
+            <button
+              onClick={() => handleBulkRead(true)}
+              className="px-3 py-1.5 rounded-lg bg-gray-100 dark:bg-white/10 text-text-primary-light dark:text-text-primary-dark text-xs font-medium hover:bg-gray-200 dark:hover:bg-white/20 transition-colors"
+            >
+              Прочитать все
+            </button>
+          )}
+        </div>
+      )}
+
       {/* Список сообщений */}
       <div className="flex flex-col gap-3 flex-1">
-        {loading ? (
+        {loading && messages.length === 0 ? (
           <div className="text-center py-8 text-text-secondary-light">Загрузка...</div>
-        ) : filteredMessages.length === 0 ? (
+        ) : messages.length === 0 ? (
           <div className="text-center py-8 text-text-secondary-light">
             {filter === 'unread' ? 'Нет непрочитанных сообщений' : 
              filter === 'read' ? 'Нет прочитанных сообщений' : 
+             isArchive ? 'Архив пуст' : 
              'Нет сообщений'}
           </div>
         ) : (
-          filteredMessages.map((message) => (
+          messages.map((message) => (
             <div
               key={message.id}
               className={`flex flex-col bg-surface-light dark:bg-surface-dark rounded-2xl p-4 shadow-sm border ${
@@ -154,6 +258,16 @@ function FeedbackMessagesPage() {
               )}
 
               <div className="flex flex-col gap-2 mb-3">
+                {!isArchive && (
+                  <label className="flex items-center gap-2 text-xs text-text-secondary-light dark:text-text-secondary-dark cursor-pointer w-fit">
+                    <input
+                      type="checkbox"
+                      checked={selected.has(message.id)}
+                      onChange={() => toggleSelected(message.id)}
+                    />
+                    Выбрать
+                  </label>
+                )}
                 {message.name && (
                   <p className="text-sm font-semibold text-text-primary-light dark:text-text-primary-dark">
                     {message.name}
@@ -174,28 +288,40 @@ function FeedbackMessagesPage() {
                 <span className="text-xs text-text-secondary-light dark:text-text-secondary-dark">
                   {formatDate(message.created_at)}
                 </span>
-                <div className="flex gap-2">
-                  {!message.read && (
+                {!isArchive && (
+                  <div className="flex gap-2">
+                    {!message.read && (
+                      <button
+                        onClick={() => handleMarkRead(message.id)}
+                        className="px-3 py-1.5 rounded-lg bg-primary/10 text-primary text-xs font-medium hover:bg-primary/20 transition-colors"
+                        title="Отметить как прочитанное"
+                      >
+                        Прочитано
+                      </button>
+                    )}
                     <button
-                      onClick={() => handleMarkRead(message.id)}
-                      className="px-3 py-1.5 rounded-lg bg-primary/10 text-primary text-xs font-medium hover:bg-primary/20 transition-colors"
-                      title="Отметить как прочитанное"
+                      onClick={() => handleDelete(message.id)}
+                      className="p-1.5 rounded-lg bg-gray-50 dark:bg-white/5 text-red-400 hover:bg-red-50 dark:hover:bg-red-900/20 transition-colors"
+                      title="Удалить"
                     >
-                      Прочитано
+                      <span className="material-symbols-outlined text-[18px]">delete</span>
                     </button>
-                  )}
-                  <button
-                    onClick={() => handleDelete(message.id)}
-                    className="p-1.5 rounded-lg bg-gray-50 dark:bg-white/5 text-red-400 hover:bg-red-50 dark:hover:bg-red-900/20 transition-colors"
-                    title="Удалить"
-                  >
-                    <span className="material-symbols-outlined text-[18px]">delete</span>
-                  </button>
-                </div>
+                  </div>
+                )}
               </div>
             </div>
           ))
         )}
+
+        {nextCursor && messages.length > 0 && (
+          <button
+            onClick={() => loadMessages(filter, nextCursor)}
+            disabled={loading}
+            className="self-center px-4 py-2 rounded-lg text-sm font-medium bg-gray-100 dark:bg-white/10 text-text-primary-light dark:text-text-primary-dark hover:bg-gray-200 dark:hover:bg-white/20 transition-colors disabled:opacity-50"
+          >
+            {loading ? 'Загрузка...' : 'Показать ещё'}
+          </button>
+        )}
       </div>
     </div>
   );
@@ -266,7 +266,9 @@ export const getDishes = async () => {
   }
 };
 
-export const getDish = async (id) => {
+// format: 'raw' (как в базе, для админки) | 'html' (готовый безопасный HTML — для экранов просмотра)
+// | 'text' (простой текст). Фолбэки (статический JSON/кэш) всегда отдают raw — страницы умеют и его.
+export const getDish = async (id, { format } = {}) => {
   const normId = _normalizeId(id);
   if (!normId) {
     throw new Error('Dish id is required');
@@ -292,7 +294,8 @@ export const getDish = async (id) => {
   }
 
   try {
-    const response = await api.get(`/api/dishes/${normId}`, { timeout: 8000 });
+    const params = format && format !== 'raw' ? { format } : undefined;
+    const response = await api.get(`/api/dishes/${normId}`, { params, timeout: 8000 });
     _setMenuDbRuntimeSource('api');
     return response.data;
   } catch (err) {
@@ -316,6 +319,42 @@ export const getDish = async (id) => {
   }
 };
 
+// Несколько позиций за один запрос (избранное, пэйринги).
+// Возвращает массив найденных позиций в порядке ids; отсутствующие id просто пропускаются.
+export const getDishesByIds = async (ids) => {
+  const normIds = Array.from(new Set((ids || []).map(_normalizeId).filter(Boolean)));
+  if (normIds.length === 0) return [];
+
+  const pickFrom = (items) => {
+    const byId = new Map((items || []).map((it) => [String(it.id), it]));
+    return normIds.map((id) => byId.get(id)).filter(Boolean);
+  };
+
+  if (_forceBackendJsonMenuDb()) {
+    return pickFrom(await _loadMenuDbFromBackendJson());
+  }
+  if (_forceStaticMenuDb()) {
+    return pickFrom(await _loadMenuDbFromStatic());
+  }
+
+  try {
+    // POST, чтобы длинный список id не упирался в длину URL
+    const response = await api.post('/api/dishes/batch', { ids: normIds }, { timeout: 8000 });
+    _setMenuDbRuntimeSource('api');
+    const items = response.data?.items || {};
+    return normIds.map((id) => items[id]).filter(Boolean);
+  } catch (err) {
+    // Фолбэк: тот же порядок, что и у getDish — статический JSON, затем кэш
+    try {
+      return pickFrom(await _loadMenuDbFromStatic());
+    } catch {
+      const cached = _readMenuDbCache();
+      if (cached) return pickFrom(cached);
+    }
+    throw err;
+  }
+};
+
 export const getMenus = async () => {
   // В режиме предпросмотра из файла НЕ ходим в /api/menus, чтобы БД не “перебивала” результат.
   if (_forceBackendJsonMenuDb()) {
@@ -367,6 +406,46 @@ export const getSections = async (menuName = null) => {
   }
 };
 
+// ========== ЖИВЫЕ ИЗМЕНЕНИЯ КАТАЛОГА (SSE) ==========
+// Термин **SSE** (Server-Sent Events): одно долгое соединение, по которому сервер сам присылает события.
+// Одно соединение /api/events на вкладку, сколько бы экранов ни подписалось (счётчик подписчиков).
+// Событие: { version, changed: [id...], removed: [id...], full } — full=true значит "перезапросите всё".
+
+const _catalogListeners = new Set();
+let _catalogSource = null;
+
+function _openCatalogSource() {
+  if (typeof window === 'undefined' || typeof window.EventSource === 'undefined') return null;
+  // В режимах "static"/"backend-json" меню берётся из файла — событиям каталога из БД не с чем сверяться
+  if (_forceStaticMenuDb() || _forceBackendJsonMenuDb()) return null;
+  const source = new EventSource(`${API_URL}/api/events`);
+  source.addEventListener('catalog', (e) => {
+    const change = _safeJsonParse(e.data);
+    if (!change) return;
+    _catalogListeners.forEach((listener) => {
+      try {
+        listener(change);
+      } catch {
+        // ошибка одного экрана не должна мешать остальным
+      }
+    });
+  });
+  // При обрыве EventSource переподключается сам и присылает Last-Event-ID — пропущенное придёт одним событием
+  return source;
+}
+
+export const subscribeCatalogChanges = (listener) => {
+  _catalogListeners.add(listener);
+  if (!_catalogSource) _catalogSource = _openCatalogSource();
+  return () => {
+    _catalogListeners.delete(listener);
+    if (_catalogListeners.size === 0 && _catalogSource) {
+      _catalogSource.close();
+      _catalogSource = null;
+    }
+  };
+};
+
 // ========== API ДЛЯ ВИН ==========
 
 export const getWines = async () => {
@@ -498,9 +577,10 @@ export const checkAuth = async () => {
   return response.data;
 };
 
+// Сохранение всего каталога идёт фоновой задачей: ждём её, ответ — как раньше ({ status: 'ok', imported_to_db, ... })
 export const saveDishes = async (dishes) => {
   const response = await api.post('/api/admin/dishes', dishes);
-  return response.data;
+  return _withJobResult(response.data);
 };
 
 export const updateDish = async (id, dish) => {
@@ -518,6 +598,18 @@ export const deleteDish = async (id) => {
   return response.data;
 };
 
+// Стоп-лист: снять с продажи / вернуть, не переписывая позицию (каталог не пересобирается).
+// Ответ: { version, stop_list: [{ id, note, stopped_at }] } (в ответе админке ещё stopped_by и changed: [id...])
+export const getAvailability = async () => {
+  const response = await api.get('/api/availability', { timeout: 8000 });
+  return response.data;
+};
+
+export const setAvailability = async (ids, available, note = null) => {
+  const response = await api.post('/api/admin/availability', { ids, available, note });
+  return response.data;
+};
+
 // ========== API ДЛЯ ОБРАТНОЙ СВЯЗИ ==========
 
 export const submitFeedback = async (feedbackData) => {
@@ -525,8 +617,30 @@ export const submitFeedback = async (feedbackData) => {
   return response.data;
 };
 
-export const getFeedbackMessages = async () => {
-  const response = await api.get('/api/admin/feedback');
+// Одна страница сообщений: { items, next_cursor, unread_count }.
+// status: 'all' | 'unread' | 'read' | 'archived'; cursor — next_cursor предыдущей страницы.
+export const getFeedbackMessages = async ({ status = 'all', cursor, limit } = {}) => {
+  const params = { status };
+  if (cursor) params.cursor = cursor;
+  if (limit) params.limit = limit;
+  const response = await api.get('/api/admin/feedback', { params });
+  return response.data;
+};
+
+export const getFeedbackUnreadCount = async () => {
+  const response = await api.get('/api/admin/feedback/unread-count');
+  return response.data;
+};
+
+// ids — массив ID или null (все непрочитанные)
+export const markFeedbackReadBulk = async (ids) => {
+  const body = ids ? { ids } : { all: true };
+  const response = await api.post('/api/admin/feedback/read', body);
+  return response.data;
+};
+
+export const deleteFeedbackMessages = async (ids) => {
+  const response = await api.post('/api/admin/feedback/delete', { ids });
   return response.data;
 };
 
@@ -562,6 +676,38 @@ export const deleteUser = async (userId) => {
   return response.data;
 };
 
+// ========== ФОНОВЫЕ ЗАДАЧИ ==========
+
+// Задача: { id, kind, status: 'queued'|'running'|'done'|'error', progress, result, error, logs: [...] }
+export const getJob = async (jobId, { afterLog } = {}) => {
+  const params = afterLog ? { after_log: afterLog } : {};
+  const response = await api.get(`/api/admin/jobs/${jobId}`, { params });
+  return response.data;
+};
+
+// Ждать окончания задачи (опрос раз в intervalMs). Ошибка задачи -> исключение с её текстом.
+// Не дождались за timeoutMs -> исключение (задача могла остаться в работе: статус — getJob(jobId)).
+export const waitForJob = async (jobId, { intervalMs = 1000, timeoutMs = 5 * 60 * 1000, onProgress } = {}) => {
+  const deadline = Date.now() + timeoutMs;
+  for (;;) {
+    const job = await getJob(jobId, { afterLog: Number.MAX_SAFE_INTEGER });
+    if (onProgress) onProgress(job);
+    if (job.status === 'done') return job;
+    if (job.status === 'error') throw new Error(job.error || 'Задача завершилась ошибкой');
+    if (Date.now() >= deadline) {
+      throw new Error(`Задача ${jobId} не завершилась за ${Math.round(timeoutMs / 1000)} с — проверьте её статус позже`);
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+};
+
+// Ответ 202 { status: 'queued', job_id, ... } -> дождаться задачи и вернуть ответ в прежнем виде
+const _withJobResult = async (data) => {
+  if (!data?.job_id) return data;
+  const job = await waitForJob(data.job_id);
+  return { ...data, ...(job.result || {}), status: 'ok' };
+};
+
 // ========== АДМИН: ИМПОРТ МЕНЮ И (ОПЦ.) ДЕПЛОЙ ==========
 
 export const importMenuJson = async (file) => {
@@ -570,7 +716,7 @@ export const importMenuJson = async (file) => {
   const response = await api.post('/api/admin/menu/import', formData, {
     headers: { 'Content-Type': 'multipart/form-data' },
   });
-  return response.data;
+  return _withJobResult(response.data);
 };
 
 export const getDeployStatus = async () => {
@@ -594,5 +740,14 @@ export const getDeployJob = async () => {
   return response.data;
 };
 
+/**
+ * Поток событий деплоя (SSE): события "state" (шаг/статус) и "log" (строка вывода).
+ * При обрыве EventSource сам переподключается и продолжает с последнего события (Last-Event-ID).
+ * Закрыть: stream.close().
+ */
+export const openDeployStream = () => (
+  new EventSource(`${API_URL}/api/admin/deploy/stream`, { withCredentials: true })
+);
+
 export default api;
 
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+Настройки gunicorn для продакшена.
+
+Запуск (например, в sabor.service):
+    ExecStart=/var/www/sabor-app/venv/bin/gunicorn -c gunicorn.conf.py wsgi:application
+    ExecReload=/bin/kill -HUP $MAINPID
+
+Что дают хуки ниже:
+- post_worker_init — новый воркер прогревается (каталог, популярные ответы) и ставит метку "готов";
+- worker_exit — метка убирается.
+По этим меткам деплой из админки меняет воркеров без простоя (см. backend/graceful_reload.py).
+
+Важно: preload_app выключен — каждый новый воркер заново импортирует код,
+поэтому после git pull новые воркеры уже работают на новом коде.
+"""
+
+import os
+
+bind = os.getenv("GUNICORN_BIND", "127.0.0.1:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+# Потоки внутри воркера (gthread): потоки событий (SSE: /api/events, лог деплоя) держат соединение
+# минутами — с потоками каждое занимает один поток, а не весь воркер. Ждущий поток почти ничего не стоит.
+# /api/events берёт не больше EVENTS_MAX_CLIENTS потоков, остальные остаются обычным запросам
+threads = int(os.getenv("GUNICORN_THREADS", "32"))
+# Должен покрывать и прогрев нового воркера (первая сборка каталога/спрайта может идти десятки секунд)
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+# Сколько секунд старый воркер может доотвечать текущим запросам после команды "выйти"
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+preload_app = False
+
+
+def _lifecycle(worker):
+    app = getattr(worker, "wsgi", None)
+    return getattr(app, "extensions", {}).get("sabor_lifecycle")
+
+
+def post_worker_init(worker):
+    lifecycle = _lifecycle(worker)
+    if lifecycle:
+        lifecycle.worker_ready()
+
+
+def worker_exit(server, worker):
+    lifecycle = _lifecycle(worker)
+    if lifecycle:
+        lifecycle.worker_exit()
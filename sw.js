@@ -1,9 +1,91 @@
-const PRECACHE = 'precache-v9';
+// Кэш предзагрузки больше НЕ версионируется номером: при обновлении качаем только изменившиеся файлы.
+const PRECACHE = 'precache';
 const RUNTIME_CACHE = 'runtime-v9';
+// Старый ручной список — запасной вариант, если API на сервере недоступен
 const PRECACHE_MANIFEST_URL = 'precache-files.json';
+const PRECACHE_DIFF_URL = '/api/precache/diff';
+// Здесь (внутри кэша) храним манифест, который уже скачан: {hash, files: {url: {hash, size}}}
+const PRECACHE_STATE_KEY = '/__precache-state__';
+// Как часто проверять обновления во время работы (не чаще)
+const PRECACHE_SYNC_INTERVAL_MS = 60 * 60 * 1000;
 
-async function precacheAssets() {
-  const cache = await caches.open(PRECACHE);
+let precacheSyncPromise = null;
+let lastPrecacheSync = 0;
+
+async function readPrecacheState(cache) {
+  try {
+    const response = await cache.match(PRECACHE_STATE_KEY);
+    if (response) {
+      const state = await response.json();
+      if (state && state.hash && state.files) return state;
+    }
+  } catch (error) {
+    console.warn('[sw] Не удалось прочитать состояние предзагрузки', error);
+  }
+  return { hash: null, files: {} };
+}
+
+async function putFile(cache, url, meta) {
+  // ?v=<хеш> — "неизменяемая" ссылка: сервер и промежуточные кэши не отдадут старую версию.
+  // В кэш кладём под обычным URL, чтобы страница находила файл по своему адресу.
+  const versioned = meta && meta.hash ? `${url}${url.includes('?') ? '&' : '?'}v=${meta.hash}` : url;
+  const response = await fetch(versioned, { cache: 'no-store' });
+  if (!response.ok && response.type !== 'opaque') {
+    throw new Error(`status ${response.status}`);
+  }
+  await cache.put(url, response.clone());
+}
+
+// Обновление по дельте: сервер говорит, что добавилось/изменилось/удалилось с нашей версии
+async function syncPrecacheFromDiff(cache) {
+  const state = await readPrecacheState(cache);
+  const query = state.hash ? `?since=${encodeURIComponent(state.hash)}` : '';
+  const response = await fetch(`${PRECACHE_DIFF_URL}${query}`, { cache: 'no-store' });
+  if (!response.ok) {
+    throw new Error(`diff status ${response.status}`);
+  }
+  const diff = await response.json();
+  if (diff.hash === state.hash) return;
+
+  // full=true — сервер не знает нашу версию: сверяемся по хешам сами, чтобы не качать уже имеющееся
+  const files = diff.full ? {} : { ...state.files };
+  const toFetch = { ...diff.added, ...diff.changed };
+  const failed = [];
+
+  for (const [url, meta] of Object.entries(toFetch)) {
+    const known = state.files[url];
+    if (diff.full && known && known.hash === meta.hash && await cache.match(url)) {
+      files[url] = meta;
+      continue;
+    }
+    try {
+      await putFile(cache, url, meta);
+      files[url] = meta;
+    } catch (error) {
+      failed.push(url);
+      console.warn(`[sw] Пропуск кэширования ${url}`, error);
+    }
+  }
+
+  const removed = diff.full
+    ? Object.keys(state.files).filter((url) => !(url in diff.added))
+    : diff.removed;
+  for (const url of removed) {
+    delete files[url];
+    await cache.delete(url);
+  }
+
+  // Если что-то не скачалось — не запоминаем новый хеш: в следующий раз получим эти файлы снова
+  const hash = failed.length ? state.hash : diff.hash;
+  await cache.put(
+    PRECACHE_STATE_KEY,
+    new Response(JSON.stringify({ hash, files }), { headers: { 'Content-Type': 'application/json' } })
+  );
+  console.log(`[sw] Предзагрузка обновлена: ${Object.keys(toFetch).length - failed.length} файлов, ${removed.length} удалено`);
+}
+
+// Старый способ: скачать всё из precache-files.json (если сервер без API)
+async function precacheFromStaticList(cache) {
   let manifest = [];
 
   try {
@@ -21,25 +103,56 @@ async function precacheAssets() {
 
   for (const url of urls) {
     try {
-      const response = await fetch(url, { cache: 'no-store' });
-      if (response.ok || response.type === 'opaque') {
-        await cache.put(url, response.clone());
-      } else {
-        console.warn(`[sw] Пропуск кэширования ${url}: статус ${response.status}`);
-      }
+      await putFile(cache, url, null);
+    } catch (error) {
+      console.error(`[sw] Не удалось кэшировать ${url}`, error);
+    }
+  }
+}
+
+async function precacheAssets() {
+  const cache = await caches.open(PRECACHE);
+  try {
+    await syncPrecacheFromDiff(cache);
+  } catch (error) {
+    console.warn('[sw] Дельта недоступна, загружаем полный список', error);
+    await precacheFromStaticList(cache);
+  }
+  // Страница-оболочка нужна для офлайна всегда
+  for (const url of ['/', 'index.html']) {
+    try {
+      await putFile(cache, url, null);
     } catch (error) {
       console.error(`[sw] Не удалось кэшировать ${url}`, error);
     }
   }
+  lastPrecacheSync = Date.now();
+}
+
+// Одна синхронизация за раз (install, сообщения от страницы и фоновые проверки не пересекаются)
+function syncPrecache() {
+  if (!precacheSyncPromise) {
+    precacheSyncPromise = precacheAssets().finally(() => {
+      precacheSyncPromise = null;
+    });
+  }
+  return precacheSyncPromise;
 }
 
 self.addEventListener('install', (event) => {
   event.waitUntil((async () => {
-    await precacheAssets();
+    await syncPrecache();
     self.skipWaiting();
   })());
 });
 
+// Страница может попросить проверить обновления: navigator.serviceWorker.controller.postMessage({type: 'SYNC_PRECACHE'})
+self.addEventListener('message', (event) => {
+  if (event.data && event.data.type === 'SYNC_PRECACHE') {
+    event.waitUntil(syncPrecache());
+  }
+});
+
 self.addEventListener('activate', (event) => {
   event.waitUntil((async () => {
     const cacheNames = await caches.keys();
@@ -64,6 +177,11 @@ self.addEventListener('fetch', (event) => {
           const networkResponse = await fetch(request, { cache: 'no-store' });
           const runtime = await caches.open(RUNTIME_CACHE);
           await runtime.put(request, networkResponse.clone());
+          // Раз в час при открытии страницы докачиваем изменения (только разницу)
+          if (Date.now() - lastPrecacheSync > PRECACHE_SYNC_INTERVAL_MS) {
+            lastPrecacheSync = Date.now();
+            event.waitUntil(syncPrecache().catch(() => {}));
+          }
           return networkResponse;
         } catch (error) {
           const cachedPage = await caches.match(request);